@@ -41,12 +41,15 @@ export const chatController = {
     try {
       // Call ML API for AI response
       const mlApiUrl = process.env.ML_API_URL || 'http://localhost:8000'
+      const timeoutMs = 15000 // 15 second timeout
       const response = await axios.post(`${mlApiUrl}/chat`, {
         message: message.trim(),
         userId: req.user!.id,
         context: 'health_coaching'
       }, {
-        timeout: 15000 // 15 second timeout
+        timeout: timeoutMs,
+        // Lets the ML API drop the work once we stop waiting for it
+        headers: { 'X-Request-Deadline': String(Date.now() + timeoutMs) }
       })
 
       const aiResponse = response.data.response
@@ -133,10 +133,13 @@ export const mealController = {
       
       // Call ML API for food recognition
       const mlApiUrl = process.env.ML_API_URL || 'http://localhost:8000'
+      const timeoutMs = 10000 // 10 second timeout
       const response = await axios.post(`${mlApiUrl}/food-recognition`, {
         image: base64Image
       }, {
-        timeout: 10000 // 10 second timeout
+        timeout: timeoutMs,
+        // Lets the ML API drop the work once we stop waiting for it
+        headers: { 'X-Request-Deadline': String(Date.now() + timeoutMs) }
       })
 
       const recognitionResult = response.data
@@ -0,0 +1,111 @@
+import asyncio
+import json
+import logging
+import os
+import time
+
+from services.deadlines import deadline_var, parse_deadline
+
+logger = logging.getLogger(__name__)
+
+DEADLINE_HEADER = b"x-request-deadline"
+
+# Budget of requests that arrive without a deadline header; 0 means none
+DEFAULT_TIMEOUT_MS = float(os.getenv("REQUEST_DEFAULT_TIMEOUT_MS", 0))
+
+
+class DeadlineMiddleware:
+    """
+    ASGI middleware that sets the request deadline and aborts requests
+    whose client has gone away.
+
+    The deadline comes from the X-Request-Deadline header (absolute Unix
+    epoch milliseconds) or REQUEST_DEFAULT_TIMEOUT_MS, and is visible to
+    the handler, services and executor pools through deadline_var; they
+    decide what to skip or return partially.
+
+    Once the request body has been read, a watcher waits for the client
+    to disconnect. If it does before the response is complete, the
+    handler is cancelled, which also drops its queued executor work.
+    Requests whose body is never read are not watched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        deadline = None
+        for name, value in scope["headers"]:
+            if name == DEADLINE_HEADER:
+                try:
+                    deadline = parse_deadline(value.decode("latin-1"))
+                except ValueError:
+                    await self._bad_request(send, "X-Request-Deadline must be Unix epoch milliseconds")
+                    return
+                break
+        if deadline is None and DEFAULT_TIMEOUT_MS > 0:
+            deadline = time.monotonic() + DEFAULT_TIMEOUT_MS / 1000
+
+        body_read = asyncio.Event()
+        disconnected = asyncio.Event()
+        response_complete = False
+
+        async def watched_receive():
+            if body_read.is_set():
+                # The watcher owns receive() now; hand its disconnect on
+                await disconnected.wait()
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                disconnected.set()
+            elif not message.get("more_body", False):
+                body_read.set()
+            return message
+
+        async def watched_send(message):
+            nonlocal response_complete
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_complete = True
+            await send(message)
+
+        token = deadline_var.set(deadline)
+        try:
+            handler = asyncio.ensure_future(self.app(scope, watched_receive, watched_send))
+        finally:
+            deadline_var.reset(token)
+
+        async def watch():
+            await body_read.wait()
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    break
+            disconnected.set()
+            if not response_complete:
+                logger.info("Client disconnected, cancelling %s %s", scope["method"], scope["path"])
+                handler.cancel()
+
+        watcher = asyncio.ensure_future(watch())
+        try:
+            await handler
+        except asyncio.CancelledError:
+            if not disconnected.is_set():
+                # Cancelled from outside, e.g. server shutdown
+                raise
+        finally:
+            watcher.cancel()
+            if not handler.done():
+                handler.cancel()
+
+    async def _bad_request(self, send, detail: str):
+        body = json.dumps({"detail": detail}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 400,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        })
+        await send({"type": "http.response.body", "body": body})
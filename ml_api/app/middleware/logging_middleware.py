@@ -1,32 +1,69 @@
 import logging
+import os
 import time
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi import Request
+
+from services.structured_logging import RouteSampler, parse_sample_rates, request_id_var, request_sampled_var
 
 logger = logging.getLogger(__name__)
 
+# Share of requests whose info logs are kept, per path prefix, e.g. "/health=0,/food-recognition/search=0.1"
+sampler = RouteSampler(
+    parse_sample_rates(os.getenv("LOG_SAMPLE_RATES", "")),
+    default_rate=float(os.getenv("LOG_SAMPLE_DEFAULT", 1.0))
+)
+
+# Requests slower than this are logged as warnings, sampled or not
+SLOW_REQUEST_MS = float(os.getenv("LOG_SLOW_REQUEST_MS", 1000))
+
 async def logging_middleware(request: Request, call_next):
     """
     Middleware for logging API requests and responses.
-    """
-    start_time = time.time()
-    
-    # Log request
-    logger.info(f"Request: {request.method} {request.url.path}")
     
-    # Process request
-    response = await call_next(request)
-    
-    # Calculate processing time
-    process_time = time.time() - start_time
-    
-    # Log response
-    logger.info(
-        f"Response: {response.status_code} - "
-        f"Process time: {process_time:.3f}s"
-    )
-    
-    # Add processing time to response headers
-    response.headers["X-Process-Time"] = str(process_time)
+    Assigns each request an ID (the caller's X-Request-ID if given) that
+    every log record of the request carries, and emits one structured
+    record per request. Info logs of unsampled requests are dropped;
+    server errors and slow requests are always logged as warnings.
+    """
+    start_time = time.perf_counter()
+    path = request.scope["path"]
+    request_id = (request.headers.get("x-request-id") or os.urandom(16).hex())[:128]
+    sampled = sampler.sample(path)
+    id_token = request_id_var.set(request_id)
+    sampled_token = request_sampled_var.set(sampled)
     
-    return response
+    try:
+        # Process request
+        try:
+            response = await call_next(request)
+        except Exception:
+            logger.exception(
+                "Request failed: %s %s", request.method, path,
+                extra={"method": request.method, "path": path,
+                       "duration_ms": round((time.perf_counter() - start_time) * 1000, 3)}
+            )
+            raise
+        
+        # Calculate processing time
+        process_time = time.perf_counter() - start_time
+        duration_ms = process_time * 1000
+        
+        # Log response; unsampled requests skip creating the record at all,
+        # and formatting happens in the logging listener thread
+        slow_or_failed = response.status_code >= 500 or duration_ms >= SLOW_REQUEST_MS
+        if sampled or slow_or_failed:
+            logger.log(
+                logging.WARNING if slow_or_failed else logging.INFO,
+                "%s %s %s %.1fms", request.method, path, response.status_code, duration_ms,
+                extra={"method": request.method, "path": path, "status": response.status_code,
+                       "duration_ms": round(duration_ms, 3)}
+            )
+        
+        # Add request ID and processing time to response headers
+        response.headers["X-Request-ID"] = request_id
+        response.headers["X-Process-Time"] = str(process_time)
+        
+        return response
+    finally:
+        request_id_var.reset(id_token)
+        request_sampled_var.reset(sampled_token)
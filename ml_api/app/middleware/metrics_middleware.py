@@ -0,0 +1,95 @@
+import time
+from typing import Dict, Any
+
+from services.metrics import REGISTRY
+
+REQUESTS_TOTAL = REGISTRY.counter(
+    "healthsphere_http_requests_total",
+    "HTTP requests completed, by route template and status code",
+    ("method", "route", "status")
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "healthsphere_http_request_duration_seconds",
+    "Time from receiving a request to sending the last byte of its response",
+    ("method", "route")
+)
+
+UNMATCHED_ROUTE = "unmatched"
+
+# Scopes of the requests being served; grouped by route only when scraped
+_in_flight: Dict[int, Dict[str, Any]] = {}
+
+
+def _route_template(scope: Dict[str, Any]) -> str:
+    """
+    Path template of the route that handled the request, e.g.
+    /chat/conversation/{conversation_id}, from the route routing stored
+    on the scope.
+    """
+    route = scope.get("route")
+    if scope.get("endpoint") is None or getattr(route, "path_format", None) is None:
+        return UNMATCHED_ROUTE
+    # Depending on the FastAPI version the route is the router's own,
+    # without the include_router prefix; the prefix is whatever part of
+    # the path precedes what the route itself matches
+    path = scope["path"]
+    for split in range(len(path)):
+        if path[split] == "/" and route.path_regex.match(path[split:]):
+            return path[:split] + route.path_format
+    return route.path_format
+
+
+def _in_flight_metrics():
+    """Requests in flight per route, counted at scrape time."""
+    counts: Dict[tuple, int] = {}
+    for scope in list(_in_flight.values()):
+        # Requests that have not been routed yet count as unmatched
+        key = (scope["method"], _route_template(scope))
+        counts[key] = counts.get(key, 0) + 1
+    return [
+        ("healthsphere_http_requests_in_flight", "gauge",
+         "HTTP requests being served, by route template",
+         [({"method": method, "route": route}, count) for (method, route), count in counts.items()])
+    ]
+
+REGISTRY.register_collector(_in_flight_metrics)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request counts, latency histograms and
+    in-flight requests per route template.
+
+    Labels use the matched route's path template rather than the raw
+    path, so IDs in URLs do not create new series. The hot path is a few
+    dict operations and one histogram observation; in-flight gauges are
+    only grouped when /metrics is scraped.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        # Errors still send a 500 response; no response at all means the client went away
+        status = 499
+        _in_flight[id(scope)] = scope
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            del _in_flight[id(scope)]
+            # Routing fills in the endpoint on the shared scope
+            route = _route_template(scope)
+            REQUESTS_TOTAL.labels(scope["method"], route, str(status)).inc()
+            REQUEST_SECONDS.labels(scope["method"], route).observe(time.perf_counter() - start_time)
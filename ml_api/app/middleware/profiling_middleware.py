@@ -0,0 +1,68 @@
+import hmac
+import logging
+
+from services.profiling import MODES, ProfileSession, ProfilerBusy, TOKEN, store_profile
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+TOKEN_HEADER = b"x-debug-token"
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles single requests on demand.
+
+    A request with X-Profile: sample or cprofile and a valid X-Debug-Token
+    is recorded by a ProfileSession; the response carries X-Profile-Id, and
+    the profile can be fetched from /debug/profiles/{id}. If another profile
+    is recording the request runs unprofiled with X-Profile-Status: busy.
+
+    Only installed when DEBUG_PROFILING_TOKEN is set; other requests cost
+    a header scan.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        mode = token = None
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                mode = value.decode("latin-1").strip().lower()
+            elif name == TOKEN_HEADER:
+                token = value
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+
+        if mode not in MODES or token is None or not hmac.compare_digest(token, TOKEN.encode()):
+            # Not a valid profiling request; serve it normally
+            await self.app(scope, receive, send)
+            return
+
+        session = ProfileSession(mode, f"{scope['method']} {scope['path']}")
+        try:
+            session.start()
+        except ProfilerBusy:
+            await self.app(scope, receive, self._with_header(send, b"x-profile-status", b"busy"))
+            return
+
+        try:
+            # The ID goes out with the response headers, before the profile is stored
+            await self.app(scope, receive, self._with_header(send, b"x-profile-id", session.id.encode()))
+        finally:
+            store_profile(session.stop())
+        logger.info("Profiled %s as %s", session.label, session.id)
+
+    @staticmethod
+    def _with_header(send, name: bytes, value: bytes):
+        async def send_with_header(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (name, value)]}
+            await send(message)
+        return send_with_header
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 from typing import List, Dict, Any
 import logging
 
 from services.activity_detection_service import ActivityDetectionService
+from services.executors import PoolSaturated
+from services.deadlines import DeadlineExceeded, SKIPPED_MESSAGE
+from services.serialization import FastJSONResponse, to_columns
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -58,30 +61,50 @@ async def detect_activity(request: ActivityRequest):
             user_id=request.user_id
         )
         
-        return {
+        return FastJSONResponse({
             "success": True,
             "data": result
-        }
+        })
         
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         logger.error(f"Activity detection error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Activity detection failed: {str(e)}")
 
 @router.post("/batch")
-async def detect_activity_batch(requests: List[ActivityRequest]):
+async def detect_activity_batch(
+    requests: List[ActivityRequest],
+    layout: str = Query("rows", pattern="^(rows|columns)$")
+):
     """
     Detect activities from multiple sensor data samples.
     
+    Once the request deadline is reached, the remaining entries are
+    skipped and returned with an error.
+    
     Args:
         requests: List of ActivityRequest objects
+        layout: "rows" for a list of results, or "columns" for one list
+            per (dotted) result field
         
     Returns:
         JSON response with batch detection results
     """
     try:
         results = []
+        deadline_exceeded = False
         
         for i, request in enumerate(requests):
+            if deadline_exceeded:
+                results.append({
+                    "sample_id": i,
+                    "error": SKIPPED_MESSAGE
+                })
+                continue
+            
             try:
                 result = await activity_service.detect_activity(
                     accelerometer_data={
@@ -103,20 +126,31 @@ async def detect_activity_batch(requests: List[ActivityRequest]):
                     "result": result
                 })
                 
+            except PoolSaturated:
+                raise
+            except DeadlineExceeded:
+                deadline_exceeded = True
+                results.append({
+                    "sample_id": i,
+                    "error": SKIPPED_MESSAGE
+                })
             except Exception as e:
                 results.append({
                     "sample_id": i,
                     "error": str(e)
                 })
         
-        return {
+        return FastJSONResponse({
             "success": True,
             "data": {
-                "results": results,
-                "total_samples": len(results)
+                "results": to_columns(results) if layout == "columns" else results,
+                "total_samples": len(results),
+                "deadline_exceeded": deadline_exceeded
             }
-        }
+        })
         
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         logger.error(f"Batch activity detection error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Batch detection failed: {str(e)}")
@@ -132,10 +166,10 @@ async def get_supported_activities():
     try:
         activities = await activity_service.get_supported_activities()
         
-        return {
+        return FastJSONResponse({
             "success": True,
             "data": activities
-        }
+        })
         
     except Exception as e:
         logger.error(f"Get activities error: {str(e)}")
@@ -1,9 +1,13 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, AsyncIterator, Optional
+import json
 import logging
 
 from services.chat_service import ChatService
+from services.metrics import REGISTRY
+from services.serialization import FastJSONResponse
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -11,6 +15,21 @@ logger = logging.getLogger(__name__)
 # Initialize chat service
 chat_service = ChatService()
 
+def _cache_metrics():
+    """Response cache counters for the /metrics endpoint."""
+    stats = chat_service.response_cache.stats()
+    return [
+        ("healthsphere_chat_response_cache_lookups_total", "counter",
+         "Chat response cache lookups, by outcome",
+         [({"outcome": outcome}, stats[key])
+          for outcome, key in (("hit", "hits"), ("miss", "misses"), ("bypassed", "bypassed"))]),
+        ("healthsphere_chat_response_cache_entries", "gauge",
+         "Chat responses held in the local cache tier",
+         [({}, stats["entries"])])
+    ]
+
+REGISTRY.register_collector(_cache_metrics)
+
 class ChatMessage(BaseModel):
     message: str
     user_id: str
@@ -23,6 +42,9 @@ class ChatRequest(BaseModel):
     context: str = "health_coaching"
     conversation_id: Optional[str] = None
 
+class ClassifyRequest(BaseModel):
+    messages: List[str]
+
 @router.post("/")
 async def chat(request: ChatRequest):
     """
@@ -43,20 +65,84 @@ async def chat(request: ChatRequest):
             conversation_id=request.conversation_id
         )
         
-        return {
+        return FastJSONResponse({
             "success": True,
             "data": {
                 "response": response["message"],
                 "conversation_id": response.get("conversation_id"),
                 "suggestions": response.get("suggestions", []),
-                "context": response.get("context", {})
+                "context": response.get("context", {}),
+                "sources": response.get("sources", [])
             }
-        }
+        })
         
     except Exception as e:
         logger.error(f"Chat processing error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Chat processing failed: {str(e)}")
 
+@router.post("/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Process chat message and stream the AI response as Server-Sent Events.
+    
+    Events are "start" (conversation_id), "chunk" (a piece of the reply
+    text) and "done" (suggestions, context and sources); "error" replaces "done"
+    if generation fails. Disconnecting stops generation.
+    
+    Args:
+        request: ChatRequest containing message and context
+        
+    Returns:
+        text/event-stream response
+    """
+    events = chat_service.stream_message(
+        message=request.message,
+        user_id=request.user_id,
+        context=request.context,
+        conversation_id=request.conversation_id
+    )
+    
+    return StreamingResponse(
+        _sse_events(events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def _sse_events(events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    """Format service events as SSE frames."""
+    try:
+        async for event in events:
+            yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+    except Exception as e:
+        logger.error(f"Chat streaming error: {str(e)}")
+        yield f"event: error\ndata: {json.dumps({'event': 'error', 'detail': f'Chat processing failed: {str(e)}'})}\n\n"
+    finally:
+        # Runs the service generator's cleanup now rather than at garbage collection
+        await events.aclose()
+
+@router.post("/classify")
+async def classify_messages(request: ClassifyRequest):
+    """
+    Classify a batch of messages into chat intents.
+    
+    Args:
+        request: ClassifyRequest with the messages to classify
+        
+    Returns:
+        JSON response with the intent of each message
+    """
+    try:
+        classification = await chat_service.classify_messages(request.messages)
+        
+        return FastJSONResponse({
+            "success": True,
+            "data": classification
+        })
+        
+    except Exception as e:
+        logger.error(f"Intent classification error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Intent classification failed: {str(e)}")
+
 @router.post("/conversation")
 async def start_conversation(user_id: str, context: str = "health_coaching"):
     """
@@ -72,44 +158,97 @@ async def start_conversation(user_id: str, context: str = "health_coaching"):
     try:
         conversation_id = await chat_service.start_conversation(user_id, context)
         
-        return {
+        return FastJSONResponse({
             "success": True,
             "data": {
                 "conversation_id": conversation_id,
                 "context": context
             }
-        }
+        })
         
     except Exception as e:
         logger.error(f"Start conversation error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to start conversation: {str(e)}")
 
 @router.get("/conversation/{conversation_id}")
-async def get_conversation_history(conversation_id: str):
+async def get_conversation_history(
+    conversation_id: str,
+    since: Optional[int] = Query(None, ge=-1),
+    before: Optional[int] = Query(None, ge=0),
+    limit: int = Query(50, ge=1, le=500)
+):
     """
-    Get conversation history.
+    Get conversation history, one page at a time.
+    
+    Every message carries a sequence number "seq". Poll for new messages
+    with since=<next_since of the previous response>; page back in time
+    with before=<before of the previous response>.
     
     Args:
         conversation_id: Conversation identifier
+        since: Return messages after this seq
+        before: Return messages before this seq
+        limit: Maximum number of messages (latest first page by default)
         
     Returns:
-        JSON response with conversation history
+        JSON response with conversation history and pagination cursors
     """
     try:
-        history = await chat_service.get_conversation_history(conversation_id)
+        history = await chat_service.get_conversation_history(
+            conversation_id, since=since, before=before, limit=limit
+        )
         
-        return {
+        return FastJSONResponse({
             "success": True,
             "data": {
                 "conversation_id": conversation_id,
-                "messages": history
+                **history
             }
-        }
+        })
         
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         logger.error(f"Get conversation history error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to get conversation history: {str(e)}")
 
+@router.get("/users/{user_id}/conversations")
+async def list_user_conversations(
+    user_id: str,
+    before: Optional[str] = Query(None, max_length=200),
+    limit: int = Query(20, ge=1, le=100)
+):
+    """
+    List a user's conversations, most recently active first.
+    
+    Page through older conversations with before=<next_before of the
+    previous response>.
+    
+    Args:
+        user_id: User identifier
+        before: Cursor of the next page
+        limit: Maximum number of conversations
+        
+    Returns:
+        JSON response with conversation metadata and the next cursor
+    """
+    try:
+        page = await chat_service.list_user_conversations(user_id, before=before, limit=limit)
+        
+        return FastJSONResponse({
+            "success": True,
+            "data": {
+                "user_id": user_id,
+                **page
+            }
+        })
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"List conversations error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to list conversations: {str(e)}")
+
 @router.delete("/conversation/{conversation_id}")
 async def delete_conversation(conversation_id: str):
     """
@@ -124,15 +263,55 @@ async def delete_conversation(conversation_id: str):
     try:
         await chat_service.delete_conversation(conversation_id)
         
-        return {
+        return FastJSONResponse({
             "success": True,
             "message": "Conversation deleted successfully"
-        }
+        })
         
     except Exception as e:
         logger.error(f"Delete conversation error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to delete conversation: {str(e)}")
 
+@router.get("/store/stats")
+async def get_store_stats():
+    """
+    Get conversation store metrics.
+    
+    Returns:
+        JSON response with stored conversations and eviction counters
+    """
+    try:
+        stats = await chat_service.get_store_stats()
+        
+        return FastJSONResponse({
+            "success": True,
+            "data": stats
+        })
+        
+    except Exception as e:
+        logger.error(f"Get store stats error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to get store stats: {str(e)}")
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """
+    Get chat response cache metrics.
+    
+    Returns:
+        JSON response with hit rate, saved latency and cache size
+    """
+    try:
+        stats = await chat_service.get_cache_stats()
+        
+        return FastJSONResponse({
+            "success": True,
+            "data": stats
+        })
+        
+    except Exception as e:
+        logger.error(f"Get cache stats error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to get cache stats: {str(e)}")
+
 @router.get("/contexts")
 async def get_available_contexts():
     """
@@ -144,10 +323,10 @@ async def get_available_contexts():
     try:
         contexts = await chat_service.get_available_contexts()
         
-        return {
+        return FastJSONResponse({
             "success": True,
             "data": contexts
-        }
+        })
         
     except Exception as e:
         logger.error(f"Get contexts error: {str(e)}")
@@ -0,0 +1,106 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import Response
+from typing import Optional
+import asyncio
+import hmac
+import logging
+
+from services.profiling import (
+    DEFAULT_INTERVAL_MS, MAX_SECONDS, ProfileSession, ProfilerBusy, TOKEN,
+    get_profile, list_profiles
+)
+from services.serialization import FastJSONResponse
+
+logger = logging.getLogger(__name__)
+
+
+async def require_debug_token(x_debug_token: Optional[str] = Header(None)):
+    """Reject requests without the worker's DEBUG_PROFILING_TOKEN."""
+    # Starlette decodes headers as latin-1; compare the raw bytes, since
+    # compare_digest rejects non-ASCII str
+    if x_debug_token is None or not hmac.compare_digest(x_debug_token.encode("latin-1"), TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid or missing X-Debug-Token")
+
+
+router = APIRouter(dependencies=[Depends(require_debug_token)])
+
+
+def _render(profile, fmt: Optional[str]) -> Response:
+    fmt = fmt or profile.formats()[0]
+    try:
+        body, media_type = profile.render(fmt)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    extension = {"collapsed": "folded", "pstats": "prof", "text": "txt"}[fmt]
+    return Response(body, media_type=media_type, headers={
+        "Content-Disposition": f'inline; filename="profile-{profile.id}.{extension}"',
+        "X-Profile-Id": profile.id
+    })
+
+
+@router.post("/profile")
+async def profile_worker(
+    seconds: float = Query(10, gt=0, le=MAX_SECONDS),
+    mode: str = Query("sample", pattern="^(sample|cprofile)$"),
+    interval_ms: float = Query(DEFAULT_INTERVAL_MS, ge=1, le=1000),
+    include_idle: bool = Query(False),
+    format: Optional[str] = Query(None, pattern="^(collapsed|pstats|text)$")
+):
+    """
+    Profile this worker for a number of seconds while it serves traffic.
+
+    mode=sample records every thread's stack each interval (collapsed
+    stacks, flamegraph-ready); mode=cprofile traces every call on the
+    event loop (pstats dump). Either renders as a text summary with
+    format=text. Only the worker that receives this request is profiled.
+
+    Returns:
+        The profile in the requested format
+    """
+    session = ProfileSession(mode, f"worker for {seconds:g}s", interval_ms / 1000, include_idle)
+    try:
+        session.start()
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profile = session.stop()
+    logger.info(f"Profiled worker for {seconds:g}s ({mode})")
+
+    return _render(profile, format)
+
+
+@router.get("/profiles")
+async def get_profiles():
+    """
+    List recent per-request profiles (requests sent with X-Profile).
+
+    Returns:
+        JSON response with stored profiles, newest first
+    """
+    return FastJSONResponse({
+        "success": True,
+        "data": {
+            "profiles": list_profiles()
+        }
+    })
+
+
+@router.get("/profiles/{profile_id}")
+async def get_request_profile(
+    profile_id: str,
+    format: Optional[str] = Query(None, pattern="^(collapsed|pstats|text)$")
+):
+    """
+    Download a per-request profile.
+
+    Returns:
+        The profile in the requested format (collapsed or pstats by default)
+    """
+    profile = get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found or expired")
+
+    return _render(profile, format)
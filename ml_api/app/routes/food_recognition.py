@@ -1,13 +1,19 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Query
+from fastapi.responses import StreamingResponse
+import asyncio
 import base64
-import io
-from PIL import Image
-import numpy as np
-from typing import Dict, Any
+import os
+from typing import Dict, Any, AsyncIterator, List, Optional
+from pydantic import BaseModel
 import logging
 
-from services.food_recognition_service import FoodRecognitionService
+from services.food_recognition_service import (
+    FoodNotFound, FoodRecognitionService, MODEL_NAME, decode_pool, inference_pool
+)
+from services.metrics import REGISTRY, StageTimer
+from services.executors import PoolSaturated
+from services.deadlines import DeadlineExceeded, SKIPPED_MESSAGE, remaining
+from services.serialization import FastJSONResponse, dumps, to_columns
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -15,6 +21,58 @@ logger = logging.getLogger(__name__)
 # Initialize food recognition service
 food_service = FoodRecognitionService()
 
+# Least time kept for classifying a batch when its decoding races a deadline
+INFERENCE_RESERVE_SECONDS = 0.05
+
+# Most images one batch request may carry; 0 means no limit
+MAX_BATCH_IMAGES = int(os.getenv("FOOD_BATCH_MAX_IMAGES", 100))
+
+def _cascade_metrics():
+    """Recognition cascade counters for the /metrics endpoint."""
+    stats = food_service.cascade.stats()
+    return [
+        ("healthsphere_food_cascade_images_total", "counter",
+         "Images classified, by the cascade stage that answered",
+         [({"stage": "first_stage"}, stats["first_stage_answered"]),
+          ({"stage": "full_model"}, stats["full_model_answered"])])
+    ]
+
+REGISTRY.register_collector(_cascade_metrics)
+
+class AggregateRequest(BaseModel):
+    # Column-oriented log entries: element i of every list is one entry
+    user_ids: List[str]
+    dates: List[str]
+    food_names: List[str]
+    servings: Optional[List[float]] = None
+    period: str = "day"  # day, week, total
+    goals: Optional[Dict[str, float]] = None
+
+def _image_uploads(images: List[UploadFile]) -> List[UploadFile]:
+    """
+    Keep only uploads declared as images.
+    
+    Raises:
+        HTTPException: 413 if there are more than FOOD_BATCH_MAX_IMAGES images
+    """
+    uploads = [image for image in images if (image.content_type or "").startswith('image/')]
+    if MAX_BATCH_IMAGES and len(uploads) > MAX_BATCH_IMAGES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many images: at most {MAX_BATCH_IMAGES} per batch"
+        )
+    return uploads
+
+async def _decode_limited(image_data: bytes, timer: StageTimer, limit: asyncio.Semaphore):
+    """Decode in the pool, holding one of the batch's decode slots."""
+    async with limit:
+        return await food_service.preprocess_image(image_data, timer)
+
+def _decode_limit() -> asyncio.Semaphore:
+    # A batch keeps at most one decode per worker in the pool, so it never
+    # fills the queue by itself and leaves room for other requests
+    return asyncio.Semaphore(decode_pool.workers)
+
 @router.post("/")
 async def recognize_food(
     image: UploadFile = File(...),
@@ -35,82 +93,275 @@ async def recognize_food(
         if not image.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="File must be an image")
         
-        # Read and process image
+        # Read, decode and measure the portion off the event loop
         image_data = await image.read()
-        image_pil = Image.open(io.BytesIO(image_data))
-        
-        # Convert to RGB if necessary
-        if image_pil.mode != 'RGB':
-            image_pil = image_pil.convert('RGB')
-        
-        # Resize image for processing
-        image_pil = image_pil.resize((224, 224))
-        
-        # Convert to numpy array
-        image_array = np.array(image_pil)
+        timer = StageTimer(MODEL_NAME)
+        image_array, portion = await food_service.preprocess_image(image_data, timer)
         
         # Perform food recognition
-        result = await food_service.recognize_food(image_array, user_id)
+        result = await food_service.recognize_food(image_array, user_id, portion, timer)
         
-        return JSONResponse(content={
+        return FastJSONResponse({
             "success": True,
             "data": result
         })
         
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         logger.error(f"Food recognition error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Food recognition failed: {str(e)}")
 
+@router.post("/plate")
+async def recognize_plate(
+    image: UploadFile = File(...),
+    user_id: str = Form(None)
+):
+    """
+    Recognize every food item on a plate photo.
+    
+    Regions are proposed with colour segmentation, cropped into one batch
+    and classified in a single model call. Each item's nutrition is scaled
+    to the portion estimated from its segmented area.
+    
+    Args:
+        image: Image file of a meal or plate
+        user_id: Optional user ID for personalization
+        
+    Returns:
+        JSON response with per-item results and summed nutrition
+    """
+    try:
+        if not (image.content_type or "").startswith('image/'):
+            raise HTTPException(status_code=400, detail="File must be an image")
+        
+        image_data = await image.read()
+        timer = StageTimer(MODEL_NAME)
+        crops, boxes, portions = await food_service.preprocess_plate(image_data, timer)
+        
+        result = await food_service.recognize_plate(crops, boxes, user_id, portions, timer)
+        
+        return FastJSONResponse({
+            "success": True,
+            "data": result
+        })
+        
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        logger.error(f"Plate recognition error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Plate recognition failed: {str(e)}")
+
 @router.post("/batch")
 async def recognize_food_batch(
     images: list[UploadFile] = File(...),
-    user_id: str = Form(None)
+    user_id: str = Form(None),
+    layout: str = Query("rows", pattern="^(rows|columns)$")
 ):
     """
     Recognize food items in multiple images.
     
+    Images are decoded at most one per decode-pool worker at a time;
+    batches over FOOD_BATCH_MAX_IMAGES are rejected with 413. If the
+    request deadline passes, the images recognized so far are returned
+    and the rest carry a "skipped" error.
+    
     Args:
         images: List of image files
         user_id: Optional user ID for personalization
+        layout: "rows" for a list of results, or "columns" for one list
+            per (dotted) result field
         
     Returns:
         JSON response with batch recognition results
     """
+    uploads = _image_uploads(images)
+    
     try:
-        results = []
+        payloads = await asyncio.gather(*(image.read() for image in uploads))
+        
+        # Decode concurrently, then classify everything in one batched call
+        timers = [StageTimer(MODEL_NAME) for _ in payloads]
+        limit = _decode_limit()
+        decodes = [
+            asyncio.ensure_future(_decode_limited(image_data, timer, limit))
+            for image_data, timer in zip(payloads, timers)
+        ]
+        done = set()
+        try:
+            # Under a deadline, stop waiting for decodes in time to classify the finished ones
+            budget = remaining()
+            if budget is not None:
+                budget -= max(2 * inference_pool.expected_run_seconds, INFERENCE_RESERVE_SECONDS)
+            if decodes:
+                done, _ = await asyncio.wait(decodes, timeout=budget)
+        finally:
+            for task in decodes:
+                if task not in done:
+                    task.cancel()
         
-        for image in images:
-            if not image.content_type.startswith('image/'):
+        ready = []
+        for index, task in enumerate(decodes):
+            if task not in done or isinstance(task.exception(), DeadlineExceeded):
                 continue
-                
-            # Process each image
-            image_data = await image.read()
-            image_pil = Image.open(io.BytesIO(image_data))
-            
-            if image_pil.mode != 'RGB':
-                image_pil = image_pil.convert('RGB')
-                
-            image_pil = image_pil.resize((224, 224))
-            image_array = np.array(image_pil)
-            
-            result = await food_service.recognize_food(image_array, user_id)
-            results.append({
+            if task.exception() is not None:
+                raise task.exception()
+            ready.append(index)
+        
+        recognized = {}
+        if ready:
+            try:
+                batch_results = await food_service.recognize_food_batch(
+                    [decodes[index].result()[0] for index in ready],
+                    user_id,
+                    [decodes[index].result()[1] for index in ready],
+                    [timers[index] for index in ready]
+                )
+                recognized = dict(zip(ready, batch_results))
+            except DeadlineExceeded:
+                pass
+        
+        results = [
+            {
+                "filename": image.filename,
+                "result": recognized[index]
+            } if index in recognized else {
                 "filename": image.filename,
-                "result": result
-            })
+                "error": SKIPPED_MESSAGE
+            }
+            for index, image in enumerate(uploads)
+        ]
         
-        return JSONResponse(content={
+        return FastJSONResponse({
             "success": True,
             "data": {
-                "results": results,
-                "total_images": len(results)
+                "results": to_columns(results) if layout == "columns" else results,
+                "total_images": len(results),
+                "deadline_exceeded": len(recognized) < len(uploads)
             }
         })
         
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         logger.error(f"Batch food recognition error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Batch recognition failed: {str(e)}")
 
+@router.post("/batch/stream")
+async def recognize_food_batch_stream(
+    images: list[UploadFile] = File(...),
+    user_id: str = Form(None)
+):
+    """
+    Recognize food items in multiple images, streaming results as NDJSON.
+    
+    Images are decoded concurrently in the decode pool, at most one per
+    worker at a time; batches over FOOD_BATCH_MAX_IMAGES are rejected
+    with 413. Whatever has finished decoding is classified
+    together in one batched model call and written out immediately, so
+    the first result arrives without waiting for the whole batch. Images
+    not done by the request deadline are reported as skipped.
+    
+    Args:
+        images: List of image files
+        user_id: Optional user ID for personalization
+        
+    Returns:
+        application/x-ndjson stream with one line per image and a final
+        summary line
+    """
+    uploads = _image_uploads(images)
+    payloads = await asyncio.gather(*(image.read() for image in uploads))
+    
+    return StreamingResponse(
+        _stream_batch_results(uploads, payloads, user_id),
+        media_type="application/x-ndjson"
+    )
+
+async def _stream_batch_results(
+    uploads: List[UploadFile],
+    payloads: List[bytes],
+    user_id: str
+) -> AsyncIterator[bytes]:
+    """Decode in the pool and yield NDJSON lines as micro-batches complete."""
+    timers = [StageTimer(MODEL_NAME) for _ in payloads]
+    limit = _decode_limit()
+    pending = {
+        asyncio.ensure_future(_decode_limited(image_data, timers[index], limit)): index
+        for index, image_data in enumerate(payloads)
+    }
+    failed = 0
+    deadline_exceeded = False
+    
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending.keys(), return_when=asyncio.FIRST_COMPLETED)
+            
+            ready = []
+            for future in done:
+                index = pending.pop(future)
+                try:
+                    ready.append((index, future.result()))
+                except DeadlineExceeded:
+                    failed += 1
+                    deadline_exceeded = True
+                    yield dumps({
+                        "index": index,
+                        "filename": uploads[index].filename,
+                        "error": SKIPPED_MESSAGE
+                    }) + b"\n"
+                except Exception as e:
+                    failed += 1
+                    yield dumps({
+                        "index": index,
+                        "filename": uploads[index].filename,
+                        "error": f"Image decoding failed: {str(e)}"
+                    }) + b"\n"
+            
+            if not ready:
+                continue
+            
+            try:
+                batch_results = await food_service.recognize_food_batch(
+                    [image_array for _, (image_array, _) in ready],
+                    user_id,
+                    [portion for _, (_, portion) in ready],
+                    [timers[index] for index, _ in ready]
+                )
+            except Exception as e:
+                failed += len(ready)
+                deadline_exceeded = deadline_exceeded or isinstance(e, DeadlineExceeded)
+                for index, _ in ready:
+                    yield dumps({
+                        "index": index,
+                        "filename": uploads[index].filename,
+                        "error": SKIPPED_MESSAGE if isinstance(e, DeadlineExceeded) else str(e)
+                    }) + b"\n"
+                continue
+            
+            for (index, _), result in zip(ready, batch_results):
+                yield dumps({
+                    "index": index,
+                    "filename": uploads[index].filename,
+                    "result": result
+                }) + b"\n"
+        
+        yield dumps({
+            "done": True,
+            "total_images": len(uploads),
+            "failed": failed,
+            "deadline_exceeded": deadline_exceeded
+        }) + b"\n"
+    
+    finally:
+        # Client went away: drop decodes that have not started yet
+        for future in pending:
+            future.cancel()
+
 @router.get("/nutrition/{food_name}")
 async def get_nutrition_info(food_name: str):
     """
@@ -120,16 +371,206 @@ async def get_nutrition_info(food_name: str):
         food_name: Name of the food item
         
     Returns:
-        JSON response with nutrition data
+        JSON response with nutrition data; 404 with "suggestions" (close
+        food names from the search index) when the food is unknown
     """
     try:
         nutrition_data = await food_service.get_nutrition_info(food_name)
         
-        return JSONResponse(content={
+        return FastJSONResponse({
             "success": True,
             "data": nutrition_data
         })
         
+    except FoodNotFound as e:
+        raise HTTPException(status_code=404, detail={"message": str(e), "suggestions": e.suggestions})
     except Exception as e:
         logger.error(f"Nutrition lookup error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Nutrition lookup failed: {str(e)}")
+
+@router.get("/search")
+async def search_foods(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50)
+):
+    """
+    Typo-tolerant food search, e.g. "chiken brest" or "salmn".
+    
+    Args:
+        q: Free-text food name
+        limit: Maximum number of ranked results
+        
+    Returns:
+        JSON response with ranked matches
+    """
+    try:
+        search_results = await food_service.search_foods(q, limit)
+        
+        return FastJSONResponse({
+            "success": True,
+            "data": search_results
+        })
+        
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        logger.error(f"Food search error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Food search failed: {str(e)}")
+
+@router.get("/autocomplete")
+async def autocomplete_foods(
+    prefix: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50)
+):
+    """
+    Autocomplete food names from a typed prefix.
+    
+    Args:
+        prefix: Beginning of a food name
+        limit: Maximum number of completions
+        
+    Returns:
+        JSON response with matching food names
+    """
+    try:
+        completions = await food_service.autocomplete_foods(prefix, limit)
+        
+        return FastJSONResponse({
+            "success": True,
+            "data": completions
+        })
+        
+    except Exception as e:
+        logger.error(f"Food autocomplete error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Food autocomplete failed: {str(e)}")
+
+@router.get("/barcode/{upc}")
+async def lookup_barcode(upc: str):
+    """
+    Look up a packaged food by UPC/EAN barcode.
+    
+    Args:
+        upc: Barcode digits (EAN-8, UPC-A, EAN-13 or GTIN-14)
+        
+    Returns:
+        JSON response with the product's nutrition and allergens
+    """
+    try:
+        product = await food_service.lookup_barcode(upc)
+        
+        return FastJSONResponse({
+            "success": True,
+            "data": product
+        })
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"Barcode lookup error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Barcode lookup failed: {str(e)}")
+
+@router.get("/alternatives/{food_name}")
+async def find_alternatives(
+    food_name: str,
+    k: int = Query(5, ge=1, le=50),
+    fewer_calories: bool = Query(False),
+    more_protein: bool = Query(False),
+    exclude_allergens: Optional[List[str]] = Query(None)
+):
+    """
+    Suggest healthier alternatives to a food, e.g. after recognizing it.
+    
+    Args:
+        food_name: Food to replace
+        k: Number of alternatives
+        fewer_calories: Only suggest foods with fewer calories
+        more_protein: Only suggest foods with more protein
+        exclude_allergens: Allergens to avoid (repeat the parameter for several)
+        
+    Returns:
+        JSON response with the most nutritionally similar foods
+    """
+    try:
+        alternatives = await food_service.find_alternatives(
+            food_name,
+            k=k,
+            fewer_calories=fewer_calories,
+            more_protein=more_protein,
+            exclude_allergens=exclude_allergens
+        )
+        
+        return FastJSONResponse({
+            "success": True,
+            "data": alternatives
+        })
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        logger.error(f"Alternative search error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Alternative search failed: {str(e)}")
+
+@router.post("/aggregate")
+async def aggregate_nutrition(request: AggregateRequest):
+    """
+    Aggregate meal-log nutrition for many users and periods in one call.
+    
+    Args:
+        request: AggregateRequest with column-oriented log entries
+        
+    Returns:
+        JSON response with per-user, per-period totals, macro ratios and goal gaps
+    """
+    try:
+        aggregates = await food_service.aggregate_nutrition(
+            user_ids=request.user_ids,
+            dates=request.dates,
+            food_names=request.food_names,
+            servings=request.servings,
+            period=request.period,
+            goals=request.goals
+        )
+        
+        return FastJSONResponse({
+            "success": True,
+            "data": aggregates
+        })
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        logger.error(f"Nutrition aggregation error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Nutrition aggregation failed: {str(e)}")
+
+@router.get("/cascade/stats")
+async def get_cascade_stats():
+    """
+    Get recognition cascade metrics.
+    
+    Returns:
+        JSON response with the share of images answered by the first stage,
+        overall and per food, and average per-stage latency
+    """
+    try:
+        stats = await food_service.get_cascade_stats()
+        
+        return FastJSONResponse({
+            "success": True,
+            "data": stats
+        })
+        
+    except Exception as e:
+        logger.error(f"Cascade stats error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to get cascade stats: {str(e)}")
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
 import logging
 
 from services.risk_forecasting_service import RiskForecastingService
+from services.executors import PoolSaturated
+from services.deadlines import DeadlineExceeded, SKIPPED_MESSAGE
+from services.serialization import FastJSONResponse, to_columns
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -60,30 +63,50 @@ async def forecast_health_risk(request: RiskForecastRequest):
             user_id=request.user_id
         )
         
-        return {
+        return FastJSONResponse({
             "success": True,
             "data": result
-        }
+        })
         
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         logger.error(f"Risk forecasting error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Risk forecasting failed: {str(e)}")
 
 @router.post("/comparison")
-async def compare_scenarios(requests: List[RiskForecastRequest]):
+async def compare_scenarios(
+    requests: List[RiskForecastRequest],
+    layout: str = Query("rows", pattern="^(rows|columns)$")
+):
     """
     Compare health risk scenarios under different lifestyle conditions.
     
+    Once the request deadline is reached, the remaining entries are
+    skipped and returned with an error.
+    
     Args:
         requests: List of RiskForecastRequest objects for different scenarios
+        layout: "rows" for a list of scenarios, or "columns" for one list
+            per (dotted) scenario field
         
     Returns:
         JSON response with scenario comparison
     """
     try:
         results = []
+        deadline_exceeded = False
         
         for i, request in enumerate(requests):
+            if deadline_exceeded:
+                results.append({
+                    "scenario_id": i,
+                    "error": SKIPPED_MESSAGE
+                })
+                continue
+            
             try:
                 result = await risk_service.forecast_risk(
                     health_metrics=request.health_metrics.dict(),
@@ -98,20 +121,31 @@ async def compare_scenarios(requests: List[RiskForecastRequest]):
                     "result": result
                 })
                 
+            except PoolSaturated:
+                raise
+            except DeadlineExceeded:
+                deadline_exceeded = True
+                results.append({
+                    "scenario_id": i,
+                    "error": SKIPPED_MESSAGE
+                })
             except Exception as e:
                 results.append({
                     "scenario_id": i,
                     "error": str(e)
                 })
         
-        return {
+        return FastJSONResponse({
             "success": True,
             "data": {
-                "scenarios": results,
-                "total_scenarios": len(results)
+                "scenarios": to_columns(results) if layout == "columns" else results,
+                "total_scenarios": len(results),
+                "deadline_exceeded": deadline_exceeded
             }
-        }
+        })
         
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         logger.error(f"Scenario comparison error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Scenario comparison failed: {str(e)}")
@@ -127,10 +161,10 @@ async def get_risk_factors():
     try:
         risk_factors = await risk_service.get_risk_factors()
         
-        return {
+        return FastJSONResponse({
             "success": True,
             "data": risk_factors
-        }
+        })
         
     except Exception as e:
         logger.error(f"Get risk factors error: {str(e)}")
@@ -154,10 +188,10 @@ async def suggest_interventions(request: RiskForecastRequest):
             user_id=request.user_id
         )
         
-        return {
+        return FastJSONResponse({
             "success": True,
             "data": interventions
-        }
+        })
         
     except Exception as e:
         logger.error(f"Intervention suggestion error: {str(e)}")
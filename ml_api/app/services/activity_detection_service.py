@@ -1,13 +1,18 @@
 import numpy as np
 import logging
 from typing import Dict, Any, List, Optional
-import random
 from sklearn.preprocessing import StandardScaler
 from sklearn.ensemble import RandomForestClassifier
 import joblib
 
+from services.metrics import StageTimer
+from services.executors import declare_pool, offload
+
 logger = logging.getLogger(__name__)
 
+# Feature extraction and model prediction run here, off the event loop
+activity_pool = declare_pool("activity", "ACTIVITY")
+
 class ActivityDetectionService:
     """
     Service for detecting physical activities from sensor data.
@@ -52,7 +57,8 @@ class ActivityDetectionService:
         
         return X, y
     
-    async def detect_activity(
+    @offload(activity_pool)
+    def detect_activity(
         self, 
         accelerometer_data: Dict[str, List[float]],
         gyroscope_data: Dict[str, List[float]],
@@ -62,6 +68,8 @@ class ActivityDetectionService:
         """
         Detect physical activity from sensor data.
         
+        Runs in the activity pool.
+        
         Args:
             accelerometer_data: Dictionary with x, y, z accelerometer readings
             gyroscope_data: Dictionary with x, y, z gyroscope readings
@@ -72,49 +80,54 @@ class ActivityDetectionService:
             Dictionary with activity detection results
         """
         try:
-            # Extract features from sensor data
-            features = self._extract_features(
-                accelerometer_data, gyroscope_data, duration
-            )
+            timer = StageTimer("activity_detection")
             
-            if self.model is not None:
-                # Use trained model for prediction
-                features_scaled = self.scaler.transform([features])
-                probabilities = self.model.predict_proba(features_scaled)[0]
-                
-                # Get top predictions
-                activity_probs = list(zip(self.activities, probabilities))
-                activity_probs.sort(key=lambda x: x[1], reverse=True)
-                
-                predicted_activity = activity_probs[0][0]
-                confidence = activity_probs[0][1]
-                
-                # Get top 3 predictions
-                top_predictions = activity_probs[:3]
-            else:
-                # Fallback to mock prediction
-                predicted_activity, confidence = self._mock_prediction(features)
-                top_predictions = [(predicted_activity, confidence)]
+            # Extract features from sensor data
+            with timer.stage("features"):
+                features = self._extract_features(
+                    accelerometer_data, gyroscope_data, duration
+                )
             
-            # Calculate additional metrics
-            intensity = self._calculate_intensity(features)
-            calories_burned = self._estimate_calories(predicted_activity, duration, intensity)
+            with timer.stage("inference"):
+                if self.model is not None:
+                    # Use trained model for prediction
+                    features_scaled = self.scaler.transform([features])
+                    probabilities = self.model.predict_proba(features_scaled)[0]
+                    
+                    # Get top predictions
+                    activity_probs = list(zip(self.activities, probabilities))
+                    activity_probs.sort(key=lambda x: x[1], reverse=True)
+                    
+                    predicted_activity = activity_probs[0][0]
+                    confidence = activity_probs[0][1]
+                    
+                    # Get top 3 predictions
+                    top_predictions = activity_probs[:3]
+                else:
+                    # Fallback to mock prediction
+                    predicted_activity, confidence = self._mock_prediction(features)
+                    top_predictions = [(predicted_activity, confidence)]
             
-            result = {
-                "predicted_activity": predicted_activity,
-                "confidence": float(confidence),
-                "top_predictions": [
-                    {"activity": activity, "confidence": float(conf)} 
-                    for activity, conf in top_predictions
-                ],
-                "duration_seconds": duration,
-                "intensity_level": intensity,
-                "estimated_calories": calories_burned,
-                "features_extracted": len(features),
-                "processing_time_ms": random.randint(50, 200)
-            }
+            with timer.stage("postprocess"):
+                # Calculate additional metrics
+                intensity = self._calculate_intensity(features)
+                calories_burned = self._estimate_calories(predicted_activity, duration, intensity)
+                
+                result = {
+                    "predicted_activity": predicted_activity,
+                    "confidence": float(confidence),
+                    "top_predictions": [
+                        {"activity": activity, "confidence": float(conf)} 
+                        for activity, conf in top_predictions
+                    ],
+                    "duration_seconds": duration,
+                    "intensity_level": intensity,
+                    "estimated_calories": calories_burned,
+                    "features_extracted": len(features)
+                }
+            result.update(timer.report())
             
-            logger.info(f"Activity detected: {predicted_activity} (confidence: {confidence:.2f})")
+            logger.info("Activity detected: %s (confidence: %.2f)", predicted_activity, confidence)
             return result
             
         except Exception as e:
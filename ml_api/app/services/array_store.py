@@ -0,0 +1,105 @@
+import json
+import os
+import numpy as np
+from typing import Dict, Any, List, Optional, Sequence
+
+MANIFEST_FILE = "manifest.json"
+
+
+def save_arrays(directory: str, arrays: Dict[str, np.ndarray], metadata: Optional[Dict[str, Any]] = None):
+    """
+    Persist a set of NumPy arrays as one .npy file each plus a manifest.
+
+    Plain .npy files (not .npz) are used so that every array can be
+    memory-mapped independently on load.
+
+    Args:
+        directory: Target directory, created if missing
+        arrays: Mapping of array name to array
+        metadata: Optional JSON-serializable metadata stored in the manifest
+    """
+    os.makedirs(directory, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(array))
+
+    manifest = {
+        "arrays": sorted(arrays.keys()),
+        "metadata": metadata or {}
+    }
+    tmp_path = os.path.join(directory, MANIFEST_FILE + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, os.path.join(directory, MANIFEST_FILE))
+
+
+def load_arrays(directory: str, mmap: bool = True) -> tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """
+    Load arrays written by save_arrays.
+
+    Args:
+        directory: Directory containing the manifest and .npy files
+        mmap: Memory-map the arrays read-only instead of reading them into RAM
+
+    Returns:
+        Tuple of (arrays by name, manifest metadata)
+    """
+    with open(os.path.join(directory, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+
+    mmap_mode = "r" if mmap else None
+    arrays = {
+        name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+        for name in manifest["arrays"]
+    }
+    return arrays, manifest.get("metadata", {})
+
+
+def has_arrays(directory: Optional[str]) -> bool:
+    """Check whether a directory holds a saved array set."""
+    return bool(directory) and os.path.exists(os.path.join(directory, MANIFEST_FILE))
+
+
+class StringTable:
+    """
+    Immutable table of strings stored as one UTF-8 blob plus offsets.
+
+    Both arrays can be memory-mapped, so a table with millions of entries
+    costs nothing to open and only touched pages are read.
+    """
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings: Sequence[str]) -> "StringTable":
+        """Pack a sequence of strings into a table."""
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        if encoded:
+            offsets[1:] = np.cumsum([len(e) for e in encoded])
+        blob = np.frombuffer(b"".join(encoded), dtype=np.uint8).copy()
+        return cls(blob, offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def get_bytes(self, index: int) -> bytes:
+        """Return the raw UTF-8 bytes of one entry."""
+        return self.blob[self.offsets[index]:self.offsets[index + 1]].tobytes()
+
+    def __getitem__(self, index: int) -> str:
+        return self.get_bytes(index).decode("utf-8")
+
+    def to_list(self) -> List[str]:
+        """Decode the whole table."""
+        return [self[i] for i in range(len(self))]
+
+    def to_arrays(self, prefix: str) -> Dict[str, np.ndarray]:
+        """Return the backing arrays keyed for save_arrays."""
+        return {f"{prefix}_blob": self.blob, f"{prefix}_offsets": self.offsets}
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], prefix: str) -> "StringTable":
+        """Rebuild a table from arrays loaded with load_arrays."""
+        return cls(arrays[f"{prefix}_blob"], arrays[f"{prefix}_offsets"])
@@ -0,0 +1,186 @@
+import numpy as np
+import logging
+from typing import Dict, Any, Optional, Sequence
+
+from services.array_store import StringTable, save_arrays, load_arrays
+from services.food_alternatives import allergen_names
+from services.nutrient_aggregation import NUTRIENTS
+
+logger = logging.getLogger(__name__)
+
+# Accepted barcode lengths: EAN-8, UPC-A, EAN-13, GTIN-14
+GTIN_LENGTHS = (8, 12, 13, 14)
+
+
+def normalize_upc(code: str) -> int:
+    """
+    Validate a barcode and return it as an integer GTIN.
+
+    Leading zeros are not significant, so a UPC-A code and the EAN-13 code
+    with a leading 0 map to the same integer.
+
+    Raises:
+        ValueError: If the code is not numeric, has an unsupported length
+            or its check digit is wrong
+    """
+    digits = code.strip().replace("-", "").replace(" ", "")
+    if not digits.isdigit() or len(digits) not in GTIN_LENGTHS:
+        raise ValueError(f"Invalid barcode '{code}': expected {', '.join(map(str, GTIN_LENGTHS))} digits")
+
+    # GS1 check digit: weights 3,1,3,... from the right, excluding the check digit
+    body = [int(d) for d in digits[:-1]]
+    total = sum(d * (3 if i % 2 == 0 else 1) for i, d in enumerate(reversed(body)))
+    if (10 - total % 10) % 10 != int(digits[-1]):
+        raise ValueError(f"Invalid barcode '{code}': check digit mismatch")
+
+    return int(digits)
+
+
+def sort_codes(codes: np.ndarray, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Sort codes with their product rows, keeping the last row of duplicate codes."""
+    codes = np.asarray(codes, dtype=np.uint64)
+    rows = np.asarray(rows, dtype=np.int64)
+
+    # Stable sort keeps duplicates in input order
+    order = np.argsort(codes, kind="stable")
+    codes, rows = codes[order], rows[order]
+    last = np.append(codes[1:] != codes[:-1], True) if len(codes) else np.zeros(0, dtype=bool)
+    return codes[last], rows[last]
+
+
+class BarcodeIndex:
+    """
+    Barcode to product lookup over memory-mapped arrays.
+
+    Codes are a sorted uint64 array with a parallel array of row offsets
+    into the product store (names, brands, per-100 g nutrients, allergen
+    masks), so several codes can share one product. A lookup is a binary
+    search with np.searchsorted that touches about log2(n) pages of the
+    mapped file, and opening an index reads nothing but the manifest.
+    """
+
+    def __init__(
+        self,
+        codes: np.ndarray,
+        rows: np.ndarray,
+        names: StringTable,
+        brands: StringTable,
+        nutrients: np.ndarray,
+        allergen_masks: np.ndarray
+    ):
+        self.codes = codes
+        self.rows = rows
+        self.names = names
+        self.brands = brands
+        self.nutrients = nutrients
+        self.allergen_masks = allergen_masks
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @classmethod
+    def build(
+        cls,
+        codes: np.ndarray,
+        rows: np.ndarray,
+        names: Sequence[str],
+        brands: Sequence[str],
+        nutrients: np.ndarray,
+        allergen_masks: np.ndarray
+    ) -> "BarcodeIndex":
+        """
+        Build an index from unsorted codes.
+
+        Args:
+            codes: Integer GTINs (see normalize_upc)
+            rows: Product row of each code
+            names: Product names
+            brands: Product brands ("" when unknown)
+            nutrients: Per-100 g values of shape (len(names), len(NUTRIENTS))
+            allergen_masks: Allergen bitmask of each product
+
+        Returns:
+            In-memory BarcodeIndex; for duplicate codes the last row wins
+        """
+        codes, rows = sort_codes(codes, rows)
+
+        return cls(
+            codes=codes,
+            rows=rows,
+            names=StringTable.from_strings(list(names)),
+            brands=StringTable.from_strings(list(brands)),
+            nutrients=np.asarray(nutrients, dtype=np.float32).reshape(len(names), len(NUTRIENTS)),
+            allergen_masks=np.asarray(allergen_masks, dtype=np.int64)
+        )
+
+    @classmethod
+    def empty(cls) -> "BarcodeIndex":
+        """An index with no codes, used when none has been imported."""
+        return cls.build(np.zeros(0), np.zeros(0), [], [], np.zeros((0, len(NUTRIENTS))), np.zeros(0))
+
+    def save(self, directory: str):
+        """Write the index to a directory of .npy files."""
+        arrays = {
+            "codes": self.codes,
+            "rows": self.rows,
+            "nutrients": self.nutrients,
+            "allergen_masks": self.allergen_masks,
+            **self.names.to_arrays("names"),
+            **self.brands.to_arrays("brands")
+        }
+        save_arrays(directory, arrays, metadata={
+            "type": "barcode",
+            "size": len(self),
+            "products": len(self.names),
+            "nutrients": list(NUTRIENTS)
+        })
+        logger.info(f"Barcode index with {len(self)} codes saved to {directory}")
+
+    @classmethod
+    def load(cls, directory: str) -> "BarcodeIndex":
+        """Open an index written by save, memory-mapped."""
+        arrays, metadata = load_arrays(directory)
+        if metadata.get("nutrients") != list(NUTRIENTS):
+            raise ValueError(f"Barcode index at {directory} was built with a different nutrient schema")
+
+        index = cls(
+            codes=arrays["codes"],
+            rows=arrays["rows"],
+            names=StringTable.from_arrays(arrays, "names"),
+            brands=StringTable.from_arrays(arrays, "brands"),
+            nutrients=arrays["nutrients"],
+            allergen_masks=arrays["allergen_masks"]
+        )
+        logger.info(f"Barcode index with {len(index)} codes loaded from {directory}")
+        return index
+
+    def find_row(self, code: int) -> Optional[int]:
+        """Product row of a normalized code, or None."""
+        position = int(np.searchsorted(self.codes, np.uint64(code)))
+        if position < len(self.codes) and int(self.codes[position]) == code:
+            return int(self.rows[position])
+        return None
+
+    def lookup(self, upc: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a product by barcode.
+
+        Args:
+            upc: Barcode digits (EAN-8, UPC-A, EAN-13 or GTIN-14)
+
+        Returns:
+            Product name, brand, nutrition and allergens, or None when unknown
+        """
+        code = normalize_upc(upc)
+        row = self.find_row(code)
+        if row is None:
+            return None
+
+        return {
+            "upc": upc,
+            "gtin": f"{code:014d}",
+            "food_name": self.names[row],
+            "brand": self.brands[row] or None,
+            "nutrition": dict(zip(NUTRIENTS, np.round(self.nutrients[row].astype(np.float64), 2).tolist())),
+            "allergens": allergen_names(int(self.allergen_masks[row]))
+        }
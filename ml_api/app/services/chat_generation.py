@@ -0,0 +1,74 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, Any, AsyncIterator, List, Sequence
+
+from services.intent_matcher import IntentMatcher
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseGenerator(ABC):
+    """
+    Produces a chat reply as a stream of text chunks.
+
+    A language-model backed generator yields tokens as they are decoded;
+    consumers can forward them as they arrive. Cancelling the consuming
+    task stops generation at the next chunk.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def generate(
+        self,
+        message: str,
+        intent: str,
+        context_info: Dict[str, Any],
+        passages: Sequence[Dict[str, Any]] = ()
+    ) -> AsyncIterator[str]:
+        """
+        Yield reply chunks; concatenated they form the full reply, grounded in passages.
+
+        Implementations are async generators (async def with yield).
+        """
+
+
+class TemplateResponseGenerator(ResponseGenerator):
+    """
+    Streams the intent's response template a few words at a time.
+
+    The best retrieved passage, if any, follows the template with its
+    source. Stands in for a real model; chunk_delay simulates decoding time.
+    """
+
+    name = "template"
+
+    def __init__(self, intent_matcher: IntentMatcher, words_per_chunk: int = 3, chunk_delay: float = 0.0):
+        self.intent_matcher = intent_matcher
+        self.words_per_chunk = words_per_chunk
+        self.chunk_delay = chunk_delay
+
+    async def generate(
+        self,
+        message: str,
+        intent: str,
+        context_info: Dict[str, Any],
+        passages: Sequence[Dict[str, Any]] = ()
+    ) -> AsyncIterator[str]:
+        reply = self.intent_matcher.response_for(intent)
+        if passages:
+            reply = f"{reply}\n\n{self._cite(passages[0])}"
+        words = reply.split(" ")
+        for start in range(0, len(words), self.words_per_chunk):
+            chunk = " ".join(words[start:start + self.words_per_chunk])
+            yield chunk if start == 0 else " " + chunk
+            # Always yield to the event loop so cancellation is seen between chunks
+            await asyncio.sleep(self.chunk_delay)
+
+    @staticmethod
+    def _cite(passage: Dict[str, Any]) -> str:
+        """Passage text with its source."""
+        if passage.get("source"):
+            return f"{passage['text']} (Source: {passage['source']})"
+        return passage["text"]
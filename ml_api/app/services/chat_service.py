@@ -1,19 +1,42 @@
 import logging
-from typing import Dict, Any, List, Optional
-import random
+from typing import Dict, Any, AsyncIterator, List, Optional
+import os
+import time
 import uuid
 from datetime import datetime
 
+import anyio
+
+from services.conversation_store import create_conversation_store
+from services.intent_matcher import IntentMatcher, DEFAULT_INTENTS_PATH
+from services.chat_generation import TemplateResponseGenerator
+from services.response_cache import create_response_cache
+from services.knowledge_index import KnowledgeIndex, DEFAULT_CORPUS_PATH, SEGMENTS_FILE, read_corpus
+
 logger = logging.getLogger(__name__)
 
 class ChatService:
     """
     Service for AI-powered health coaching chat.
     In production, this would integrate with advanced language models.
+    Conversations live in a bounded ConversationStore selected by
+    CHAT_STORE_BACKEND (in-process memory or shared Redis). Replies come
+    from a ResponseGenerator as a stream of chunks, which stream_message
+    forwards as they are produced. Replies to non-personal messages are
+    cached by normalized text and context (see ResponseCache). Replies
+    are grounded in the top BM25 passages of a health knowledge index.
     """
     
     def __init__(self):
-        self.conversations = {}
+        self.store = create_conversation_store()
+        self.intent_matcher = IntentMatcher.load(os.getenv("CHAT_INTENTS_PATH", DEFAULT_INTENTS_PATH))
+        self.generator = TemplateResponseGenerator(
+            self.intent_matcher,
+            chunk_delay=float(os.getenv("CHAT_STREAM_CHUNK_DELAY_MS", 0)) / 1000
+        )
+        self.response_cache = create_response_cache()
+        self.knowledge_index = self._load_knowledge_index()
+        self.knowledge_top_k = int(os.getenv("CHAT_KNOWLEDGE_TOP_K", 3))
         self.contexts = {
             "health_coaching": {
                 "description": "General health and wellness coaching",
@@ -63,52 +86,200 @@ class ChatService:
                 conversation_id = await self.start_conversation(user_id, context)
             
             # Store user message
-            self._store_message(conversation_id, message, True, user_id)
+            await self._store_message(conversation_id, message, True, user_id)
             
-            # Generate AI response
-            response = await self._generate_response(message, context, conversation_id)
+            # Generate AI response, or reuse the reply to the same question
+            response = await self._cached_response(message, context, conversation_id)
             
             # Store AI response
-            self._store_message(conversation_id, response["message"], False, user_id)
+            await self._store_message(conversation_id, response["message"], False, user_id)
             
             return {
                 "message": response["message"],
                 "conversation_id": conversation_id,
                 "suggestions": response.get("suggestions", []),
-                "context": response.get("context", {})
+                "context": response.get("context", {}),
+                "sources": response.get("sources", [])
             }
             
         except Exception as e:
             logger.error(f"Chat processing error: {str(e)}")
             raise Exception(f"Chat processing failed: {str(e)}")
     
+    async def stream_message(
+        self,
+        message: str,
+        user_id: str,
+        context: str = "health_coaching",
+        conversation_id: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process user message and stream the AI response as it is generated.
+        
+        The user message is stored before generation starts and the reply
+        as soon as generation ends. If the consumer goes away mid-reply
+        (the task is cancelled or the generator closed), generation stops
+        and the part already sent is stored with "interrupted": true. A
+        cached reply is sent as a single chunk.
+        
+        Args:
+            message: User's message
+            user_id: User identifier
+            context: Conversation context
+            conversation_id: Optional conversation ID
+            
+        Yields:
+            Events: "start" (conversation_id, intent), one "chunk" per piece
+            of text, then "done" (suggestions, context, sources)
+        """
+        if not conversation_id:
+            conversation_id = await self.start_conversation(user_id, context)
+        
+        await self._store_message(conversation_id, message, True, user_id)
+        
+        context_info = self.contexts.get(context, self.contexts["health_coaching"])
+        key = self.response_cache.key(message, context)
+        cached = await self.response_cache.get(key) if key is not None else None
+        intent = cached["context"]["intent"] if cached is not None else self.intent_matcher.classify(message)["intent"]
+        yield {"event": "start", "conversation_id": conversation_id, "intent": intent}
+        
+        passages = self._retrieve(message, context) if cached is None else []
+        chunks = []
+        completed = False
+        started = time.perf_counter()
+        try:
+            if cached is not None:
+                chunks.append(cached["message"])
+                yield {"event": "chunk", "text": cached["message"]}
+            else:
+                async for chunk in self.generator.generate(message, intent, context_info, passages):
+                    chunks.append(chunk)
+                    yield {"event": "chunk", "text": chunk}
+            completed = True
+        finally:
+            # Shielded so the reply is stored even while the request is being cancelled
+            with anyio.CancelScope(shield=True):
+                await self._store_message(conversation_id, "".join(chunks), False, user_id, interrupted=not completed)
+            if not completed:
+                logger.info("Streaming reply in conversation %s cancelled after %d chunks", conversation_id, len(chunks))
+        
+        response = cached or {
+            "message": "".join(chunks),
+            "suggestions": self.intent_matcher.suggestions_for(intent),
+            "context": self._response_context(context, context_info, intent),
+            "sources": self._sources(passages)
+        }
+        if cached is None and key is not None:
+            await self.response_cache.put(key, response, (time.perf_counter() - started) * 1000)
+        
+        yield {
+            "event": "done",
+            "suggestions": response["suggestions"],
+            "context": response["context"],
+            "sources": response.get("sources", [])
+        }
+    
     async def start_conversation(self, user_id: str, context: str = "health_coaching") -> str:
         """Start a new conversation session."""
         conversation_id = str(uuid.uuid4())
         
-        self.conversations[conversation_id] = {
-            "user_id": user_id,
-            "context": context,
-            "messages": [],
-            "created_at": datetime.now(),
-            "last_activity": datetime.now()
-        }
+        await self.store.create(conversation_id, user_id, context)
         
-        logger.info(f"Started conversation {conversation_id} for user {user_id}")
+        logger.info("Started conversation %s for user %s", conversation_id, user_id)
         return conversation_id
     
-    async def get_conversation_history(self, conversation_id: str) -> List[Dict[str, Any]]:
-        """Get conversation history."""
-        if conversation_id not in self.conversations:
+    async def get_conversation_history(
+        self,
+        conversation_id: str,
+        since: Optional[int] = None,
+        before: Optional[int] = None,
+        limit: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Get one page of conversation history.
+        
+        Args:
+            conversation_id: Conversation identifier
+            since: Only messages with seq greater than this (polling for new messages)
+            before: Only messages with seq less than this (paging back in time)
+            limit: Maximum number of messages; without since the latest are returned
+            
+        Returns:
+            Dictionary with messages (oldest first) and the cursors for the
+            next poll (next_since) and the previous page (before)
+        """
+        page = await self.store.get_messages(conversation_id, since=since, before=before, limit=limit)
+        if page is None:
             raise ValueError("Conversation not found")
         
-        return self.conversations[conversation_id]["messages"]
+        messages = page["messages"]
+        if messages:
+            last_seq = messages[-1]["seq"]
+            older = messages[0]["seq"] if messages[0]["seq"] > page["first_seq"] else None
+        else:
+            last_seq = since if since is not None else page["next_seq"] - 1
+            older = None
+        
+        return {
+            "messages": messages,
+            "next_since": last_seq,
+            "before": older,
+            "has_newer": last_seq < page["next_seq"] - 1
+        }
+    
+    async def list_user_conversations(
+        self,
+        user_id: str,
+        before: Optional[str] = None,
+        limit: int = 20
+    ) -> Dict[str, Any]:
+        """
+        Get one page of a user's conversations, most recently active first.
+        
+        Args:
+            user_id: User identifier
+            before: Cursor (next_before of the previous page)
+            limit: Maximum number of conversations
+            
+        Returns:
+            Dictionary with conversations and the next_before cursor (None on the last page)
+        """
+        page = await self.store.list_conversations(
+            user_id, before=self._decode_cursor(before) if before else None, limit=limit
+        )
+        
+        next_before = page["next_before"]
+        return {
+            "conversations": page["conversations"],
+            "next_before": f"{next_before[0]!r}:{next_before[1]}" if next_before else None
+        }
+    
+    @staticmethod
+    def _decode_cursor(cursor: str) -> tuple[float, str]:
+        """Parse a "<last_activity>:<conversation_id>" list cursor."""
+        activity, _, conversation_id = cursor.partition(":")
+        try:
+            return float(activity), conversation_id
+        except ValueError:
+            raise ValueError(f"Invalid cursor '{cursor}'")
     
     async def delete_conversation(self, conversation_id: str):
         """Delete a conversation."""
-        if conversation_id in self.conversations:
-            del self.conversations[conversation_id]
-            logger.info(f"Deleted conversation {conversation_id}")
+        if await self.store.delete(conversation_id):
+            logger.info("Deleted conversation %s", conversation_id)
+    
+    async def get_store_stats(self) -> Dict[str, Any]:
+        """Get conversation store size and eviction counters."""
+        return await self.store.stats()
+    
+    async def get_cache_stats(self) -> Dict[str, Any]:
+        """Get response cache hit rate and saved latency."""
+        return self.response_cache.stats()
+    
+    async def close(self):
+        """Flush persisted chat state and close store and cache connections."""
+        await self.store.close()
+        await self.response_cache.close()
     
     async def get_available_contexts(self) -> Dict[str, Any]:
         """Get available conversation contexts."""
@@ -117,134 +288,109 @@ class ChatService:
             "total_count": len(self.contexts)
         }
     
-    def _store_message(self, conversation_id: str, message: str, is_user: bool, user_id: str):
-        """Store message in conversation history."""
-        if conversation_id not in self.conversations:
-            return
-        
-        self.conversations[conversation_id]["messages"].append({
+    async def _store_message(
+        self,
+        conversation_id: str,
+        message: str,
+        is_user: bool,
+        user_id: str,
+        interrupted: bool = False
+    ):
+        """Store message in conversation history; ignored if the conversation has expired."""
+        entry = {
             "message": message,
             "is_user": is_user,
             "timestamp": datetime.now().isoformat(),
             "user_id": user_id
-        })
+        }
+        if interrupted:
+            entry["interrupted"] = True
+        await self.store.append_message(conversation_id, entry)
+    
+    async def _cached_response(self, message: str, context: str, conversation_id: str) -> Dict[str, Any]:
+        """Reply from the response cache, generating and caching it on a miss."""
+        key = self.response_cache.key(message, context)
+        if key is not None:
+            cached = await self.response_cache.get(key)
+            if cached is not None:
+                return cached
         
-        self.conversations[conversation_id]["last_activity"] = datetime.now()
+        started = time.perf_counter()
+        response = await self._generate_response(message, context, conversation_id)
+        if key is not None:
+            await self.response_cache.put(key, response, (time.perf_counter() - started) * 1000)
+        return response
     
     async def _generate_response(self, message: str, context: str, conversation_id: str) -> Dict[str, Any]:
         """Generate AI response based on message and context."""
         # In production, this would use a trained language model
         # For now, we'll use rule-based responses
         
-        message_lower = message.lower()
         context_info = self.contexts.get(context, self.contexts["health_coaching"])
         
-        # Generate contextual response
-        response = self._generate_contextual_response(message_lower, context_info)
+        # Pick the intent, retrieve supporting passages, then generate the reply
+        intent = self.intent_matcher.classify(message)["intent"]
+        passages = self._retrieve(message, context)
+        chunks = [chunk async for chunk in self.generator.generate(message, intent, context_info, passages)]
         
-        # Generate suggestions
-        suggestions = self._generate_suggestions(message_lower, context)
+        return {
+            "message": "".join(chunks),
+            "suggestions": self.intent_matcher.suggestions_for(intent),
+            "context": self._response_context(context, context_info, intent),
+            "sources": self._sources(passages)
+        }
+    
+    def _retrieve(self, message: str, context: str) -> List[Dict[str, Any]]:
+        """Top knowledge passages for a message within its context."""
+        if self.knowledge_top_k <= 0:
+            return []
+        return self.knowledge_index.search(message, context=context, k=self.knowledge_top_k)
+    
+    @staticmethod
+    def _sources(passages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Citation fields of retrieved passages."""
+        return [
+            {"id": p["id"], "title": p["title"], "source": p["source"], "score": p["score"]}
+            for p in passages
+        ]
+    
+    def _load_knowledge_index(self) -> KnowledgeIndex:
+        """Open the on-disk knowledge index, or index the bundled corpus in memory."""
+        index_path = os.getenv("CHAT_KNOWLEDGE_INDEX_PATH")
+        if index_path and os.path.exists(os.path.join(index_path, SEGMENTS_FILE)):
+            try:
+                return KnowledgeIndex.open(
+                    index_path,
+                    refresh_interval=float(os.getenv("CHAT_KNOWLEDGE_REFRESH_SECONDS", 5))
+                )
+            except Exception as e:
+                logger.error(f"Failed to load knowledge index from {index_path}: {str(e)}")
         
+        corpus_path = os.getenv("CHAT_KNOWLEDGE_CORPUS_PATH", DEFAULT_CORPUS_PATH)
+        index = KnowledgeIndex.from_passages(read_corpus(corpus_path))
+        logger.info(f"Indexed {len(index)} knowledge passages from {corpus_path} in memory")
+        return index
+    
+    def _response_context(self, context: str, context_info: Dict[str, Any], intent: str) -> Dict[str, Any]:
+        """Context metadata returned with every reply."""
         return {
-            "message": response,
-            "suggestions": suggestions,
-            "context": {
-                "context_type": context,
-                "personality": context_info["personality"],
-                "expertise": context_info["expertise"]
-            }
+            "context_type": context,
+            "personality": context_info["personality"],
+            "expertise": context_info["expertise"],
+            "intent": intent
         }
     
-    def _generate_contextual_response(self, message: str, context_info: Dict[str, Any]) -> str:
-        """Generate contextual response based on message content."""
-        personality = context_info["personality"]
-        expertise = context_info["expertise"]
-        
-        # Health coaching responses
-        if "workout" in message or "exercise" in message:
-            responses = [
-                "I'd be happy to help with your workout routine! Based on your health profile, I recommend starting with low-impact cardio exercises like walking or swimming. Would you like me to create a personalized workout plan for you?",
-                "Great question about exercise! For optimal health, aim for at least 150 minutes of moderate-intensity activity per week. I can help you design a program that fits your fitness level and goals.",
-                "Exercise is crucial for maintaining good health! Let's discuss your current fitness level and any health conditions to create the best workout plan for you."
-            ]
-        elif "diet" in message or "food" in message or "meal" in message:
-            responses = [
-                "Nutrition is a key pillar of good health! I recommend focusing on whole foods like vegetables, lean proteins, and complex carbohydrates. What specific dietary goals are you working towards?",
-                "Great question about nutrition! A balanced diet with plenty of fruits, vegetables, and lean proteins can significantly improve your health. I can help you track your meals and suggest healthy alternatives.",
-                "Food choices have a huge impact on your health! Let's discuss your current eating habits and create a plan that works for your lifestyle and health goals."
-            ]
-        elif "blood pressure" in message or "heart" in message:
-            responses = [
-                "Managing cardiovascular health is crucial! Regular exercise, a balanced diet, and stress management can help maintain healthy blood pressure. I recommend monitoring your readings and consulting with your healthcare provider.",
-                "Heart health is so important! Lifestyle changes like reducing sodium, increasing physical activity, and managing stress can make a big difference. Would you like tips for heart-healthy lifestyle changes?",
-                "Your cardiovascular health is a priority! I can help you understand your risk factors and create a plan to improve your heart health through diet, exercise, and lifestyle modifications."
-            ]
-        elif "sleep" in message or "insomnia" in message:
-            responses = [
-                "Quality sleep is essential for overall health! Try maintaining a consistent sleep schedule, creating a relaxing bedtime routine, and avoiding screens before bed. I can help you track your sleep patterns and suggest improvements.",
-                "Sleep is when your body repairs and rejuvenates! Aim for 7-9 hours of quality sleep per night. Let's discuss your current sleep habits and create a plan for better rest.",
-                "Good sleep is foundational to good health! I can help you optimize your sleep environment and routine. How many hours of sleep are you currently getting?"
-            ]
-        elif "stress" in message or "anxiety" in message:
-            responses = [
-                "Mental wellness is just as important as physical health! Consider incorporating mindfulness practices, deep breathing exercises, or gentle yoga into your routine. I'm here to support your mental health journey.",
-                "Stress management is crucial for overall well-being! I can teach you relaxation techniques and help you develop healthy coping strategies. What's causing you the most stress right now?",
-                "Your mental health matters! Let's work together to develop stress management techniques that fit your lifestyle. Remember, it's okay to seek professional help when needed."
-            ]
-        elif "weight" in message or "lose" in message or "gain" in message:
-            responses = [
-                "Healthy weight management involves a combination of balanced nutrition and regular physical activity. Remember, sustainable changes work best! I can help you set realistic goals and track your progress.",
-                "Weight management is about creating healthy habits that last! Focus on nourishing your body with whole foods and staying active. What's your current approach to weight management?",
-                "Let's create a sustainable plan for healthy weight management! I'll help you set realistic goals and develop habits that support your long-term health and well-being."
-            ]
-        elif "diabetes" in message:
-            responses = [
-                "Diabetes management requires careful attention to diet, exercise, and blood glucose monitoring. I can help you understand how different foods and activities affect your blood sugar levels.",
-                "Managing diabetes effectively involves balancing medication, diet, and lifestyle. Let's create a comprehensive plan that helps you maintain stable blood glucose levels.",
-                "I'm here to support your diabetes management journey! Together, we can develop strategies for healthy eating, regular exercise, and effective blood glucose monitoring."
-            ]
-        else:
-            responses = [
-                "I'm here to help with your health and wellness journey! I can provide guidance on exercise, nutrition, sleep, stress management, and more. What specific aspect of your health would you like to focus on today?",
-                "Your health is my priority! I can assist with personalized advice on fitness, nutrition, mental wellness, and chronic disease management. What would you like to work on together?",
-                "I'm your personal health coach, ready to support you! Whether it's improving your fitness, optimizing your nutrition, or managing stress, I'm here to help you achieve your health goals."
-            ]
-        
-        return random.choice(responses)
-    
-    def _generate_suggestions(self, message: str, context: str) -> List[str]:
-        """Generate follow-up suggestions based on message content."""
-        suggestions = []
-        
-        if "workout" in message or "exercise" in message:
-            suggestions.extend([
-                "Create a personalized workout plan",
-                "Learn about different exercise types",
-                "Track your fitness progress"
-            ])
-        elif "diet" in message or "food" in message:
-            suggestions.extend([
-                "Get nutrition analysis for your meals",
-                "Learn about healthy food choices",
-                "Create a meal planning strategy"
-            ])
-        elif "sleep" in message:
-            suggestions.extend([
-                "Improve your sleep hygiene",
-                "Track your sleep patterns",
-                "Learn relaxation techniques"
-            ])
-        elif "stress" in message:
-            suggestions.extend([
-                "Practice mindfulness exercises",
-                "Learn stress management techniques",
-                "Create a self-care routine"
-            ])
-        else:
-            suggestions.extend([
-                "Set health goals",
-                "Track your progress",
-                "Get personalized recommendations"
-            ])
+    async def classify_messages(self, messages: List[str]) -> Dict[str, Any]:
+        """
+        Classify messages into chat intents without generating responses.
         
-        return suggestions[:3]  # Return top 3 suggestions
+        Args:
+            messages: Messages to classify
+            
+        Returns:
+            Dictionary with the intent, score and matched keywords of each message
+        """
+        return {
+            "results": self.intent_matcher.classify_batch(messages),
+            "total_messages": len(messages)
+        }
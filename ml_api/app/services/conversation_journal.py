@@ -0,0 +1,223 @@
+import json
+import os
+import threading
+import time
+import logging
+from typing import Dict, Any, Callable, Iterator, List, Optional, TextIO
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEGMENT_BYTES = 64 * 1024 * 1024
+DEFAULT_FSYNC_INTERVAL_SECONDS = 0.05
+DEFAULT_SNAPSHOT_INTERVAL_SECONDS = 300
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".log"
+SNAPSHOT_PREFIX = "snapshot-"
+SNAPSHOT_SUFFIX = ".jsonl"
+
+
+def _numbered(directory: str, prefix: str, suffix: str) -> List[int]:
+    """Sorted numbers of the files named <prefix><number><suffix> in a directory."""
+    numbers = []
+    for name in os.listdir(directory):
+        if name.startswith(prefix) and name.endswith(suffix):
+            number = name[len(prefix):-len(suffix)]
+            if number.isdigit():
+                numbers.append(int(number))
+    return sorted(numbers)
+
+
+class ConversationJournal:
+    """
+    Segmented append-only log of conversation changes, with snapshots.
+
+    Records are JSON lines appended to a buffered segment file; a
+    background thread flushes and fsyncs every fsync_interval seconds, so
+    a write costs a json.dumps and a buffer copy and at most the last
+    fsync_interval of changes can be lost in a crash. Segments rotate at
+    segment_bytes. Every snapshot_interval seconds the thread asks its
+    snapshot source for the full state, which rotates the log at the
+    same instant, writes it as snapshot-<n> (covering every segment
+    before n) and deletes the segments and snapshots it supersedes.
+    Recovery reads the newest snapshot and replays the segments after it;
+    a record torn by a crash at the end of a segment is skipped.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+        fsync_interval: float = DEFAULT_FSYNC_INTERVAL_SECONDS,
+        snapshot_interval: float = DEFAULT_SNAPSHOT_INTERVAL_SECONDS
+    ):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync_interval = fsync_interval
+        self.snapshot_interval = snapshot_interval
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._file: Optional[TextIO] = None
+        self._segment = 0
+        self._segment_size = 0
+        # Rotated files not yet fsynced and closed; only the flusher thread closes them
+        self._retired: List[TextIO] = []
+        self._records = 0
+        self._records_since_snapshot = 0
+        self._bytes = 0
+        self._last_snapshot_ms = 0.0
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    def read_snapshot(self) -> Iterator[Dict[str, Any]]:
+        """Entries of the newest snapshot, if any."""
+        snapshots = _numbered(self.directory, SNAPSHOT_PREFIX, SNAPSHOT_SUFFIX)
+        if not snapshots:
+            return
+        with open(self._snapshot_path(snapshots[-1]), encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+
+    def read_log(self) -> Iterator[Dict[str, Any]]:
+        """Records of the segments not covered by the newest snapshot, in write order."""
+        snapshots = _numbered(self.directory, SNAPSHOT_PREFIX, SNAPSHOT_SUFFIX)
+        first = snapshots[-1] if snapshots else 0
+        for segment in _numbered(self.directory, SEGMENT_PREFIX, SEGMENT_SUFFIX):
+            if segment < first:
+                continue
+            with open(self._segment_path(segment), encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        logger.warning(f"Skipping torn record at the end of chat log segment {segment}")
+                        break
+
+    def start(self, snapshot_source: Callable[[], tuple[int, List[Dict[str, Any]]]]):
+        """
+        Open a new segment for writing and start the flush/snapshot thread.
+
+        Args:
+            snapshot_source: Returns (segment, entries): calls rotate() and
+                captures the state at the same instant, under the caller's lock
+        """
+        segments = _numbered(self.directory, SEGMENT_PREFIX, SEGMENT_SUFFIX)
+        snapshots = _numbered(self.directory, SNAPSHOT_PREFIX, SNAPSHOT_SUFFIX)
+        # Never append to an existing segment, whose tail may be torn
+        self._open_segment(max(segments + snapshots, default=0) + 1)
+        self._thread = threading.Thread(
+            target=self._run, args=(snapshot_source,), name="chat-journal", daemon=True
+        )
+        self._thread.start()
+
+    def append(self, record: Dict[str, Any]):
+        """Buffer one record; it becomes durable at the next fsync."""
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._segment_size += len(line)
+            self._records += 1
+            self._records_since_snapshot += 1
+            self._bytes += len(line)
+            if self._segment_size >= self.segment_bytes:
+                self._rotate()
+
+    def rotate(self) -> int:
+        """Start a new segment and return its number."""
+        with self._lock:
+            self._rotate()
+            return self._segment
+
+    def stats(self) -> Dict[str, Any]:
+        """Write counters and snapshot timing."""
+        with self._lock:
+            return {
+                "directory": self.directory,
+                "segment": self._segment,
+                "records": self._records,
+                "bytes": self._bytes,
+                "records_since_snapshot": self._records_since_snapshot,
+                "last_snapshot_ms": round(self._last_snapshot_ms, 3),
+                "fsync_interval_seconds": self.fsync_interval
+            }
+
+    def close(self):
+        """Stop the thread and make everything written so far durable."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._flush()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _rotate(self):
+        """Retire the current segment and open the next; caller holds the lock."""
+        self._retired.append(self._file)
+        self._open_segment(self._segment + 1)
+
+    def _open_segment(self, segment: int):
+        self._file = open(self._segment_path(segment), "a", encoding="utf-8", buffering=1024 * 1024)
+        self._segment = segment
+        self._segment_size = 0
+
+    def _flush(self):
+        """Make buffered records durable without holding the lock during fsync."""
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.flush()
+            current = self._file
+            retired, self._retired = self._retired, []
+        for f in retired:
+            f.flush()
+            os.fsync(f.fileno())
+            f.close()
+        os.fsync(current.fileno())
+
+    def _snapshot(self, snapshot_source: Callable[[], tuple[int, List[Dict[str, Any]]]]):
+        """Write a snapshot and drop the files it supersedes."""
+        started = time.perf_counter()
+        with self._lock:
+            self._records_since_snapshot = 0
+        segment, entries = snapshot_source()
+
+        path = self._snapshot_path(segment)
+        with open(path + ".tmp", "w", encoding="utf-8", buffering=1024 * 1024) as f:
+            for entry in entries:
+                f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        # Segments must be durable before the files they replace are deleted
+        self._flush()
+
+        for old in _numbered(self.directory, SNAPSHOT_PREFIX, SNAPSHOT_SUFFIX):
+            if old < segment:
+                os.remove(self._snapshot_path(old))
+        for old in _numbered(self.directory, SEGMENT_PREFIX, SEGMENT_SUFFIX):
+            if old < segment:
+                os.remove(self._segment_path(old))
+
+        self._last_snapshot_ms = (time.perf_counter() - started) * 1000
+        logger.info(f"Chat snapshot of {len(entries)} conversations written in {self._last_snapshot_ms:.0f}ms")
+
+    def _run(self, snapshot_source: Callable[[], tuple[int, List[Dict[str, Any]]]]):
+        last_snapshot = time.monotonic()
+        while not self._stop.wait(self.fsync_interval):
+            try:
+                self._flush()
+                if self._records_since_snapshot and time.monotonic() - last_snapshot >= self.snapshot_interval:
+                    last_snapshot = time.monotonic()
+                    self._snapshot(snapshot_source)
+            except Exception as e:
+                logger.error(f"Chat journal flush failed: {str(e)}")
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{segment:08d}{SEGMENT_SUFFIX}")
+
+    def _snapshot_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{SNAPSHOT_PREFIX}{segment:08d}{SNAPSHOT_SUFFIX}")
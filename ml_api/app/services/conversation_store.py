@@ -0,0 +1,759 @@
+import json
+import os
+import threading
+import time
+import logging
+from abc import ABC, abstractmethod
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from services.conversation_journal import (
+    ConversationJournal,
+    DEFAULT_FSYNC_INTERVAL_SECONDS,
+    DEFAULT_SNAPSHOT_INTERVAL_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONVERSATIONS = 10000
+DEFAULT_MAX_MESSAGES = 200
+DEFAULT_TTL_SECONDS = 24 * 3600
+DEFAULT_SWEEP_INTERVAL_SECONDS = 60
+
+
+class ConversationStore(ABC):
+    """
+    Storage for chat conversations and their messages.
+
+    Conversations carry user_id, context, created_at and last_activity;
+    messages are plain dicts kept in arrival order, each stamped with a
+    per-conversation sequence number "seq" (0, 1, 2, ...) that pages of
+    history are addressed by. Implementations bound how much they keep:
+    at most max_messages per conversation (oldest dropped first) and
+    conversations idle for longer than ttl_seconds are evicted.
+
+    Each store also keeps a per-user index of conversation ids ordered by
+    last_activity, updated on every create, append and removal, so a
+    user's conversations are listed without scanning the others. List
+    cursors are (last_activity timestamp, conversation_id) pairs.
+    """
+
+    backend = "base"
+
+    @abstractmethod
+    async def create(self, conversation_id: str, user_id: str, context: str):
+        """Create an empty conversation."""
+
+    @abstractmethod
+    async def get(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        """Conversation metadata without messages, or None if unknown or expired."""
+
+    @abstractmethod
+    async def append_message(self, conversation_id: str, message: Dict[str, Any]) -> bool:
+        """Append a message and refresh last_activity; False if the conversation is gone."""
+
+    @abstractmethod
+    async def get_messages(
+        self,
+        conversation_id: str,
+        since: Optional[int] = None,
+        before: Optional[int] = None,
+        limit: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Read one page of messages, oldest first.
+
+        With since, returns the first limit messages with seq > since
+        (incremental polling). Otherwise returns the last limit messages
+        with seq < before, or the latest limit messages without before.
+
+        Returns:
+            Dictionary with "messages", "first_seq" (oldest retained) and
+            "next_seq" (seq the next message will get), or None if the
+            conversation is unknown or expired
+        """
+
+    @abstractmethod
+    async def delete(self, conversation_id: str) -> bool:
+        """Delete a conversation; False if it did not exist."""
+
+    @abstractmethod
+    async def list_conversations(
+        self,
+        user_id: str,
+        before: Optional[tuple[float, str]] = None,
+        limit: int = 20
+    ) -> Dict[str, Any]:
+        """
+        Read one page of a user's conversations, most recently active first.
+
+        Args:
+            user_id: User identifier
+            before: Cursor from the previous page; only older conversations follow
+            limit: Maximum number of conversations
+
+        Returns:
+            Dictionary with "conversations" (metadata as returned by get) and
+            "next_before", the cursor of the next page or None on the last one
+        """
+
+    @abstractmethod
+    async def stats(self) -> Dict[str, Any]:
+        """Size and eviction counters."""
+
+    async def close(self):
+        """Release background threads and connections."""
+
+
+def page_bounds(
+    first_seq: int,
+    next_seq: int,
+    since: Optional[int] = None,
+    before: Optional[int] = None,
+    limit: Optional[int] = None
+) -> tuple[int, int]:
+    """Half-open seq range [start, stop) of the page selected by since/before/limit."""
+    if since is not None:
+        start = max(first_seq, since + 1)
+        stop = next_seq if limit is None else min(next_seq, start + limit)
+    else:
+        stop = next_seq if before is None else max(first_seq, min(next_seq, before))
+        start = first_seq if limit is None else max(first_seq, stop - limit)
+    return start, max(start, stop)
+
+
+class MessageRing:
+    """
+    Append-only message buffer of fixed capacity addressed by sequence number.
+
+    Message seq lives in slot (seq - base) % capacity, so once full every
+    append overwrites the oldest message in place. Reading a page copies
+    only the page, never the whole history. base is the seq of the first
+    slot: 0 for new rings, the oldest retained seq for restored ones.
+    """
+
+    __slots__ = ("capacity", "slots", "next_seq", "base")
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        # Grown on demand up to capacity, so short conversations stay small
+        self.slots: List[Dict[str, Any]] = []
+        self.next_seq = 0
+        self.base = 0
+
+    @classmethod
+    def restore(cls, capacity: int, messages: List[Dict[str, Any]], next_seq: int) -> "MessageRing":
+        """Rebuild a ring from its retained messages (oldest first) and next seq."""
+        ring = cls(capacity)
+        ring.slots = list(messages[-capacity:]) if capacity > 0 else []
+        ring.next_seq = next_seq
+        ring.base = next_seq - len(ring.slots)
+        return ring
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    @property
+    def first_seq(self) -> int:
+        return self.next_seq - len(self.slots)
+
+    def append(self, message: Dict[str, Any]) -> int:
+        """Store a message and return its seq."""
+        seq = self.next_seq
+        if len(self.slots) < self.capacity:
+            self.slots.append(message)
+        else:
+            self.slots[(seq - self.base) % self.capacity] = message
+        self.next_seq += 1
+        return seq
+
+    def read(self, start: int, stop: int) -> List[Dict[str, Any]]:
+        """Messages with start <= seq < stop, clamped to what is retained."""
+        start = max(start, self.first_seq)
+        stop = min(stop, self.next_seq)
+        return [self.slots[(seq - self.base) % self.capacity] for seq in range(start, stop)]
+
+
+class _Conversation:
+    __slots__ = ("user_id", "context", "created_at", "last_activity", "messages")
+
+    def __init__(self, user_id: str, context: str, max_messages: int):
+        self.user_id = user_id
+        self.context = context
+        self.created_at = time.time()
+        self.last_activity = self.created_at
+        self.messages = MessageRing(max_messages)
+
+
+class InMemoryConversationStore(ConversationStore):
+    """
+    Bounded per-process conversation store.
+
+    Conversations live in an OrderedDict kept in last-activity order, so
+    both capacity eviction (max_conversations, least recently active
+    first) and the idle-TTL sweep only touch the conversations they
+    remove. A daemon thread sweeps every sweep_interval seconds; reads
+    also treat expired conversations as missing in between sweeps.
+    State is not shared between worker processes.
+
+    With a ConversationJournal, creates, appends and deletes are also
+    logged (inside the store lock, so the log order is the apply order)
+    and the store is rebuilt from the journal's snapshot and log on
+    startup. Evictions are not logged: replay re-applies the TTL and
+    max_conversations, and snapshots leave evicted conversations out.
+    """
+
+    backend = "memory"
+
+    def __init__(
+        self,
+        max_conversations: int = DEFAULT_MAX_CONVERSATIONS,
+        max_messages: int = DEFAULT_MAX_MESSAGES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        sweep_interval: float = DEFAULT_SWEEP_INTERVAL_SECONDS,
+        journal: Optional[ConversationJournal] = None
+    ):
+        self.max_conversations = max_conversations
+        self.max_messages = max_messages
+        self.ttl_seconds = ttl_seconds
+        self._conversations: "OrderedDict[str, _Conversation]" = OrderedDict()
+        # user_id -> sorted [(last_activity, conversation_id)]
+        self._by_user: Dict[str, List[tuple[float, str]]] = {}
+        self._lock = threading.Lock()
+        self._evicted_capacity = 0
+        self._evicted_idle = 0
+
+        self._journal = journal
+        if journal is not None:
+            self._restore(journal)
+            journal.start(self._snapshot_state)
+
+        self._stop = threading.Event()
+        self._sweeper = None
+        if sweep_interval > 0:
+            self._sweeper = threading.Thread(
+                target=self._sweep_loop, args=(sweep_interval,), name="chat-store-sweeper", daemon=True
+            )
+            self._sweeper.start()
+
+    async def create(self, conversation_id: str, user_id: str, context: str):
+        with self._lock:
+            self._remove(conversation_id)
+            conversation = _Conversation(user_id, context, self.max_messages)
+            self._conversations[conversation_id] = conversation
+            self._index(conversation_id, conversation)
+            if self._journal is not None:
+                self._journal.append({
+                    "op": "create",
+                    "id": conversation_id,
+                    "user_id": user_id,
+                    "context": context,
+                    "at": conversation.created_at
+                })
+            while len(self._conversations) > self.max_conversations:
+                self._remove(next(iter(self._conversations)))
+                self._evicted_capacity += 1
+
+    async def get(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            conversation = self._live(conversation_id)
+            if conversation is None:
+                return None
+            return self._metadata(conversation_id, conversation)
+
+    async def append_message(self, conversation_id: str, message: Dict[str, Any]) -> bool:
+        with self._lock:
+            conversation = self._live(conversation_id)
+            if conversation is None:
+                return False
+            message["seq"] = conversation.messages.append(message)
+            self._unindex(conversation_id, conversation)
+            conversation.last_activity = time.time()
+            self._index(conversation_id, conversation)
+            self._conversations.move_to_end(conversation_id)
+            if self._journal is not None:
+                self._journal.append({
+                    "op": "append",
+                    "id": conversation_id,
+                    "at": conversation.last_activity,
+                    "message": message
+                })
+            return True
+
+    async def get_messages(
+        self,
+        conversation_id: str,
+        since: Optional[int] = None,
+        before: Optional[int] = None,
+        limit: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            conversation = self._live(conversation_id)
+            if conversation is None:
+                return None
+            ring = conversation.messages
+            start, stop = page_bounds(ring.first_seq, ring.next_seq, since, before, limit)
+            return {
+                "messages": ring.read(start, stop),
+                "first_seq": ring.first_seq,
+                "next_seq": ring.next_seq
+            }
+
+    async def delete(self, conversation_id: str) -> bool:
+        with self._lock:
+            removed = self._remove(conversation_id)
+            if removed and self._journal is not None:
+                self._journal.append({"op": "delete", "id": conversation_id})
+            return removed
+
+    async def list_conversations(
+        self,
+        user_id: str,
+        before: Optional[tuple[float, str]] = None,
+        limit: int = 20
+    ) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._by_user.get(user_id, [])
+            position = len(entries) if before is None else bisect_left(entries, before)
+            # Entries are in activity order, so stop at the first one idle past the TTL
+            cutoff = time.time() - self.ttl_seconds
+            page = []
+            while position > 0 and len(page) < limit and entries[position - 1][0] >= cutoff:
+                position -= 1
+                page.append(entries[position])
+
+            more = position > 0 and entries[position - 1][0] >= cutoff
+            return {
+                "conversations": [self._metadata(cid, self._conversations[cid]) for _, cid in page],
+                "next_before": page[-1] if page and more else None
+            }
+
+    async def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": self.backend,
+                "conversations": len(self._conversations),
+                "users": len(self._by_user),
+                "messages": sum(len(c.messages) for c in self._conversations.values()),
+                "max_conversations": self.max_conversations,
+                "max_messages": self.max_messages,
+                "ttl_seconds": self.ttl_seconds,
+                "evicted_capacity": self._evicted_capacity,
+                "evicted_idle": self._evicted_idle,
+                "persistence": self._journal.stats() if self._journal is not None else None
+            }
+
+    async def close(self):
+        self._stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout=1)
+        if self._journal is not None:
+            self._journal.close()
+
+    def sweep(self) -> int:
+        """Evict conversations idle for longer than ttl_seconds; returns how many."""
+        cutoff = time.time() - self.ttl_seconds
+        evicted = 0
+        with self._lock:
+            # Oldest activity first, so stop at the first live conversation
+            while self._conversations:
+                conversation_id, conversation = next(iter(self._conversations.items()))
+                if conversation.last_activity >= cutoff:
+                    break
+                self._remove(conversation_id)
+                evicted += 1
+            self._evicted_idle += evicted
+        if evicted:
+            logger.info(f"Evicted {evicted} idle conversations")
+        return evicted
+
+    def _live(self, conversation_id: str) -> Optional[_Conversation]:
+        """Conversation if present and not idle past the TTL; caller holds the lock."""
+        conversation = self._conversations.get(conversation_id)
+        if conversation is not None and conversation.last_activity < time.time() - self.ttl_seconds:
+            self._remove(conversation_id)
+            self._evicted_idle += 1
+            return None
+        return conversation
+
+    def _remove(self, conversation_id: str) -> bool:
+        """Drop a conversation and its user index entry; caller holds the lock."""
+        conversation = self._conversations.pop(conversation_id, None)
+        if conversation is None:
+            return False
+        self._unindex(conversation_id, conversation)
+        return True
+
+    def _index(self, conversation_id: str, conversation: _Conversation):
+        """Add a conversation to its user's index; caller holds the lock."""
+        insort(self._by_user.setdefault(conversation.user_id, []), (conversation.last_activity, conversation_id))
+
+    def _unindex(self, conversation_id: str, conversation: _Conversation):
+        """Remove a conversation from its user's index; caller holds the lock."""
+        entries = self._by_user.get(conversation.user_id)
+        if not entries:
+            return
+        entry = (conversation.last_activity, conversation_id)
+        position = bisect_left(entries, entry)
+        if position < len(entries) and entries[position] == entry:
+            del entries[position]
+        if not entries:
+            del self._by_user[conversation.user_id]
+
+    @staticmethod
+    def _metadata(conversation_id: str, conversation: _Conversation) -> Dict[str, Any]:
+        """Conversation metadata as returned by get."""
+        return {
+            "conversation_id": conversation_id,
+            "user_id": conversation.user_id,
+            "context": conversation.context,
+            "created_at": datetime.fromtimestamp(conversation.created_at).isoformat(),
+            "last_activity": datetime.fromtimestamp(conversation.last_activity).isoformat(),
+            "message_count": len(conversation.messages)
+        }
+
+    def _restore(self, journal: ConversationJournal):
+        """Rebuild conversations from the journal's snapshot and log."""
+        started = time.perf_counter()
+        conversations: Dict[str, _Conversation] = {}
+        for entry in journal.read_snapshot():
+            conversation = _Conversation(entry["user_id"], entry["context"], self.max_messages)
+            conversation.created_at = entry["created_at"]
+            conversation.last_activity = entry["last_activity"]
+            conversation.messages = MessageRing.restore(self.max_messages, entry["messages"], entry["next_seq"])
+            conversations[entry["id"]] = conversation
+
+        records = 0
+        for record in journal.read_log():
+            records += 1
+            op = record["op"]
+            if op == "create":
+                conversation = _Conversation(record["user_id"], record["context"], self.max_messages)
+                conversation.created_at = conversation.last_activity = record["at"]
+                conversations[record["id"]] = conversation
+            elif op == "append":
+                conversation = conversations.get(record["id"])
+                # Skip messages the snapshot already holds
+                if conversation is not None and record["message"]["seq"] >= conversation.messages.next_seq:
+                    conversation.messages.append(record["message"])
+                    conversation.last_activity = record["at"]
+            elif op == "delete":
+                conversations.pop(record["id"], None)
+
+        cutoff = time.time() - self.ttl_seconds
+        live = sorted(
+            (item for item in conversations.items() if item[1].last_activity >= cutoff),
+            key=lambda item: item[1].last_activity
+        )
+        for conversation_id, conversation in live[max(len(live) - self.max_conversations, 0):]:
+            self._conversations[conversation_id] = conversation
+            self._index(conversation_id, conversation)
+
+        logger.info(
+            f"Restored {len(self._conversations)} conversations from {journal.directory} "
+            f"({records} log records) in {time.perf_counter() - started:.2f}s"
+        )
+
+    def _snapshot_state(self) -> tuple[int, List[Dict[str, Any]]]:
+        """Rotate the journal and capture every conversation at that instant."""
+        with self._lock:
+            segment = self._journal.rotate()
+            # Stored messages are never mutated, so the snapshot can share them
+            entries = [
+                {
+                    "id": conversation_id,
+                    "user_id": conversation.user_id,
+                    "context": conversation.context,
+                    "created_at": conversation.created_at,
+                    "last_activity": conversation.last_activity,
+                    "next_seq": conversation.messages.next_seq,
+                    "messages": conversation.messages.read(conversation.messages.first_seq, conversation.messages.next_seq)
+                }
+                for conversation_id, conversation in self._conversations.items()
+            ]
+        return segment, entries
+
+    def _sweep_loop(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Conversation sweep failed: {str(e)}")
+
+
+class RedisConversationStore(ConversationStore):
+    """
+    Conversation store shared by every worker through Redis.
+
+    Each conversation is a hash of metadata plus a list of JSON messages
+    capped with LTRIM. The hash holds next_seq; since the list is only
+    trimmed from the left, the message with seq s sits at list index
+    s - (next_seq - LLEN), so a page is a single LRANGE. Appends WATCH
+    the hash, so allocating the seq, pushing the message and trimming
+    happen as one transaction and list order always matches seq order.
+    Both keys get an EXPIRE of ttl_seconds refreshed on every write, so
+    Redis itself evicts idle conversations. A sorted set
+    of conversation ids by last activity enforces max_conversations, and
+    one sorted set per user (same scores, also expiring) is the user
+    index; members whose conversation has expired are dropped lazily when
+    the user's conversations are listed.
+    """
+
+    backend = "redis"
+
+    def __init__(
+        self,
+        client,
+        max_conversations: int = DEFAULT_MAX_CONVERSATIONS,
+        max_messages: int = DEFAULT_MAX_MESSAGES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        prefix: str = "healthsphere:chat:"
+    ):
+        self.client = client
+        self.max_conversations = max_conversations
+        self.max_messages = max_messages
+        self.ttl_seconds = int(ttl_seconds)
+        self.prefix = prefix
+        self._activity_key = f"{prefix}activity"
+
+    def _conversation_key(self, conversation_id: str) -> str:
+        return f"{self.prefix}conversation:{conversation_id}"
+
+    def _messages_key(self, conversation_id: str) -> str:
+        return f"{self.prefix}messages:{conversation_id}"
+
+    def _user_key(self, user_id: str) -> str:
+        return f"{self.prefix}user:{user_id}"
+
+    async def create(self, conversation_id: str, user_id: str, context: str):
+        now = time.time()
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hset(self._conversation_key(conversation_id), mapping={
+                "user_id": user_id,
+                "context": context,
+                "created_at": now,
+                "last_activity": now,
+                "next_seq": 0
+            })
+            pipe.expire(self._conversation_key(conversation_id), self.ttl_seconds)
+            pipe.zadd(self._activity_key, {conversation_id: now})
+            pipe.zadd(self._user_key(user_id), {conversation_id: now})
+            pipe.expire(self._user_key(user_id), self.ttl_seconds)
+            # Drop ids whose keys Redis has already expired
+            pipe.zremrangebyscore(self._activity_key, "-inf", now - self.ttl_seconds)
+            pipe.zcard(self._activity_key)
+            size = (await pipe.execute())[-1]
+
+        if size > self.max_conversations:
+            evicted = await self.client.zpopmin(self._activity_key, size - self.max_conversations)
+            if evicted:
+                ids = [self._decode(member) for member, _ in evicted]
+                users = await self._user_ids(ids)
+                async with self.client.pipeline(transaction=True) as pipe:
+                    pipe.delete(
+                        *[self._conversation_key(i) for i in ids],
+                        *[self._messages_key(i) for i in ids]
+                    )
+                    for conversation_id, owner in zip(ids, users):
+                        if owner is not None:
+                            pipe.zrem(self._user_key(owner), conversation_id)
+                    await pipe.execute()
+
+    async def get(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.hgetall(self._conversation_key(conversation_id))
+            pipe.llen(self._messages_key(conversation_id))
+            fields, message_count = await pipe.execute()
+        if not fields:
+            return None
+        return self._metadata(conversation_id, fields, message_count)
+
+    async def append_message(self, conversation_id: str, message: Dict[str, Any]) -> bool:
+        from redis.exceptions import WatchError
+
+        key = self._conversation_key(conversation_id)
+        async with self.client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    # Another worker's append, a delete or the key expiring
+                    # aborts the transaction, and the seq is allocated again
+                    await pipe.watch(key)
+                    seq, user_id = await pipe.hmget(key, "next_seq", "user_id")
+                    if seq is None:
+                        return False
+
+                    message["seq"] = int(seq)
+                    now = time.time()
+                    pipe.multi()
+                    pipe.rpush(self._messages_key(conversation_id), json.dumps(message))
+                    pipe.ltrim(self._messages_key(conversation_id), -self.max_messages, -1)
+                    pipe.hset(key, mapping={"next_seq": message["seq"] + 1, "last_activity": now})
+                    pipe.expire(key, self.ttl_seconds)
+                    pipe.expire(self._messages_key(conversation_id), self.ttl_seconds)
+                    pipe.zadd(self._activity_key, {conversation_id: now})
+                    if user_id is not None:
+                        pipe.zadd(self._user_key(self._decode(user_id)), {conversation_id: now})
+                        pipe.expire(self._user_key(self._decode(user_id)), self.ttl_seconds)
+                    await pipe.execute()
+                    return True
+                except WatchError:
+                    continue
+
+    async def get_messages(
+        self,
+        conversation_id: str,
+        since: Optional[int] = None,
+        before: Optional[int] = None,
+        limit: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hget(self._conversation_key(conversation_id), "next_seq")
+            pipe.llen(self._messages_key(conversation_id))
+            next_seq, length = await pipe.execute()
+        if next_seq is None:
+            return None
+
+        next_seq = int(next_seq)
+        first_seq = next_seq - length
+        start, stop = page_bounds(first_seq, next_seq, since, before, limit)
+        messages = []
+        if stop > start:
+            raw = await self.client.lrange(self._messages_key(conversation_id), start - first_seq, stop - first_seq - 1)
+            # A concurrent append or trim may have shifted the list; keep the requested seqs only
+            messages = [m for m in map(json.loads, raw) if start <= m["seq"] < stop]
+
+        return {"messages": messages, "first_seq": first_seq, "next_seq": next_seq}
+
+    async def delete(self, conversation_id: str) -> bool:
+        owner = (await self._user_ids([conversation_id]))[0]
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.delete(self._conversation_key(conversation_id), self._messages_key(conversation_id))
+            pipe.zrem(self._activity_key, conversation_id)
+            if owner is not None:
+                pipe.zrem(self._user_key(owner), conversation_id)
+            deleted = (await pipe.execute())[0]
+        return deleted > 0
+
+    async def list_conversations(
+        self,
+        user_id: str,
+        before: Optional[tuple[float, str]] = None,
+        limit: int = 20
+    ) -> Dict[str, Any]:
+        key = self._user_key(user_id)
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.zremrangebyscore(key, "-inf", time.time() - self.ttl_seconds)
+            if before is not None:
+                # Members tied with the cursor's score are fetched too and skipped below
+                pipe.zcount(key, before[0], before[0])
+            ties = (await pipe.execute())[1] if before is not None else 0
+
+        raw = await self.client.zrevrangebyscore(
+            key, before[0] if before is not None else "+inf", "-inf",
+            start=0, num=limit + 1 + ties, withscores=True
+        )
+        entries = [(score, self._decode(member)) for member, score in raw]
+        if before is not None:
+            entries = [entry for entry in entries if entry < before]
+        more = len(entries) > limit
+        entries = entries[:limit]
+
+        async with self.client.pipeline(transaction=False) as pipe:
+            for _, conversation_id in entries:
+                pipe.hgetall(self._conversation_key(conversation_id))
+                pipe.llen(self._messages_key(conversation_id))
+            results = await pipe.execute()
+
+        conversations, expired = [], []
+        for (_, conversation_id), fields, message_count in zip(entries, results[::2], results[1::2]):
+            if fields:
+                conversations.append(self._metadata(conversation_id, fields, message_count))
+            else:
+                expired.append(conversation_id)
+        if expired:
+            await self.client.zrem(key, *expired)
+
+        return {
+            "conversations": conversations,
+            "next_before": entries[-1] if entries and more else None
+        }
+
+    async def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "conversations": await self.client.zcard(self._activity_key),
+            "max_conversations": self.max_conversations,
+            "max_messages": self.max_messages,
+            "ttl_seconds": self.ttl_seconds
+        }
+
+    async def close(self):
+        await self.client.aclose()
+
+    async def _user_ids(self, conversation_ids: List[str]) -> List[Optional[str]]:
+        """Owner of each conversation, None for expired ones."""
+        async with self.client.pipeline(transaction=False) as pipe:
+            for conversation_id in conversation_ids:
+                pipe.hget(self._conversation_key(conversation_id), "user_id")
+            owners = await pipe.execute()
+        return [self._decode(owner) if owner is not None else None for owner in owners]
+
+    def _metadata(self, conversation_id: str, fields: Dict[Any, Any], message_count: int) -> Dict[str, Any]:
+        """Conversation metadata from a raw conversation hash."""
+        fields = {self._decode(k): self._decode(v) for k, v in fields.items()}
+        return {
+            "conversation_id": conversation_id,
+            "user_id": fields["user_id"],
+            "context": fields["context"],
+            "created_at": datetime.fromtimestamp(float(fields["created_at"])).isoformat(),
+            "last_activity": datetime.fromtimestamp(float(fields["last_activity"])).isoformat(),
+            "message_count": message_count
+        }
+
+    @staticmethod
+    def _decode(value) -> str:
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def create_conversation_store() -> ConversationStore:
+    """
+    Create the store selected by CHAT_STORE_BACKEND ("memory" or "redis").
+
+    Falls back to the in-memory store when Redis is unavailable. The
+    in-memory store is made durable by setting CHAT_PERSISTENCE_DIR.
+    """
+    backend = os.getenv("CHAT_STORE_BACKEND", InMemoryConversationStore.backend)
+    limits = {
+        "max_conversations": int(os.getenv("CHAT_MAX_CONVERSATIONS", DEFAULT_MAX_CONVERSATIONS)),
+        "max_messages": int(os.getenv("CHAT_MAX_MESSAGES", DEFAULT_MAX_MESSAGES)),
+        "ttl_seconds": float(os.getenv("CHAT_CONVERSATION_TTL_SECONDS", DEFAULT_TTL_SECONDS))
+    }
+
+    if backend == RedisConversationStore.backend:
+        try:
+            import redis.asyncio as redis
+
+            client = redis.Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379"))
+            logger.info("Chat conversations stored in Redis")
+            return RedisConversationStore(client, **limits)
+        except Exception as e:
+            logger.error(f"Failed to set up Redis conversation store: {str(e)}")
+    elif backend != InMemoryConversationStore.backend:
+        logger.error(f"Unknown chat store backend '{backend}', using in-memory store")
+
+    journal = None
+    persistence_dir = os.getenv("CHAT_PERSISTENCE_DIR")
+    if persistence_dir:
+        journal = ConversationJournal(
+            persistence_dir,
+            fsync_interval=float(os.getenv("CHAT_PERSISTENCE_FSYNC_MS", DEFAULT_FSYNC_INTERVAL_SECONDS * 1000)) / 1000,
+            snapshot_interval=float(os.getenv("CHAT_PERSISTENCE_SNAPSHOT_SECONDS", DEFAULT_SNAPSHOT_INTERVAL_SECONDS))
+        )
+
+    return InMemoryConversationStore(
+        sweep_interval=float(os.getenv("CHAT_SWEEP_INTERVAL_SECONDS", DEFAULT_SWEEP_INTERVAL_SECONDS)),
+        journal=journal,
+        **limits
+    )
@@ -0,0 +1,54 @@
+import math
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+# Request deadline on the time.monotonic() clock; None means no deadline.
+# Set per request by the deadline middleware and by pool workers.
+deadline_var: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+# Error of batch items left undone when the deadline hit
+SKIPPED_MESSAGE = "Skipped: request deadline exceeded"
+
+
+class DeadlineExceeded(Exception):
+    """The request's deadline passed, or will pass before the work could finish."""
+
+
+def parse_deadline(header: str) -> float:
+    """
+    Convert an X-Request-Deadline header, the absolute deadline in Unix
+    epoch milliseconds, to the local monotonic clock.
+
+    Raises:
+        ValueError: If the header is not a finite number
+    """
+    deadline_ms = float(header)
+    if not math.isfinite(deadline_ms):
+        raise ValueError(f"Deadline must be finite, got {header!r}")
+    return time.monotonic() + (deadline_ms / 1000 - time.time())
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current request's deadline, or None without one."""
+    deadline = deadline_var.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def expired() -> bool:
+    """Whether the current request's deadline has passed."""
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def check_deadline(what: str):
+    """
+    Raise DeadlineExceeded before starting `what` if the deadline passed.
+
+    Raises:
+        DeadlineExceeded: If the current request's deadline has passed
+    """
+    if expired():
+        raise DeadlineExceeded(f"Request deadline exceeded before {what}")
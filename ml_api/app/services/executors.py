@@ -0,0 +1,267 @@
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Any, Callable, List, Optional
+
+from services.metrics import REGISTRY
+from services.deadlines import DeadlineExceeded, deadline_var
+
+# Seconds a rejected caller is asked to wait before retrying
+RETRY_AFTER_SECONDS = 1
+
+# Pending work allowed per worker before new calls are rejected
+DEFAULT_QUEUE_PER_WORKER = 8
+
+# Weight of the latest call in a pool's moving average run time
+RUN_TIME_SMOOTHING = 0.1
+
+WAIT_SECONDS = REGISTRY.histogram(
+    "healthsphere_executor_wait_seconds",
+    "Time CPU-bound calls waited in a pool's queue before a worker picked them up",
+    ("pool",)
+)
+RUN_SECONDS = REGISTRY.histogram(
+    "healthsphere_executor_run_seconds",
+    "Time CPU-bound calls ran on a pool worker",
+    ("pool",)
+)
+REJECTED_TOTAL = REGISTRY.counter(
+    "healthsphere_executor_rejected_total",
+    "Calls rejected because the pool's queue was full",
+    ("pool",)
+)
+DEADLINE_TOTAL = REGISTRY.counter(
+    "healthsphere_executor_deadline_exceeded_total",
+    "Calls given up because of the request deadline: skipped before queueing, cancelled while queued, or abandoned while running",
+    ("pool", "when")
+)
+
+_pools: List["BoundedExecutor"] = []
+
+
+class PoolSaturated(Exception):
+    """A pool's queue is full; the caller should answer 503 with Retry-After."""
+
+    def __init__(self, pool: str, pending: int):
+        super().__init__(f"The {pool} pool is saturated ({pending} calls pending); retry shortly")
+        self.pool = pool
+        self.retry_after = RETRY_AFTER_SECONDS
+
+
+def _timed_call(fn: Callable, args: tuple, kwargs: Dict[str, Any]) -> tuple[float, Any]:
+    """
+    Run fn on a worker and report when it started (monotonic, comparable
+    across processes on one host).
+    """
+    started = time.monotonic()
+    deadline = deadline_var.get()
+    if deadline is not None and started >= deadline:
+        # Picked up after the caller gave up
+        raise DeadlineExceeded("Request deadline exceeded while queued")
+    return started, fn(*args, **kwargs)
+
+
+class BoundedExecutor:
+    """
+    Thread or process pool with a bounded queue for CPU-bound calls.
+
+    run() rejects a call with PoolSaturated as soon as workers +
+    queue_size calls are pending, instead of letting the backlog and
+    every caller's latency grow without bound. Queue wait and run time
+    are recorded per pool.
+
+    Calls honour the request deadline: a call is skipped when less time
+    is left than the pool's average run time, a queued call is cancelled
+    when the deadline passes, and a running one is abandoned (it
+    finishes, but nobody waits for it). Cancelling the awaiting task, as
+    a client disconnect does, also removes a queued call.
+
+    Thread pool calls run in a copy of the caller's context, as with
+    asyncio.to_thread, so the request ID, log sampling decision and
+    deadline stay visible to the called function and its logs. Process
+    pools cannot carry a context across.
+
+    Process pools need picklable, module-level
+    callables; thread pools suit NumPy, OpenCV, PIL and scikit-learn work,
+    which mostly releases the GIL.
+    """
+
+    def __init__(self, name: str, workers: int, queue_size: int, kind: str = "thread"):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown pool kind: {kind}")
+        self.name = name
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self.kind = kind
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+        self._avg_run_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.queue_size
+
+    @property
+    def expected_run_seconds(self) -> float:
+        """Moving average run time of recent calls."""
+        return self._avg_run_seconds
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Run fn(*args, **kwargs) on a worker and await its result.
+
+        Raises:
+            PoolSaturated: If the pool already has capacity calls pending
+            DeadlineExceeded: If the request deadline passes, or too little
+                time is left to finish
+        """
+        deadline = deadline_var.get()
+        timeout = None
+        if deadline is not None:
+            timeout = deadline - time.monotonic()
+            if timeout <= self._avg_run_seconds:
+                DEADLINE_TOTAL.labels(self.name, "skipped").inc()
+                raise DeadlineExceeded(f"Request deadline too close to start {self.name} work")
+        
+        with self._lock:
+            if self._pending >= self.capacity:
+                REJECTED_TOTAL.labels(self.name).inc()
+                raise PoolSaturated(self.name, self._pending)
+            self._pending += 1
+
+        submitted = time.monotonic()
+        try:
+            if self.kind == "thread":
+                context = contextvars.copy_context()
+                future = self._get_executor().submit(context.run, _timed_call, fn, args, kwargs)
+            else:
+                future = self._get_executor().submit(_timed_call, fn, args, kwargs)
+        except BaseException:
+            self._release()
+            raise
+        # Runs when the call finishes, or at once if cancelled while queued
+        future.add_done_callback(self._release)
+
+        try:
+            # Timing out or being cancelled cancels the future, which drops a queued call
+            started, result = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            DEADLINE_TOTAL.labels(self.name, "running" if future.running() else "queued").inc()
+            raise DeadlineExceeded(f"Request deadline exceeded in the {self.name} pool")
+        except DeadlineExceeded:
+            DEADLINE_TOTAL.labels(self.name, "queued").inc()
+            raise
+        
+        run_seconds = time.monotonic() - started
+        WAIT_SECONDS.labels(self.name).observe(started - submitted)
+        RUN_SECONDS.labels(self.name).observe(run_seconds)
+        self._avg_run_seconds += RUN_TIME_SMOOTHING * (run_seconds - self._avg_run_seconds)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Calls running and queued right now."""
+        pending = self._pending
+        active = min(pending, self.workers)
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "active": active,
+            "queued": pending - active
+        }
+
+    def shutdown(self):
+        """Drop queued calls and stop the workers without waiting for running ones."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _get_executor(self) -> Executor:
+        # Created on first use, so importing a service does not start workers
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.kind == "process":
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=self.name)
+        return self._executor
+
+    def _release(self, future=None):
+        with self._lock:
+            self._pending -= 1
+
+
+def declare_pool(
+    name: str,
+    env_prefix: str,
+    workers: Optional[int] = None,
+    queue_size: Optional[int] = None,
+    kind: str = "thread"
+) -> BoundedExecutor:
+    """
+    Create a named pool for a service's CPU-bound operations.
+
+    <env_prefix>_WORKERS and <env_prefix>_QUEUE override the sizes.
+
+    Args:
+        name: Pool name used in metrics and errors, e.g. "food-decode"
+        env_prefix: Environment variable prefix, e.g. "FOOD_DECODE"
+        workers: Default worker count (the CPU count if not given)
+        queue_size: Default number of calls allowed to wait for a worker
+            (DEFAULT_QUEUE_PER_WORKER per worker if not given)
+        kind: "thread" or "process"
+    """
+    workers = int(os.getenv(f"{env_prefix}_WORKERS", workers or os.cpu_count() or 4))
+    queue_size = int(os.getenv(f"{env_prefix}_QUEUE", queue_size if queue_size is not None else workers * DEFAULT_QUEUE_PER_WORKER))
+    pool = BoundedExecutor(name, workers, queue_size, kind)
+    _pools.append(pool)
+    return pool
+
+
+def offload(pool: BoundedExecutor):
+    """
+    Turn a synchronous CPU-bound function or method into a coroutine
+    function that runs it in pool, keeping the event loop free.
+    """
+    if pool.kind == "process":
+        # The decorated name refers to the wrapper, so the original cannot be pickled
+        raise ValueError("offload needs a thread pool; call pool.run with a module-level function instead")
+
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            return await pool.run(fn, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Stats of every declared pool, by name."""
+    return {pool.name: pool.stats() for pool in _pools}
+
+
+def shutdown_pools():
+    """Shut down every declared pool."""
+    for pool in _pools:
+        pool.shutdown()
+
+
+def _pool_metrics():
+    """Queue depth and busy workers of every pool for the /metrics endpoint."""
+    stats = pool_stats()
+    return [
+        ("healthsphere_executor_queued", "gauge", "Calls waiting for a pool worker",
+         [({"pool": name}, s["queued"]) for name, s in stats.items()]),
+        ("healthsphere_executor_active", "gauge", "Pool workers running a call",
+         [({"pool": name}, s["active"]) for name, s in stats.items()]),
+        ("healthsphere_executor_capacity", "gauge", "Calls a pool accepts before rejecting new ones",
+         [({"pool": name}, s["workers"] + s["queue_size"]) for name, s in stats.items()])
+    ]
+
+REGISTRY.register_collector(_pool_metrics)
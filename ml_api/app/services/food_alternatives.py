@@ -0,0 +1,240 @@
+import numpy as np
+import logging
+from typing import Dict, Any, List, Optional, Sequence
+from scipy.spatial import cKDTree
+
+from services.array_store import StringTable, save_arrays, load_arrays
+from services.nutrient_aggregation import NUTRIENTS
+
+logger = logging.getLogger(__name__)
+
+# Allergen vocabulary; bit i of a food's allergen mask is ALLERGENS[i]
+ALLERGENS = ("gluten", "dairy", "fish", "shellfish", "egg", "soy", "peanuts", "tree_nuts", "sesame")
+
+CALORIES = NUTRIENTS.index("calories")
+PROTEIN = NUTRIENTS.index("protein")
+
+# Neighbours examined per allergen group before giving up on constraints
+MAX_SEARCH_WIDTH = 1024
+
+
+def allergen_mask(allergens: Sequence[str]) -> int:
+    """Encode allergen names as a bitmask over ALLERGENS."""
+    mask = 0
+    for allergen in allergens:
+        if allergen not in ALLERGENS:
+            raise ValueError(f"Unknown allergen '{allergen}', expected one of {', '.join(ALLERGENS)}")
+        mask |= 1 << ALLERGENS.index(allergen)
+    return mask
+
+
+def allergen_names(mask: int) -> List[str]:
+    """Decode an allergen bitmask."""
+    return [allergen for i, allergen in enumerate(ALLERGENS) if mask >> i & 1]
+
+
+class FoodAlternativesIndex:
+    """
+    Nearest foods in normalized nutrient space.
+
+    Nutrient vectors are z-scored per nutrient. Rows are grouped by
+    allergen bitmask and every group gets its own KD-tree, so excluding
+    allergens drops whole groups before any tree is searched instead of
+    filtering neighbours afterwards. Nutrient constraints ("fewer
+    calories", "more protein") are checked on the returned neighbours,
+    widening the search until enough candidates pass or MAX_SEARCH_WIDTH
+    neighbours have been examined, which bounds worst-case latency.
+    """
+
+    def __init__(
+        self,
+        names: StringTable,
+        nutrients: np.ndarray,
+        allergen_masks: np.ndarray,
+        sorted_name_rows: np.ndarray
+    ):
+        self.names = names
+        self.nutrients = nutrients
+        self.allergen_masks = allergen_masks
+        self.sorted_name_rows = sorted_name_rows
+
+        values = np.asarray(nutrients, dtype=np.float64)
+        self.mean = values.mean(axis=0) if len(values) else np.zeros(len(NUTRIENTS))
+        std = values.std(axis=0) if len(values) else np.ones(len(NUTRIENTS))
+        self.std = np.where(std > 0, std, 1.0)
+
+        # Rows are stored grouped by mask, so each group is one contiguous slice
+        self.group_masks, group_starts = np.unique(np.asarray(allergen_masks), return_index=True)
+        group_ends = np.append(group_starts[1:], len(values))
+        self.group_starts = group_starts
+        self.trees = [
+            cKDTree((values[start:end] - self.mean) / self.std)
+            for start, end in zip(group_starts, group_ends)
+        ]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @classmethod
+    def build(
+        cls,
+        names: Sequence[str],
+        nutrients: np.ndarray,
+        allergens: Sequence[Sequence[str]]
+    ) -> "FoodAlternativesIndex":
+        """
+        Build an index over foods.
+
+        Args:
+            names: Food names
+            nutrients: Per-100 g values of shape (len(names), len(NUTRIENTS))
+            allergens: Allergen names of each food
+
+        Returns:
+            In-memory FoodAlternativesIndex
+        """
+        masks = np.array([allergen_mask(food_allergens) for food_allergens in allergens], dtype=np.int64)
+        order = np.argsort(masks, kind="stable")
+        names = [names[row] for row in order]
+        encoded = [name.encode("utf-8") for name in names]
+
+        return cls(
+            names=StringTable.from_strings(names),
+            nutrients=np.asarray(nutrients, dtype=np.float32).reshape(len(order), len(NUTRIENTS))[order],
+            allergen_masks=masks[order],
+            sorted_name_rows=np.array(sorted(range(len(names)), key=encoded.__getitem__), dtype=np.int64)
+        )
+
+    def save(self, directory: str):
+        """Write the index to a directory of .npy files; trees are rebuilt on load."""
+        arrays = {
+            "nutrients": self.nutrients,
+            "allergen_masks": self.allergen_masks,
+            "sorted_name_rows": self.sorted_name_rows,
+            **self.names.to_arrays("names")
+        }
+        save_arrays(directory, arrays, metadata={
+            "type": "food_alternatives",
+            "size": len(self),
+            "nutrients": list(NUTRIENTS),
+            "allergens": list(ALLERGENS)
+        })
+        logger.info(f"Food alternatives index with {len(self)} foods saved to {directory}")
+
+    @classmethod
+    def load(cls, directory: str) -> "FoodAlternativesIndex":
+        """Open an index written by save."""
+        arrays, metadata = load_arrays(directory)
+        if metadata.get("nutrients") != list(NUTRIENTS) or metadata.get("allergens") != list(ALLERGENS):
+            raise ValueError(f"Food alternatives index at {directory} was built with a different schema")
+
+        index = cls(
+            names=StringTable.from_arrays(arrays, "names"),
+            nutrients=arrays["nutrients"],
+            allergen_masks=arrays["allergen_masks"],
+            sorted_name_rows=arrays["sorted_name_rows"]
+        )
+        logger.info(f"Food alternatives index with {len(index)} foods loaded from {directory}")
+        return index
+
+    def find_row(self, name: str) -> Optional[int]:
+        """Row of an exact food name, by binary search over the sorted names."""
+        target = name.encode("utf-8")
+        low, high = 0, len(self.sorted_name_rows)
+        while low < high:
+            middle = (low + high) // 2
+            if self.names.get_bytes(int(self.sorted_name_rows[middle])) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self.sorted_name_rows):
+            row = int(self.sorted_name_rows[low])
+            if self.names.get_bytes(row) == target:
+                return row
+        return None
+
+    def query(
+        self,
+        nutrients: Sequence[float],
+        k: int = 5,
+        exclude_allergens: int = 0,
+        max_calories: Optional[float] = None,
+        min_protein: Optional[float] = None,
+        exclude_row: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Find the k foods closest to a nutrient vector.
+
+        Args:
+            nutrients: Per-100 g values in NUTRIENTS order
+            k: Number of foods to return
+            exclude_allergens: Bitmask of allergens the results must not contain
+            max_calories: Only foods with strictly fewer calories
+            min_protein: Only foods with strictly more protein
+            exclude_row: Row to leave out (normally the query food itself)
+
+        Returns:
+            Foods ordered by distance, each with name, distance, nutrition
+            and allergens
+        """
+        point = (np.asarray(nutrients, dtype=np.float64) - self.mean) / self.std
+
+        rows, distances = [], []
+        for group, tree in enumerate(self.trees):
+            if int(self.group_masks[group]) & exclude_allergens:
+                continue
+            group_rows, group_distances = self._query_tree(
+                group, tree, point, k, max_calories, min_protein, exclude_row
+            )
+            rows.append(group_rows)
+            distances.append(group_distances)
+
+        if not rows:
+            return []
+
+        rows = np.concatenate(rows)
+        distances = np.concatenate(distances)
+        best = np.argsort(distances, kind="stable")[:k]
+
+        return [
+            {
+                "food_name": self.names[int(rows[i])],
+                "distance": round(float(distances[i]), 4),
+                "nutrition": dict(zip(NUTRIENTS, np.round(self.nutrients[rows[i]].astype(np.float64), 2).tolist())),
+                "allergens": allergen_names(int(self.allergen_masks[rows[i]]))
+            }
+            for i in best
+        ]
+
+    def _query_tree(
+        self,
+        group: int,
+        tree: cKDTree,
+        point: np.ndarray,
+        k: int,
+        max_calories: Optional[float],
+        min_protein: Optional[float],
+        exclude_row: Optional[int]
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Up to k constrained neighbours from one group, doubling the search width as needed."""
+        start = self.group_starts[group]
+        limit = min(tree.n, max(MAX_SEARCH_WIDTH, k))
+        # Each half-space constraint passes roughly half of the neighbours
+        constraints = (max_calories is not None) + (min_protein is not None)
+        width = min(limit, (k + 1) * 4 ** constraints)
+        while True:
+            distances, local = tree.query(point, k=width)
+            distances = np.atleast_1d(distances)
+            rows = np.atleast_1d(local) + start
+
+            keep = np.ones(len(rows), dtype=bool)
+            if max_calories is not None:
+                keep &= self.nutrients[rows, CALORIES] < max_calories
+            if min_protein is not None:
+                keep &= self.nutrients[rows, PROTEIN] > min_protein
+            if exclude_row is not None:
+                keep &= rows != exclude_row
+
+            if keep.sum() >= k or width >= limit:
+                return rows[keep][:k], distances[keep][:k]
+            width = min(limit, width * 4)
@@ -0,0 +1,417 @@
+import threading
+import cv2
+import numpy as np
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, Any, List, Optional, Sequence
+from scipy import sparse
+
+from services.array_store import StringTable, save_arrays, load_arrays
+from services.inference_backends import InferenceBackend
+
+logger = logging.getLogger(__name__)
+
+# Colour histogram bins over (hue, saturation, value)
+HSV_BINS = (8, 4, 4)
+# Gradient orientation bins per cell and cells per image side
+ORIENTATION_BINS = 16
+GRID = 2
+EMBEDDING_DIM = int(np.prod(HSV_BINS)) + ORIENTATION_BINS * GRID * GRID
+
+# Reference sets above this size get an IVF-PQ index instead of brute force
+FLAT_INDEX_LIMIT = 50000
+
+# Softmax temperature for turning neighbour similarities into vote weights
+VOTE_TEMPERATURE = 0.05
+
+
+def compute_embedding(image: np.ndarray) -> np.ndarray:
+    """
+    Compact colour/texture descriptor of an RGB uint8 image.
+
+    Concatenates an HSV colour histogram with magnitude-weighted gradient
+    orientation histograms on a 2x2 grid, applies the Hellinger (square
+    root) map and L2-normalizes, so cosine similarity is a dot product.
+    """
+    small = cv2.resize(image, (64, 64), interpolation=cv2.INTER_AREA)
+
+    hsv = cv2.cvtColor(small, cv2.COLOR_RGB2HSV)
+    colour = cv2.calcHist([hsv], [0, 1, 2], None, list(HSV_BINS), [0, 180, 0, 256, 0, 256]).ravel()
+    colour /= max(colour.sum(), 1.0)
+
+    gray = cv2.cvtColor(small, cv2.COLOR_RGB2GRAY).astype(np.float32)
+    gx = cv2.Sobel(gray, cv2.CV_32F, 1, 0, ksize=3)
+    gy = cv2.Sobel(gray, cv2.CV_32F, 0, 1, ksize=3)
+    magnitude, angle = cv2.cartToPolar(gx, gy)
+    bins = (angle * (ORIENTATION_BINS / (2 * np.pi))).astype(np.int32) % ORIENTATION_BINS
+
+    cell = small.shape[0] // GRID
+    texture = []
+    for row in range(GRID):
+        for col in range(GRID):
+            window = (slice(row * cell, (row + 1) * cell), slice(col * cell, (col + 1) * cell))
+            texture.append(np.bincount(bins[window].ravel(), weights=magnitude[window].ravel(), minlength=ORIENTATION_BINS))
+    texture = np.concatenate(texture).astype(np.float32)
+    texture /= max(texture.sum(), 1e-6)
+
+    embedding = np.sqrt(np.concatenate([colour, texture]))
+    return (embedding / max(np.linalg.norm(embedding), 1e-6)).astype(np.float32)
+
+
+def compute_embeddings(batch: np.ndarray) -> np.ndarray:
+    """Embed a uint8 image batch (N, H, W, C)."""
+    return np.stack([compute_embedding(image) for image in batch]) if len(batch) else \
+        np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+
+
+def _kmeans(x: np.ndarray, k: int, iterations: int = 20, seed: int = 0) -> np.ndarray:
+    """Plain Lloyd's k-means; returns (k, d) float32 centroids."""
+    rng = np.random.default_rng(seed)
+    k = min(k, len(x))
+    centroids = x[rng.choice(len(x), k, replace=False)].astype(np.float32)
+    for _ in range(iterations):
+        assignment = _assign(x, centroids)
+        counts = np.bincount(assignment, minlength=k).astype(np.float32)
+        membership = sparse.csr_matrix(
+            (np.ones(len(x), dtype=np.float32), (assignment, np.arange(len(x)))), shape=(k, len(x))
+        )
+        sums = np.asarray(membership @ x, dtype=np.float32)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, np.newaxis]
+        if empty.any():
+            centroids[empty] = x[rng.choice(len(x), int(empty.sum()), replace=False)]
+    return centroids
+
+
+def _assign(x: np.ndarray, centroids: np.ndarray, chunk: int = 65536) -> np.ndarray:
+    """Nearest centroid (L2) of every row, computed in chunks to bound memory."""
+    centroid_norms = (centroids ** 2).sum(axis=1)
+    out = np.empty(len(x), dtype=np.int64)
+    for start in range(0, len(x), chunk):
+        block = x[start:start + chunk]
+        out[start:start + chunk] = np.argmin(centroid_norms - 2 * block @ centroids.T, axis=1)
+    return out
+
+
+class VectorIndex(ABC):
+    """
+    In-process nearest-neighbour index over L2-normalized embeddings.
+
+    Every stored vector carries an integer label id into `label_names`.
+    Search returns similarities on the cosine scale for both index kinds.
+    """
+
+    kind = "base"
+
+    def __init__(self, label_ids: np.ndarray, label_names: List[str]):
+        self.label_ids = label_ids
+        self.label_names = label_names
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.label_ids)
+
+    @abstractmethod
+    def search(self, queries: np.ndarray, k: int = 10) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Return (label ids, similarities), each (n_queries, k), best first.
+
+        Slots without a neighbour (too few references) hold label id -1
+        and similarity -inf.
+        """
+
+    @abstractmethod
+    def add(self, vectors: np.ndarray, labels: Sequence[str]):
+        """Add reference embeddings; unseen labels become new classes."""
+
+    @abstractmethod
+    def save(self, directory: str):
+        """Write the index to a directory that VectorIndex.load can open."""
+
+    def _label_ids_for(self, labels: Sequence[str]) -> np.ndarray:
+        positions = {name: i for i, name in enumerate(self.label_names)}
+        for name in labels:
+            if name not in positions:
+                positions[name] = len(self.label_names)
+                self.label_names.append(name)
+        return np.array([positions[name] for name in labels], dtype=np.int32)
+
+    @staticmethod
+    def load(directory: str, mmap: bool = True) -> "VectorIndex":
+        """Open an index of either kind, memory-mapped by default."""
+        arrays, metadata = load_arrays(directory, mmap=mmap)
+        label_names = StringTable.from_arrays(arrays, "label_names").to_list()
+        if metadata.get("kind") == IVFPQIndex.kind:
+            index = IVFPQIndex(
+                centroids=arrays["centroids"],
+                codebooks=arrays["codebooks"],
+                list_offsets=arrays["list_offsets"],
+                codes=arrays["codes"],
+                label_ids=arrays["label_ids"],
+                label_names=label_names,
+                nprobe=metadata.get("nprobe", 16)
+            )
+        else:
+            index = FlatIndex(arrays["vectors"], arrays["label_ids"], label_names)
+        logger.info(f"Loaded {index.kind} food embedding index with {len(index)} references from {directory}")
+        return index
+
+
+class FlatIndex(VectorIndex):
+    """Exact search by one float32 matrix product; right for small reference sets."""
+
+    kind = "flat"
+
+    def __init__(self, vectors: np.ndarray, label_ids: np.ndarray, label_names: List[str]):
+        super().__init__(label_ids, label_names)
+        self.vectors = vectors
+
+    def search(self, queries: np.ndarray, k: int = 10) -> tuple[np.ndarray, np.ndarray]:
+        if len(self) == 0:
+            return np.full((len(queries), k), -1, dtype=np.int64), np.full((len(queries), k), -np.inf, dtype=np.float32)
+        k = min(k, len(self))
+        similarities = queries @ self.vectors.T
+        top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(similarities, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        return np.asarray(self.label_ids)[top], np.take_along_axis(top_scores, order, axis=1)
+
+    def add(self, vectors: np.ndarray, labels: Sequence[str]):
+        with self._lock:
+            label_ids = self._label_ids_for(labels)
+            self.vectors = np.concatenate([self.vectors, vectors.astype(np.float32)])
+            self.label_ids = np.concatenate([self.label_ids, label_ids])
+
+    def save(self, directory: str):
+        save_arrays(
+            directory,
+            {"vectors": self.vectors, "label_ids": self.label_ids,
+             **StringTable.from_strings(self.label_names).to_arrays("label_names")},
+            metadata={"kind": self.kind, "size": len(self), "dim": int(self.vectors.shape[1])}
+        )
+
+
+class IVFPQIndex(VectorIndex):
+    """
+    Inverted-file index with product-quantized residuals.
+
+    A coarse k-means quantizer splits references into `nlist` lists; each
+    reference is stored as `m` uint8 codes of its residual to the list
+    centroid. A query scans only the `nprobe` closest lists and scores
+    codes with per-subspace lookup tables (asymmetric distance), so a
+    million references cost a few thousand table lookups per query.
+    """
+
+    kind = "ivfpq"
+
+    def __init__(
+        self,
+        centroids: np.ndarray,
+        codebooks: np.ndarray,
+        list_offsets: np.ndarray,
+        codes: np.ndarray,
+        label_ids: np.ndarray,
+        label_names: List[str],
+        nprobe: int = 16
+    ):
+        super().__init__(label_ids, label_names)
+        self.centroids = centroids
+        self.codebooks = codebooks
+        self.list_offsets = list_offsets
+        self.codes = codes
+        self.nprobe = nprobe
+        self.m, self.ksub, self.dsub = codebooks.shape
+        self._centroid_norms = (np.asarray(centroids) ** 2).sum(axis=1)
+        self._codebooks_t = np.ascontiguousarray(np.transpose(codebooks, (0, 2, 1)))
+        self._codebook_norms = (np.asarray(codebooks) ** 2).sum(axis=2)[:, np.newaxis, :]
+
+    @classmethod
+    def train(
+        cls,
+        vectors: np.ndarray,
+        labels: Sequence[str],
+        nlist: Optional[int] = None,
+        m: int = 16,
+        nprobe: int = 16,
+        train_size: int = 65536,
+        seed: int = 0
+    ) -> "IVFPQIndex":
+        """
+        Train the coarse quantizer and PQ codebooks, then encode all vectors.
+
+        Args:
+            vectors: (n, d) L2-normalized float32 embeddings, d divisible by m
+            labels: Label name of each vector
+            nlist: Number of inverted lists (default about 4 * sqrt(n))
+            m: Number of PQ subspaces (bytes per stored vector)
+            nprobe: Lists scanned per query
+            train_size: Vectors sampled for k-means training
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        n, d = vectors.shape
+        if d % m:
+            raise ValueError(f"Embedding dimension {d} is not divisible by m={m}")
+        nlist = nlist or int(np.clip(4 * np.sqrt(n), 1, 4096))
+
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(n, min(n, train_size), replace=False)]
+        centroids = _kmeans(sample, nlist, seed=seed)
+
+        residuals = sample - centroids[_assign(sample, centroids)]
+        dsub = d // m
+        ksub = min(256, len(sample))
+        codebooks = np.stack([
+            _kmeans(residuals[:, j * dsub:(j + 1) * dsub], ksub, seed=seed + j)
+            for j in range(m)
+        ])
+
+        index = cls(
+            centroids=centroids,
+            codebooks=codebooks,
+            list_offsets=np.zeros(len(centroids) + 1, dtype=np.int64),
+            codes=np.zeros((0, m), dtype=np.uint8),
+            label_ids=np.zeros(0, dtype=np.int32),
+            label_names=[],
+            nprobe=nprobe
+        )
+        index.add(vectors, labels)
+        return index
+
+    def _encode(self, vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        lists = _assign(vectors, self.centroids)
+        residuals = vectors - self.centroids[lists]
+        codes = np.empty((len(vectors), self.m), dtype=np.uint8)
+        for j in range(self.m):
+            codes[:, j] = _assign(residuals[:, j * self.dsub:(j + 1) * self.dsub], self.codebooks[j])
+        return lists, codes
+
+    def add(self, vectors: np.ndarray, labels: Sequence[str]):
+        with self._lock:
+            lists, codes = self._encode(np.asarray(vectors, dtype=np.float32))
+            label_ids = self._label_ids_for(labels)
+
+            existing_lists = np.repeat(np.arange(len(self.centroids)), np.diff(self.list_offsets))
+            all_lists = np.concatenate([existing_lists, lists])
+            order = np.argsort(all_lists, kind="stable")
+
+            self.codes = np.concatenate([self.codes, codes])[order]
+            self.label_ids = np.concatenate([self.label_ids, label_ids])[order]
+            counts = np.bincount(all_lists, minlength=len(self.centroids))
+            self.list_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+    def search(self, queries: np.ndarray, k: int = 10) -> tuple[np.ndarray, np.ndarray]:
+        n_queries = len(queries)
+        out_labels = np.full((n_queries, k), -1, dtype=np.int64)
+        out_scores = np.full((n_queries, k), -np.inf, dtype=np.float32)
+
+        coarse = self._centroid_norms - 2 * queries @ self.centroids.T
+        nprobe = min(self.nprobe, len(self.centroids))
+        probes = np.argpartition(coarse, nprobe - 1, axis=1)[:, :nprobe]
+        subspaces = np.arange(self.m)[np.newaxis, :]
+
+        for q, query in enumerate(queries):
+            starts = self.list_offsets[probes[q]]
+            counts = self.list_offsets[probes[q] + 1] - starts
+            if not counts.any():
+                continue
+
+            # Distance tables for every probed list at once:
+            # ||r - c||^2 = ||r||^2 - 2 r.c + ||c||^2, shape (m, nprobe, ksub)
+            residuals = (query - self.centroids[probes[q]]).reshape(nprobe, self.m, self.dsub).transpose(1, 0, 2)
+            tables = (residuals ** 2).sum(axis=2)[:, :, np.newaxis] \
+                - 2 * residuals @ self._codebooks_t + self._codebook_norms
+
+            # Candidate positions of all probed lists, and which probe each came from
+            candidates = np.repeat(starts - np.concatenate([[0], np.cumsum(counts)[:-1]]), counts) \
+                + np.arange(counts.sum())
+            probe_of = np.repeat(np.arange(nprobe), counts)
+            distances = tables[subspaces, probe_of[:, np.newaxis], self.codes[candidates]].sum(axis=1)
+
+            top_k = min(k, len(candidates))
+            top = np.argpartition(distances, top_k - 1)[:top_k]
+            top = top[np.argsort(distances[top])]
+            out_labels[q, :top_k] = self.label_ids[candidates[top]]
+            # ||a - b||^2 = 2 - 2 cos(a, b) for unit vectors
+            out_scores[q, :top_k] = 1.0 - distances[top] / 2.0
+
+        return out_labels, out_scores
+
+    def save(self, directory: str):
+        save_arrays(
+            directory,
+            {"centroids": self.centroids, "codebooks": self.codebooks, "list_offsets": self.list_offsets,
+             "codes": self.codes, "label_ids": self.label_ids,
+             **StringTable.from_strings(self.label_names).to_arrays("label_names")},
+            metadata={"kind": self.kind, "size": len(self), "nprobe": self.nprobe,
+                      "nlist": len(self.centroids), "m": self.m}
+        )
+
+
+def build_index(vectors: np.ndarray, labels: Sequence[str], kind: str = "auto", **kwargs) -> VectorIndex:
+    """
+    Build a vector index over labelled reference embeddings.
+
+    Args:
+        vectors: (n, d) reference embeddings
+        labels: Label name of each embedding
+        kind: "flat", "ivfpq" or "auto" (flat up to FLAT_INDEX_LIMIT references)
+
+    Returns:
+        In-memory VectorIndex
+    """
+    if kind == "auto":
+        kind = FlatIndex.kind if len(vectors) <= FLAT_INDEX_LIMIT else IVFPQIndex.kind
+    if kind == IVFPQIndex.kind:
+        return IVFPQIndex.train(vectors, labels, **kwargs)
+
+    index = FlatIndex(np.zeros((0, vectors.shape[1]), dtype=np.float32), np.zeros(0, dtype=np.int32), [])
+    index.add(vectors, labels)
+    return index
+
+
+class KNNBackend(InferenceBackend):
+    """
+    Retrieval-based recognizer: embed the image and vote over its nearest
+    labelled reference embeddings.
+
+    model_path is a directory written by VectorIndex.save. Labels present in
+    the index but not in the configured labels are appended, so a new food
+    only needs reference embeddings.
+    """
+
+    name = "knn"
+
+    def __init__(self, labels: List[str], model_path: Optional[str] = None):
+        self.index = VectorIndex.load(model_path)
+        known = set(labels)
+        labels = list(labels) + [name for name in self.index.label_names if name not in known]
+        super().__init__(labels, model_path)
+        self.k = int(np.clip(len(self.index), 1, 10))
+        positions = {name: i for i, name in enumerate(self.labels)}
+        self._index_to_label = np.array([positions[name] for name in self.index.label_names], dtype=np.int64)
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        if batch.ndim == 3:
+            batch = batch[np.newaxis]
+        probabilities = np.zeros((len(batch), len(self.labels)), dtype=np.float32)
+        if len(self.index) == 0:
+            # No references to vote with
+            return probabilities
+
+        label_ids, similarities = self.index.search(compute_embeddings(batch), k=self.k)
+        valid = label_ids >= 0
+        # Softmax over neighbour similarities: close neighbours dominate the vote
+        best = np.max(np.where(valid, similarities, -np.inf), axis=1, keepdims=True)
+        weights = np.where(valid, np.exp((similarities - np.where(np.isfinite(best), best, 0.0)) / VOTE_TEMPERATURE), 0.0)
+        rows = np.repeat(np.arange(len(batch)), label_ids.shape[1])
+        columns = self._index_to_label[np.where(valid, label_ids, 0)].ravel()
+        np.add.at(probabilities, (rows, columns), weights.ravel())
+
+        totals = probabilities.sum(axis=1, keepdims=True)
+        return np.divide(probabilities, totals, out=probabilities, where=totals > 0)
+
+    def describe(self) -> Dict[str, Any]:
+        info = super().describe()
+        info.update({"index_kind": self.index.kind, "references": len(self.index)})
+        return info
@@ -1,19 +1,87 @@
 import numpy as np
+import cv2
+import io
 import logging
-from typing import Dict, Any, Optional
-import random
+from typing import Dict, Any, List, Optional
 import json
+import os
+
+from PIL import Image
+
+from services.array_store import has_arrays
+from services.food_search_index import FoodSearchIndex
+from services.inference_backends import InferenceBackend, SimulatedBackend, create_backend
+from services.recognition_cascade import RecognitionCascade
+from services.plate_segmentation import segment_regions, crop_batch
+from services.portion_estimation import PortionEstimator, PLATE_DIAMETER_CM, FRAME_LONG_SIDE_CM
+from services.nutrient_aggregation import NutrientAggregator, NUTRIENTS
+from services.food_alternatives import FoodAlternativesIndex, allergen_mask
+from services.barcode_index import BarcodeIndex
+from services.metrics import StageTimer
+from services.executors import declare_pool, offload
 
 logger = logging.getLogger(__name__)
 
+# Model input resolution (width, height)
+INPUT_SIZE = (224, 224)
+
+# Photos are decoded no larger than this on the long side
+PLATE_MAX_SIDE = 1024
+
+# Visible food mass per cm² when a food has no grams_per_cm2 entry
+DEFAULT_GRAMS_PER_CM2 = 1.2
+
+# Per-food recognition and portion calibration, kept out of API responses
+CALIBRATION_KEYS = ("confidence_threshold", "grams_per_cm2")
+
+# Model label of the stage timings
+MODEL_NAME = "food_recognition"
+
+# Image decoding releases the GIL, so the decode pool scales with cores.
+# Inference backends already use every core per call, so few calls run at once.
+decode_pool = declare_pool("food-decode", "FOOD_DECODE")
+inference_pool = declare_pool("food-inference", "FOOD_INFERENCE", workers=2)
+# Search, alternatives and meal-log aggregation: NumPy/SciPy over the food indexes
+lookup_pool = declare_pool("food-lookup", "FOOD_LOOKUP")
+
+
+class FoodNotFound(LookupError):
+    """A food name missing from the database, with the closest known names."""
+
+    def __init__(self, food_name: str, suggestions: List[str]):
+        message = f"Food '{food_name}' not found in database"
+        if suggestions:
+            message += f". Did you mean: {', '.join(suggestions)}?"
+        super().__init__(message)
+        self.food_name = food_name
+        self.suggestions = suggestions
+
 class FoodRecognitionService:
     """
     Service for food recognition using computer vision.
-    In production, this would use a trained deep learning model.
+    Classification runs on a pluggable CPU inference backend selected by
+    FOOD_INFERENCE_BACKEND; without a deployed model it is simulated.
+    An optional cheap first stage (FOOD_CASCADE_BACKEND) answers images
+    it is confident about and escalates the rest to the full model.
+    Portions are estimated from the segmented food area during
+    preprocessing and nutrition (per 100 g) is scaled to them.
     """
     
     def __init__(self):
         self.food_database = self._load_food_database()
+        self.labels = self._load_labels()
+        self.backend = self._load_backend()
+        # Retrieval backends may know foods beyond the configured labels
+        self.labels = self.backend.labels
+        self.cascade = self._load_cascade()
+        self.search_index = self._load_search_index()
+        self.aggregator = NutrientAggregator(self.food_database)
+        self.alternatives_index = self._load_alternatives_index()
+        self.barcode_index = self._load_barcode_index()
+        self.portion_estimator = PortionEstimator(
+            plate_diameter_cm=float(os.getenv("FOOD_PLATE_DIAMETER_CM", PLATE_DIAMETER_CM)),
+            frame_long_side_cm=float(os.getenv("FOOD_FRAME_LONG_SIDE_CM", FRAME_LONG_SIDE_CM))
+        )
         logger.info("Food recognition service initialized")
     
     def _load_food_database(self) -> Dict[str, Dict[str, Any]]:
@@ -26,7 +94,8 @@ class FoodRecognitionService:
                 "fat": 0.2,
                 "fiber": 2.4,
                 "vitamins": ["C", "K"],
-                "confidence_threshold": 0.8
+                "confidence_threshold": 0.8,
+                "grams_per_cm2": 4.0
             },
             "banana": {
                 "calories": 89,
@@ -35,7 +104,8 @@ class FoodRecognitionService:
                 "fat": 0.3,
                 "fiber": 2.6,
                 "vitamins": ["B6", "C"],
-                "confidence_threshold": 0.8
+                "confidence_threshold": 0.8,
+                "grams_per_cm2": 2.4
             },
             "chicken_breast": {
                 "calories": 165,
@@ -44,7 +114,8 @@ class FoodRecognitionService:
                 "fat": 3.6,
                 "fiber": 0,
                 "vitamins": ["B6", "B12"],
-                "confidence_threshold": 0.7
+                "confidence_threshold": 0.7,
+                "grams_per_cm2": 1.8
             },
             "salmon": {
                 "calories": 208,
@@ -53,7 +124,8 @@ class FoodRecognitionService:
                 "fat": 12,
                 "fiber": 0,
                 "vitamins": ["B12", "D"],
-                "confidence_threshold": 0.7
+                "confidence_threshold": 0.7,
+                "grams_per_cm2": 1.8
             },
             "rice": {
                 "calories": 130,
@@ -62,7 +134,8 @@ class FoodRecognitionService:
                 "fat": 0.3,
                 "fiber": 0.4,
                 "vitamins": ["B1", "B3"],
-                "confidence_threshold": 0.8
+                "confidence_threshold": 0.8,
+                "grams_per_cm2": 1.5
             },
             "broccoli": {
                 "calories": 34,
@@ -71,7 +144,8 @@ class FoodRecognitionService:
                 "fat": 0.4,
                 "fiber": 2.6,
                 "vitamins": ["C", "K"],
-                "confidence_threshold": 0.8
+                "confidence_threshold": 0.8,
+                "grams_per_cm2": 0.8
             },
             "pizza": {
                 "calories": 266,
@@ -80,7 +154,8 @@ class FoodRecognitionService:
                 "fat": 10,
                 "fiber": 2.3,
                 "vitamins": ["B12", "D"],
-                "confidence_threshold": 0.9
+                "confidence_threshold": 0.9,
+                "grams_per_cm2": 1.1
             },
             "salad": {
                 "calories": 20,
@@ -89,74 +164,369 @@ class FoodRecognitionService:
                 "fat": 0.2,
                 "fiber": 1.5,
                 "vitamins": ["A", "C"],
-                "confidence_threshold": 0.6
+                "confidence_threshold": 0.6,
+                "grams_per_cm2": 0.4
             }
         }
     
-    async def recognize_food(self, image_array: np.ndarray, user_id: Optional[str] = None) -> Dict[str, Any]:
+    def _load_labels(self) -> List[str]:
+        """Load class labels in model output order."""
+        labels_path = os.getenv("FOOD_RECOGNITION_LABELS_PATH")
+        if labels_path and os.path.exists(labels_path):
+            with open(labels_path) as f:
+                return [line.strip() for line in f if line.strip()]
+        
+        return list(self.food_database.keys())
+    
+    def _load_backend(self) -> InferenceBackend:
+        """Load the configured inference backend, falling back to simulation."""
+        backend_name = os.getenv("FOOD_INFERENCE_BACKEND", SimulatedBackend.name)
+        model_path = os.getenv("FOOD_RECOGNITION_MODEL_PATH")
+        
+        try:
+            backend = create_backend(backend_name, self.labels, model_path)
+            logger.info(f"Food inference backend '{backend.name}' loaded")
+            return backend
+        except Exception as e:
+            logger.error(f"Failed to load inference backend '{backend_name}': {str(e)}")
+            return SimulatedBackend(self.labels)
+    
+    def _load_cascade(self) -> RecognitionCascade:
+        """Set up the recognition cascade from per-food confidence thresholds."""
+        default_threshold = float(os.getenv("FOOD_CASCADE_DEFAULT_THRESHOLD", 0.9))
+        
+        def threshold_for(label: str) -> float:
+            return self.food_database.get(label, {}).get("confidence_threshold", default_threshold)
+        
+        first_stage = None
+        first_stage_name = os.getenv("FOOD_CASCADE_BACKEND")
+        if first_stage_name:
+            try:
+                first_stage = create_backend(first_stage_name, self.labels, os.getenv("FOOD_CASCADE_MODEL_PATH"))
+                logger.info(f"Recognition cascade enabled with first stage '{first_stage.name}'")
+            except Exception as e:
+                logger.error(f"Failed to load cascade first stage '{first_stage_name}': {str(e)}")
+        
+        return RecognitionCascade(
+            full_model=self.backend,
+            threshold_for=threshold_for,
+            first_stage=first_stage,
+            first_stage_size=int(os.getenv("FOOD_CASCADE_INPUT_SIZE", 96))
+        )
+    
+    def _load_search_index(self) -> FoodSearchIndex:
+        """Open the prebuilt food search index, or build one over the food database."""
+        index_path = os.getenv("FOOD_SEARCH_INDEX_PATH")
+        if has_arrays(index_path):
+            return FoodSearchIndex.load(index_path)
+
+        return FoodSearchIndex.build(list(self.food_database.keys()))
+    
+    def _load_alternatives_index(self) -> FoodAlternativesIndex:
+        """Open the prebuilt alternatives index, or build one over the food database."""
+        index_path = os.getenv("FOOD_ALTERNATIVES_INDEX_PATH")
+        if has_arrays(index_path):
+            return FoodAlternativesIndex.load(index_path)
+        
+        names = list(self.food_database.keys())
+        return FoodAlternativesIndex.build(
+            names,
+            np.array([[self.food_database[name][nutrient] for nutrient in NUTRIENTS] for name in names]),
+            [self._detect_allergens(name) for name in names]
+        )
+    
+    def _load_barcode_index(self) -> BarcodeIndex:
+        """Open the imported barcode index; without one every lookup misses."""
+        index_path = os.getenv("FOOD_BARCODE_INDEX_PATH")
+        if has_arrays(index_path):
+            return BarcodeIndex.load(index_path)
+        
+        logger.warning("No barcode index configured; barcode lookups will not find products")
+        return BarcodeIndex.empty()
+    
+    @offload(decode_pool)
+    def preprocess_image(
+        self,
+        image_data: bytes,
+        timer: Optional[StageTimer] = None
+    ) -> tuple[np.ndarray, Optional[Dict[str, Any]]]:
+        """
+        Decode an uploaded image into the model input array and measure
+        the visible food portion.
+        
+        Runs in the food-decode pool.
+        
+        Args:
+            image_data: Encoded image bytes
+            timer: Records the decode and features stages, if given
+            
+        Returns:
+            Tuple of (RGB uint8 array of shape (224, 224, 3), portion
+            measurement or None)
+        """
+        timer = timer or StageTimer(MODEL_NAME)
+        with timer.stage("decode"):
+            image = self._decode(image_data)
+        with timer.stage("features"):
+            portion = self.portion_estimator.estimate(image)
+            image_array = cv2.resize(image, INPUT_SIZE, interpolation=cv2.INTER_AREA)
+        
+        return image_array, portion
+    
+    @offload(decode_pool)
+    def preprocess_plate(
+        self,
+        image_data: bytes,
+        timer: Optional[StageTimer] = None
+    ) -> tuple[np.ndarray, List[tuple[int, int, int, int]], List[Optional[Dict[str, Any]]]]:
+        """
+        Decode a plate photo, segment food regions and crop them into a batch.
+        
+        Runs in the food-decode pool, like preprocess_image.
+        
+        Args:
+            image_data: Encoded image bytes
+            timer: Records the decode and features stages, if given
+            
+        Returns:
+            Tuple of (crop batch of shape (N, 224, 224, 3), boxes as
+            (x, y, w, h), portion measurement of each region)
+        """
+        timer = timer or StageTimer(MODEL_NAME)
+        with timer.stage("decode"):
+            image = self._decode(image_data)
+        
+        with timer.stage("features"):
+            regions = segment_regions(image)
+            if regions:
+                boxes = [box for box, _ in regions]
+                portions = self.portion_estimator.estimate_regions(image, [area for _, area in regions])
+            else:
+                # Nothing segmented: treat the whole photo as one item
+                boxes = [(0, 0, image.shape[1], image.shape[0])]
+                portions = [self.portion_estimator.estimate(image)]
+            crops = crop_batch(image, boxes, INPUT_SIZE)
+        
+        return crops, boxes, portions
+    
+    def _decode(self, image_data: bytes) -> np.ndarray:
+        """Decode image bytes to an RGB array no larger than PLATE_MAX_SIDE."""
+        image_pil = Image.open(io.BytesIO(image_data))
+        # Let the JPEG decoder downscale while decoding
+        image_pil.draft('RGB', (PLATE_MAX_SIDE, PLATE_MAX_SIDE))
+        
+        # Convert to RGB if necessary
+        if image_pil.mode != 'RGB':
+            image_pil = image_pil.convert('RGB')
+        image_pil.thumbnail((PLATE_MAX_SIDE, PLATE_MAX_SIDE))
+        
+        return np.array(image_pil)
+    
+    @offload(inference_pool)
+    def recognize_food(
+        self,
+        image_array: np.ndarray,
+        user_id: Optional[str] = None,
+        portion: Optional[Dict[str, Any]] = None,
+        timer: Optional[StageTimer] = None
+    ) -> Dict[str, Any]:
         """
         Recognize food in image and return nutrition information.
         
+        Runs in the food-inference pool.
+        
         Args:
             image_array: Preprocessed image array
             user_id: Optional user ID for personalization
+            portion: Portion measurement from preprocess_image
+            timer: Timer passed to preprocess_image, so the reported
+                processing time covers every stage
             
         Returns:
             Dictionary with food recognition results
         """
         try:
-            # In production, this would use a trained CNN model
-            # For now, we'll simulate recognition with mock data
-            
-            # Simulate image analysis
-            food_name, confidence = self._simulate_recognition(image_array)
-            
-            # Get nutrition information
-            nutrition_info = self.food_database.get(food_name, {
-                "calories": 200,
-                "protein": 10,
-                "carbs": 25,
-                "fat": 8,
-                "fiber": 3,
-                "vitamins": ["C"],
-                "confidence_threshold": 0.5
-            })
-            
-            # Generate ingredients list
-            ingredients = self._generate_ingredients(food_name)
-            
-            result = {
-                "food_name": food_name,
-                "confidence": confidence,
-                "nutrition": {
-                    "calories": nutrition_info["calories"],
-                    "protein": nutrition_info["protein"],
-                    "carbs": nutrition_info["carbs"],
-                    "fat": nutrition_info["fat"],
-                    "fiber": nutrition_info["fiber"]
-                },
-                "vitamins": nutrition_info["vitamins"],
-                "ingredients": ingredients,
-                "serving_size": "1 serving",
-                "health_score": self._calculate_health_score(nutrition_info),
-                "allergens": self._detect_allergens(food_name),
-                "processing_time_ms": random.randint(200, 800)
-            }
+            timer = timer or StageTimer(MODEL_NAME)
+            with timer.stage("inference"):
+                food_name, confidence, stage = self._classify_batch(image_array[np.newaxis])[0]
+            
+            with timer.stage("postprocess"):
+                result = self._build_result(food_name, confidence, stage, portion)
+            result.update(timer.report())
             
-            logger.info(f"Food recognized: {food_name} (confidence: {confidence:.2f})")
+            logger.info("Food recognized: %s (confidence: %.2f)", food_name, confidence)
             return result
             
         except Exception as e:
             logger.error(f"Food recognition error: {str(e)}")
             raise Exception(f"Food recognition failed: {str(e)}")
     
-    def _simulate_recognition(self, image_array: np.ndarray) -> tuple[str, float]:
-        """Simulate food recognition with mock data."""
-        # In production, this would use a trained model
-        foods = list(self.food_database.keys())
-        food_name = random.choice(foods)
-        confidence = random.uniform(0.7, 0.95)
-        return food_name, confidence
+    @offload(inference_pool)
+    def recognize_food_batch(
+        self,
+        image_arrays: List[np.ndarray],
+        user_id: Optional[str] = None,
+        portions: Optional[List[Optional[Dict[str, Any]]]] = None,
+        timers: Optional[List[StageTimer]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Recognize food in several images with one batched model call.
+        
+        Runs in the food-inference pool.
+        
+        Args:
+            image_arrays: Preprocessed images of identical shape
+            user_id: Optional user ID for personalization
+            portions: Portion measurement of each image, if measured
+            timers: Timer of each image from preprocess_image; every
+                image is charged the whole batched inference time
+            
+        Returns:
+            List of recognition results in input order
+        """
+        try:
+            if not image_arrays:
+                return []
+            
+            batch_timer = StageTimer(MODEL_NAME)
+            with batch_timer.stage("inference"):
+                predictions = self._classify_batch(np.stack(image_arrays))
+            portions = portions or [None] * len(predictions)
+            timers = timers or [StageTimer(MODEL_NAME) for _ in predictions]
+            
+            results = []
+            for (food_name, confidence, stage), portion, timer in zip(predictions, portions, timers):
+                # Observed once above, not once per image
+                timer.record("inference", batch_timer.stages["inference"], observe=False)
+                with timer.stage("postprocess"):
+                    result = self._build_result(food_name, confidence, stage, portion)
+                result.update(timer.report())
+                results.append(result)
+            
+            logger.info("Batch recognized %d images", len(results))
+            return results
+            
+        except Exception as e:
+            logger.error(f"Batch food recognition error: {str(e)}")
+            raise Exception(f"Batch food recognition failed: {str(e)}")
+    
+    @offload(inference_pool)
+    def recognize_plate(
+        self,
+        crops: np.ndarray,
+        boxes: List[tuple[int, int, int, int]],
+        user_id: Optional[str] = None,
+        portions: Optional[List[Optional[Dict[str, Any]]]] = None,
+        timer: Optional[StageTimer] = None
+    ) -> Dict[str, Any]:
+        """
+        Recognize every food item on a plate with one batched model call.
+        
+        Runs in the food-inference pool.
+        
+        Args:
+            crops: Region crops from preprocess_plate, shape (N, 224, 224, 3)
+            boxes: Bounding box (x, y, w, h) of each crop
+            portions: Portion measurement of each crop from preprocess_plate
+            user_id: Optional user ID for personalization
+            timer: Timer passed to preprocess_plate
+            
+        Returns:
+            Dictionary with per-item results and summed nutrition
+        """
+        try:
+            timer = timer or StageTimer(MODEL_NAME)
+            with timer.stage("inference"):
+                predictions = self._classify_batch(crops)
+            portions = portions or [None] * len(predictions)
+            
+            with timer.stage("postprocess"):
+                items = []
+                for (food_name, confidence, stage), (x, y, w, h), portion in zip(predictions, boxes, portions):
+                    item = self._build_result(food_name, confidence, stage, portion)
+                    item["bounding_box"] = {"x": x, "y": y, "width": w, "height": h}
+                    items.append(item)
+                
+                total_nutrition = {
+                    nutrient: round(sum(item["nutrition"][nutrient] for item in items), 2)
+                    for nutrient in ("calories", "protein", "carbs", "fat", "fiber")
+                }
+            
+            logger.info("Plate recognized: %d items", len(items))
+            return {
+                "items": items,
+                "total_items": len(items),
+                "total_nutrition": total_nutrition,
+                "allergens": sorted({allergen for item in items for allergen in item["allergens"]}),
+                **timer.report()
+            }
+            
+        except Exception as e:
+            logger.error(f"Plate recognition error: {str(e)}")
+            raise Exception(f"Plate recognition failed: {str(e)}")
+    
+    def _build_result(
+        self,
+        food_name: str,
+        confidence: float,
+        stage: str,
+        portion: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Assemble the recognition response, scaled to the measured portion when there is one."""
+        # Get nutrition information
+        nutrition_info = self.food_database.get(food_name, {
+            "calories": 200,
+            "protein": 10,
+            "carbs": 25,
+            "fat": 8,
+            "fiber": 3,
+            "vitamins": ["C"],
+            "confidence_threshold": 0.5
+        })
+        
+        # Generate ingredients list
+        ingredients = self._generate_ingredients(food_name)
+        
+        nutrition = {
+            nutrient: nutrition_info[nutrient]
+            for nutrient in ("calories", "protein", "carbs", "fat", "fiber")
+        }
+        serving_size = "1 serving"
+        estimated_grams = None
+        if portion is not None:
+            # Database nutrition is per 100 g
+            estimated_grams = round(portion["area_cm2"] * nutrition_info.get("grams_per_cm2", DEFAULT_GRAMS_PER_CM2))
+            nutrition = {
+                nutrient: round(value * estimated_grams / 100, 1)
+                for nutrient, value in nutrition.items()
+            }
+            serving_size = f"{estimated_grams} g (estimated)"
+        
+        return {
+            "food_name": food_name,
+            "confidence": confidence,
+            "recognition_stage": stage,
+            "nutrition": nutrition,
+            "vitamins": nutrition_info["vitamins"],
+            "ingredients": ingredients,
+            "serving_size": serving_size,
+            "estimated_grams": estimated_grams,
+            "portion": portion,
+            "health_score": self._calculate_health_score(nutrition_info),
+            "allergens": self._detect_allergens(food_name)
+        }
+    
+    def _classify_batch(self, batch: np.ndarray) -> List[tuple[str, float, str]]:
+        """Classify a batch (N, H, W, C) through the cascade; returns (label, confidence, stage)."""
+        top, confidences, stages = self.cascade.classify(batch)
+        return [
+            (self.labels[i], float(c), stage)
+            for i, c, stage in zip(top, confidences, stages)
+        ]
+    
+    async def get_cascade_stats(self) -> Dict[str, Any]:
+        """Get the fraction of images answered by the cascade's first stage."""
+        return self.cascade.stats()
     
     def _generate_ingredients(self, food_name: str) -> list[str]:
         """Generate ingredient list based on food name."""
@@ -211,19 +581,176 @@ class FoodRecognitionService:
         }
         return allergen_map.get(food_name, [])
     
+    @staticmethod
+    def _public_nutrition(food_info: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """A food database entry without its calibration keys."""
+        if food_info is None:
+            return None
+        return {key: value for key, value in food_info.items() if key not in CALIBRATION_KEYS}
+    
     async def get_nutrition_info(self, food_name: str) -> Dict[str, Any]:
         """Get detailed nutrition information for a food item."""
         food_info = self.food_database.get(food_name.lower())
         if not food_info:
-            raise ValueError(f"Food '{food_name}' not found in database")
+            suggestions = [hit["food_name"] for hit in self.search_index.search(food_name, limit=3)]
+            raise FoodNotFound(food_name, suggestions)
         
         return {
             "food_name": food_name,
-            "nutrition": food_info,
+            "nutrition": self._public_nutrition(food_info),
             "health_benefits": self._get_health_benefits(food_name),
             "preparation_tips": self._get_preparation_tips(food_name)
         }
     
+    @offload(lookup_pool)
+    def search_foods(self, query: str, limit: int = 10) -> Dict[str, Any]:
+        """
+        Typo-tolerant food search ranked by name similarity.
+        
+        Runs in the food-lookup pool.
+        
+        Args:
+            query: Free-text food name, possibly misspelled
+            limit: Maximum number of results
+            
+        Returns:
+            Dictionary with ranked matches and their nutrition data when known
+        """
+        hits = self.search_index.search(query, limit=limit)
+        
+        return {
+            "query": query,
+            "results": [
+                {
+                    "food_name": hit["food_name"],
+                    "score": hit["score"],
+                    "nutrition": self._public_nutrition(self.food_database.get(hit["food_name"]))
+                }
+                for hit in hits
+            ],
+            "total_results": len(hits)
+        }
+    
+    async def autocomplete_foods(self, prefix: str, limit: int = 10) -> Dict[str, Any]:
+        """Get food name completions for a typed prefix."""
+        completions = self.search_index.autocomplete(prefix, limit=limit)
+        
+        return {
+            "prefix": prefix,
+            "completions": completions,
+            "total_results": len(completions)
+        }
+    
+    async def lookup_barcode(self, upc: str) -> Dict[str, Any]:
+        """
+        Look up a packaged food by its barcode.
+        
+        Args:
+            upc: UPC/EAN barcode digits
+            
+        Returns:
+            Dictionary with product name, brand, nutrition per 100 g,
+            allergens and health score
+        """
+        product = self.barcode_index.lookup(upc)
+        if product is None:
+            raise LookupError(f"No product found for barcode '{upc}'")
+        
+        product["health_score"] = self._calculate_health_score(product["nutrition"])
+        return product
+    
+    @offload(lookup_pool)
+    def find_alternatives(
+        self,
+        food_name: str,
+        k: int = 5,
+        fewer_calories: bool = False,
+        more_protein: bool = False,
+        exclude_allergens: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Find nutritionally similar foods to eat instead of a recognized one.
+        
+        Runs in the food-lookup pool.
+        
+        Args:
+            food_name: Food to replace
+            k: Number of alternatives
+            fewer_calories: Only foods with fewer calories than food_name
+            more_protein: Only foods with more protein than food_name
+            exclude_allergens: Allergens the alternatives must not contain
+            
+        Returns:
+            Dictionary with the reference food and ranked alternatives
+        """
+        exclude_mask = allergen_mask(exclude_allergens or [])
+        
+        row = self.alternatives_index.find_row(food_name.lower())
+        if row is not None:
+            nutrients = self.alternatives_index.nutrients[row].astype(np.float64)
+        elif food_name.lower() in self.food_database:
+            food_info = self.food_database[food_name.lower()]
+            nutrients = np.array([food_info[nutrient] for nutrient in NUTRIENTS], dtype=np.float64)
+        else:
+            raise ValueError(f"Food '{food_name}' not found in database")
+        
+        alternatives = self.alternatives_index.query(
+            nutrients,
+            k=k,
+            exclude_allergens=exclude_mask,
+            max_calories=nutrients[NUTRIENTS.index("calories")] if fewer_calories else None,
+            min_protein=nutrients[NUTRIENTS.index("protein")] if more_protein else None,
+            exclude_row=row
+        )
+        
+        return {
+            "food_name": food_name,
+            "nutrition": dict(zip(NUTRIENTS, np.round(nutrients, 2).tolist())),
+            "constraints": {
+                "fewer_calories": fewer_calories,
+                "more_protein": more_protein,
+                "exclude_allergens": exclude_allergens or []
+            },
+            "alternatives": alternatives,
+            "total_results": len(alternatives)
+        }
+    
+    @offload(lookup_pool)
+    def aggregate_nutrition(
+        self,
+        user_ids: List[str],
+        dates: List[str],
+        food_names: List[str],
+        servings: Optional[List[float]] = None,
+        period: str = "day",
+        goals: Optional[Dict[str, float]] = None
+    ) -> Dict[str, Any]:
+        """
+        Aggregate nutrient totals, macro ratios and goal gaps per user and period.
+        
+        Runs in the food-lookup pool; a bulk request is a sparse matrix
+        product over every log entry.
+        
+        Args:
+            user_ids: User of each log entry
+            dates: ISO date of each log entry
+            food_names: Food name of each log entry
+            servings: Optional servings per log entry
+            period: "day", "week" or "total"
+            goals: Optional per-period nutrient targets
+            
+        Returns:
+            Dictionary with one aggregate row per (user, period)
+        """
+        return self.aggregator.aggregate(
+            user_ids=user_ids,
+            dates=dates,
+            food_names=food_names,
+            servings=servings,
+            period=period,
+            goals=goals
+        )
+    
     def _get_health_benefits(self, food_name: str) -> list[str]:
         """Get health benefits for a food item."""
         benefits_map = {
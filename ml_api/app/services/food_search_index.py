@@ -0,0 +1,216 @@
+import re
+import numpy as np
+import logging
+from typing import Dict, Any, List, Sequence
+
+from services.array_store import StringTable, save_arrays, load_arrays
+
+logger = logging.getLogger(__name__)
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_food_name(name: str) -> str:
+    """Fold a food name to the form used for indexing and lookups."""
+    name = _NON_WORD.sub(" ", name.lower().replace("_", " "))
+    return _SPACES.sub(" ", name).strip()
+
+
+def trigram_codes(normalized: str) -> np.ndarray:
+    """
+    Return the sorted unique trigram codes of a normalized name.
+
+    The string is padded with two leading blanks and one trailing blank
+    (as pg_trgm does) so short names and word starts still produce
+    trigrams. Each trigram is packed into one int64 (21 bits per code point).
+    """
+    padded = f"  {normalized} "
+    codes = {
+        (ord(padded[i]) << 42) | (ord(padded[i + 1]) << 21) | ord(padded[i + 2])
+        for i in range(len(padded) - 2)
+    }
+    return np.array(sorted(codes), dtype=np.int64)
+
+
+class FoodSearchIndex:
+    """
+    Typo-tolerant search and autocomplete over food names.
+
+    Fuzzy search uses a trigram inverted index stored as a CSR layout
+    (sorted trigram vocabulary, postings offsets, postings) and ranks
+    candidates by trigram Jaccard similarity. Autocomplete uses the
+    normalized names in byte order, which is a flat prefix structure
+    that can be binary searched. Every array can be memory-mapped, so
+    the index is built once offline and opened instantly by each worker.
+    """
+
+    def __init__(
+        self,
+        names: StringTable,
+        vocab: np.ndarray,
+        postings_offsets: np.ndarray,
+        postings: np.ndarray,
+        trigram_counts: np.ndarray,
+        sorted_names: StringTable,
+        sorted_rows: np.ndarray
+    ):
+        self.names = names
+        self.vocab = vocab
+        self.postings_offsets = postings_offsets
+        self.postings = postings
+        self.trigram_counts = trigram_counts
+        self.sorted_names = sorted_names
+        self.sorted_rows = sorted_rows
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @classmethod
+    def build(cls, names: Sequence[str]) -> "FoodSearchIndex":
+        """
+        Build an index over food names.
+
+        Args:
+            names: Food names; the position of each name is its row id
+
+        Returns:
+            In-memory FoodSearchIndex
+        """
+        normalized = [normalize_food_name(name) for name in names]
+
+        per_name_codes = [trigram_codes(norm) for norm in normalized]
+        trigram_counts = np.array([len(c) for c in per_name_codes], dtype=np.int32)
+
+        if per_name_codes:
+            all_codes = np.concatenate(per_name_codes)
+            all_rows = np.repeat(np.arange(len(names), dtype=np.int32), trigram_counts)
+        else:
+            all_codes = np.zeros(0, dtype=np.int64)
+            all_rows = np.zeros(0, dtype=np.int32)
+
+        # Group postings by trigram; stable sort keeps row ids ascending
+        order = np.argsort(all_codes, kind="stable")
+        all_codes = all_codes[order]
+        postings = all_rows[order]
+        vocab, starts = np.unique(all_codes, return_index=True)
+        postings_offsets = np.append(starts, len(postings)).astype(np.int64)
+
+        encoded = [norm.encode("utf-8") for norm in normalized]
+        sorted_rows = np.array(sorted(range(len(names)), key=encoded.__getitem__), dtype=np.int32)
+
+        return cls(
+            names=StringTable.from_strings(list(names)),
+            vocab=vocab,
+            postings_offsets=postings_offsets,
+            postings=postings,
+            trigram_counts=trigram_counts,
+            sorted_names=StringTable.from_strings([normalized[row] for row in sorted_rows]),
+            sorted_rows=sorted_rows
+        )
+
+    def save(self, directory: str):
+        """Write the index to a directory of .npy files."""
+        arrays = {
+            "vocab": self.vocab,
+            "postings_offsets": self.postings_offsets,
+            "postings": self.postings,
+            "trigram_counts": self.trigram_counts,
+            "sorted_rows": self.sorted_rows,
+            **self.names.to_arrays("names"),
+            **self.sorted_names.to_arrays("sorted_names")
+        }
+        save_arrays(directory, arrays, metadata={"type": "food_search", "size": len(self)})
+        logger.info(f"Food search index with {len(self)} names saved to {directory}")
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "FoodSearchIndex":
+        """Open an index written by save, memory-mapped by default."""
+        arrays, _ = load_arrays(directory, mmap=mmap)
+        index = cls(
+            names=StringTable.from_arrays(arrays, "names"),
+            vocab=arrays["vocab"],
+            postings_offsets=arrays["postings_offsets"],
+            postings=arrays["postings"],
+            trigram_counts=arrays["trigram_counts"],
+            sorted_names=StringTable.from_arrays(arrays, "sorted_names"),
+            sorted_rows=arrays["sorted_rows"]
+        )
+        logger.info(f"Food search index with {len(index)} names loaded from {directory}")
+        return index
+
+    def search(self, query: str, limit: int = 10, min_score: float = 0.2) -> List[Dict[str, Any]]:
+        """
+        Rank food names by trigram similarity to a possibly misspelled query.
+
+        Args:
+            query: Free-text query, e.g. "chiken brest"
+            limit: Maximum number of results
+            min_score: Minimum Jaccard similarity for a result
+
+        Returns:
+            List of {"food_name", "score"} sorted by descending score
+        """
+        normalized = normalize_food_name(query)
+        if not normalized or len(self) == 0:
+            return []
+
+        codes = trigram_codes(normalized)
+        positions = np.searchsorted(self.vocab, codes)
+        in_range = positions < len(self.vocab)
+        positions = positions[in_range]
+        positions = positions[self.vocab[positions] == codes[in_range]]
+        if len(positions) == 0:
+            return []
+
+        starts = self.postings_offsets[positions]
+        ends = self.postings_offsets[positions + 1]
+        rows = np.concatenate([self.postings[s:e] for s, e in zip(starts, ends)])
+
+        shared = np.bincount(rows)
+        candidates = np.flatnonzero(shared)
+        shared = shared[candidates]
+        scores = shared / (len(codes) + self.trigram_counts[candidates] - shared)
+
+        keep = scores >= min_score
+        candidates, scores = candidates[keep], scores[keep]
+        if len(candidates) > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            candidates, scores = candidates[top], scores[top]
+
+        order = np.lexsort((candidates, -scores))
+        return [
+            {"food_name": self.names[int(row)], "score": round(float(score), 4)}
+            for row, score in zip(candidates[order], scores[order])
+        ]
+
+    def autocomplete(self, prefix: str, limit: int = 10) -> List[str]:
+        """
+        Return food names whose normalized form starts with a prefix.
+
+        Args:
+            prefix: Typed prefix, e.g. "chick"
+            limit: Maximum number of completions
+
+        Returns:
+            Matching food names in alphabetical order
+        """
+        normalized = normalize_food_name(prefix)
+        if not normalized:
+            return []
+        key = normalized.encode("utf-8")
+
+        lo, hi = 0, len(self.sorted_names)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.sorted_names.get_bytes(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        completions = []
+        for position in range(lo, min(lo + limit, len(self.sorted_names))):
+            if not self.sorted_names.get_bytes(position).startswith(key):
+                break
+            completions.append(self.names[int(self.sorted_rows[position])])
+        return completions
@@ -0,0 +1,200 @@
+import os
+import threading
+import numpy as np
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, Any, List, Optional, Type
+
+logger = logging.getLogger(__name__)
+
+
+def preprocess_batch(batch: np.ndarray) -> np.ndarray:
+    """
+    Preprocessing contract shared by every backend.
+
+    Args:
+        batch: RGB uint8 images of shape (N, 224, 224, 3)
+
+    Returns:
+        float32 array of the same shape scaled to [0, 1]
+    """
+    if batch.ndim == 3:
+        batch = batch[np.newaxis]
+    return batch.astype(np.float32) * (1.0 / 255.0)
+
+
+class InferenceBackend(ABC):
+    """
+    Base class for food classification backends.
+
+    A backend takes a uint8 image batch, applies preprocess_batch and
+    returns class probabilities of shape (N, len(labels)).
+    """
+
+    name = "base"
+
+    def __init__(self, labels: List[str], model_path: Optional[str] = None):
+        self.labels = labels
+        self.model_path = model_path
+
+    @abstractmethod
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        """Return class probabilities for a uint8 image batch."""
+
+    def describe(self) -> Dict[str, Any]:
+        """Describe the loaded backend for diagnostics."""
+        return {
+            "backend": self.name,
+            "model_path": self.model_path,
+            "model_size_bytes": os.path.getsize(self.model_path) if self.model_path and os.path.exists(self.model_path) else 0,
+            "num_classes": len(self.labels)
+        }
+
+
+class SimulatedBackend(InferenceBackend):
+    """Random predictions used when no trained model is deployed."""
+
+    name = "simulated"
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        n = 1 if batch.ndim == 3 else len(batch)
+        probabilities = np.zeros((n, len(self.labels)), dtype=np.float32)
+        winners = np.random.randint(len(self.labels), size=n)
+        confidence = np.random.uniform(0.7, 0.95, size=n)
+        if len(self.labels) > 1:
+            probabilities[:] = ((1 - confidence) / (len(self.labels) - 1))[:, np.newaxis]
+        probabilities[np.arange(n), winners] = confidence
+        return probabilities
+
+
+class TensorFlowBackend(InferenceBackend):
+    """Float32 Keras model (.h5 or SavedModel)."""
+
+    name = "tensorflow"
+
+    def __init__(self, labels: List[str], model_path: Optional[str] = None):
+        super().__init__(labels, model_path)
+        import tensorflow as tf
+
+        self.model = tf.keras.models.load_model(model_path, compile=False)
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        return np.asarray(self.model(preprocess_batch(batch), training=False))
+
+
+class TFLiteBackend(InferenceBackend):
+    """
+    TFLite interpreter backend using the XNNPACK CPU delegate.
+
+    Handles float models as well as quantized ones: when the input tensor
+    is integer typed, inputs are quantized with the tensor's scale and zero
+    point and outputs are dequantized back to probabilities.
+    """
+
+    name = "tflite"
+
+    def __init__(self, labels: List[str], model_path: Optional[str] = None):
+        super().__init__(labels, model_path)
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+
+        num_threads = int(os.getenv("FOOD_INFERENCE_THREADS", os.cpu_count() or 1))
+        self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self.input_details = self.interpreter.get_input_details()[0]
+        self.output_details = self.interpreter.get_output_details()[0]
+        self._batch_size = int(self.input_details["shape"][0])
+        # Interpreters are not thread-safe
+        self._lock = threading.Lock()
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        inputs = self._quantize(preprocess_batch(batch))
+
+        with self._lock:
+            if len(inputs) != self._batch_size:
+                self.interpreter.resize_tensor_input(self.input_details["index"], list(inputs.shape))
+                self.interpreter.allocate_tensors()
+                self._batch_size = len(inputs)
+            self.interpreter.set_tensor(self.input_details["index"], inputs)
+            self.interpreter.invoke()
+            outputs = self.interpreter.get_tensor(self.output_details["index"]).copy()
+
+        return self._dequantize(outputs)
+
+    def _quantize(self, inputs: np.ndarray) -> np.ndarray:
+        dtype = self.input_details["dtype"]
+        if dtype == np.float32:
+            return inputs
+        scale, zero_point = self.input_details["quantization"]
+        info = np.iinfo(dtype)
+        return np.clip(np.round(inputs / scale + zero_point), info.min, info.max).astype(dtype)
+
+    def _dequantize(self, outputs: np.ndarray) -> np.ndarray:
+        if self.output_details["dtype"] == np.float32:
+            return outputs
+        scale, zero_point = self.output_details["quantization"]
+        return (outputs.astype(np.float32) - zero_point) * scale
+
+
+class TFLiteInt8Backend(TFLiteBackend):
+    """Post-training full-integer (int8) quantized TFLite model."""
+
+    name = "tflite_int8"
+
+    def __init__(self, labels: List[str], model_path: Optional[str] = None):
+        super().__init__(labels, model_path)
+        if self.input_details["dtype"] not in (np.int8, np.uint8):
+            raise ValueError(
+                f"Model {model_path} is not integer quantized; "
+                f"build one with scripts/quantize_food_model.py"
+            )
+
+
+class ONNXBackend(InferenceBackend):
+    """ONNX Runtime CPU backend for models exported from Keras with tf2onnx."""
+
+    name = "onnx"
+
+    def __init__(self, labels: List[str], model_path: Optional[str] = None):
+        super().__init__(labels, model_path)
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = int(os.getenv("FOOD_INFERENCE_THREADS", os.cpu_count() or 1))
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: preprocess_batch(batch)})[0]
+
+
+BACKENDS: Dict[str, Type[InferenceBackend]] = {
+    backend.name: backend
+    for backend in (SimulatedBackend, TensorFlowBackend, TFLiteBackend, TFLiteInt8Backend, ONNXBackend)
+}
+
+
+def create_backend(name: str, labels: List[str], model_path: Optional[str] = None) -> InferenceBackend:
+    """
+    Instantiate a backend by name.
+
+    Args:
+        name: One of BACKENDS
+        labels: Class labels in model output order
+        model_path: Model file for non-simulated backends
+
+    Returns:
+        Loaded InferenceBackend
+    """
+    if name == "knn":
+        # Imported lazily: the retrieval backend builds on this module
+        from services.food_embedding_index import KNNBackend
+        BACKENDS.setdefault(KNNBackend.name, KNNBackend)
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{name}', expected one of {', '.join(BACKENDS)}")
+    if name != SimulatedBackend.name and not (model_path and os.path.exists(model_path)):
+        raise FileNotFoundError(f"Model file not found for backend '{name}': {model_path}")
+
+    return BACKENDS[name](labels, model_path)
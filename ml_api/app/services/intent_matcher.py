@@ -0,0 +1,115 @@
+import json
+import os
+import random
+import re
+import logging
+from typing import Dict, Any, List, Sequence
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTENTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "chat_intents.json")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _trie_pattern(words: Sequence[str]) -> str:
+    """
+    Regex alternation for a set of words, factored into a prefix trie.
+
+    "sleep|sleepy|stress" becomes "s(?:leep(?:y)?|tress)", so the regex
+    engine follows one branch per character instead of trying every
+    keyword in turn, and the greedy optional groups prefer the longest
+    keyword at each position.
+    """
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def render(node: Dict[str, Any]) -> str:
+        terminal = "" in node
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if terminal:
+            return "(?:" + body + ")?"
+        return body
+
+    return render(trie)
+
+
+class IntentMatcher:
+    """
+    Keyword intent classifier compiled from a data file.
+
+    Every keyword of every intent goes into one trie-shaped regex, so a
+    message is scanned once no matter how many intents exist. Each
+    matched keyword adds its weight to its intent; the highest total
+    wins, ties going to the intent listed first. Messages without a
+    keyword fall back to the default intent.
+    """
+
+    def __init__(self, intents: List[Dict[str, Any]], default_intent: str):
+        self.intents = {intent["name"]: intent for intent in intents}
+        if default_intent not in self.intents:
+            raise ValueError(f"Default intent '{default_intent}' is not defined")
+        self.default_intent = default_intent
+        self.order = {intent["name"]: i for i, intent in enumerate(intents)}
+
+        # keyword -> [(intent, weight)]; a keyword may belong to several intents
+        self.keywords: Dict[str, List[tuple[str, float]]] = {}
+        for intent in intents:
+            for keyword, weight in intent.get("keywords", {}).items():
+                normalized = _WHITESPACE.sub(" ", keyword.lower().strip())
+                self.keywords.setdefault(normalized, []).append((intent["name"], float(weight)))
+
+        self.pattern = re.compile(r"\b" + _trie_pattern(list(self.keywords))) if self.keywords else None
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_INTENTS_PATH) -> "IntentMatcher":
+        """Load intents, keywords and templates from a JSON file."""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+
+        matcher = cls(data["intents"], data["default_intent"])
+        logger.info(f"Loaded {len(matcher.intents)} chat intents with {len(matcher.keywords)} keywords from {path}")
+        return matcher
+
+    def classify(self, message: str) -> Dict[str, Any]:
+        """
+        Classify one message.
+
+        Returns:
+            Dictionary with the intent, its score and the matched keywords
+        """
+        text = _WHITESPACE.sub(" ", message.lower())
+        scores: Dict[str, float] = {}
+        matched: List[str] = []
+        if self.pattern is not None:
+            for match in self.pattern.finditer(text):
+                keyword = match.group(0)
+                matched.append(keyword)
+                for intent, weight in self.keywords[keyword]:
+                    scores[intent] = scores.get(intent, 0.0) + weight
+
+        if not scores:
+            return {"intent": self.default_intent, "score": 0.0, "keywords": []}
+
+        intent = max(scores, key=lambda name: (scores[name], -self.order[name]))
+        return {"intent": intent, "score": round(scores[intent], 4), "keywords": matched}
+
+    def classify_batch(self, messages: Sequence[str]) -> List[Dict[str, Any]]:
+        """Classify several messages."""
+        return [self.classify(message) for message in messages]
+
+    def response_for(self, intent: str) -> str:
+        """Pick one response template of an intent."""
+        return random.choice(self.intents[intent]["responses"])
+
+    def suggestions_for(self, intent: str) -> List[str]:
+        """Follow-up suggestions of an intent, falling back to the default intent's."""
+        suggestions = self.intents[intent].get("suggestions") or self.intents[self.default_intent].get("suggestions", [])
+        return suggestions[:3]
@@ -0,0 +1,441 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+import logging
+from typing import Dict, Any, Iterable, List, Optional, Sequence
+
+import numpy as np
+from scipy import sparse
+
+from services.array_store import StringTable, save_arrays, load_arrays
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "chat_knowledge.jsonl")
+
+SEGMENTS_FILE = "segments.json"
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Terms are stored as fixed-width byte strings so the vocabulary is a
+# sorted, memory-mappable array that np.searchsorted can look terms up in
+MAX_TERM_BYTES = 24
+TERM_DTYPE = f"S{MAX_TERM_BYTES}"
+
+# English stopwords plus filler common in chat questions ("any tips", "how much")
+STOPWORDS = frozenset(
+    "a about also an and any are as at be best but by can could did do does every for from get good had has "
+    "have help how i if in into is it its just know many me more most much my need no not of on or other our "
+    "should so some than that the their them then there these they this tip tips to too very want was way we "
+    "were what when which who why will with would you your".split()
+)
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[bytes]:
+    """Lowercase words without stopwords, plural "s" folded, as index terms."""
+    terms = []
+    for word in _WORD.findall(text.lower()):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        terms.append(word.encode("utf-8")[:MAX_TERM_BYTES])
+    return terms
+
+
+def id_hash(passage_id: str) -> int:
+    """Stable 64-bit hash of a passage id, used to find replaced passages."""
+    return int.from_bytes(hashlib.blake2b(passage_id.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+
+def read_corpus(path: str) -> List[Dict[str, Any]]:
+    """Read passages from a JSON-lines file with id, title, text, source and contexts."""
+    passages = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                passages.append(json.loads(line))
+    return passages
+
+
+class PassageSegment:
+    """
+    Immutable BM25 segment over a batch of passages.
+
+    The term-document matrix is stored as SciPy CSC arrays (term offsets,
+    passage rows, term frequencies) next to a sorted fixed-width term
+    vocabulary, passage lengths and context bitmasks. Every array can be
+    memory-mapped. A segment may also carry the id hashes of passages it
+    deletes from older segments.
+    """
+
+    def __init__(
+        self,
+        vocab: np.ndarray,
+        term_offsets: np.ndarray,
+        postings: np.ndarray,
+        term_freqs: np.ndarray,
+        lengths: np.ndarray,
+        context_masks: np.ndarray,
+        id_hashes: np.ndarray,
+        deleted: np.ndarray,
+        contexts: List[str],
+        ids: StringTable,
+        titles: StringTable,
+        texts: StringTable,
+        sources: StringTable
+    ):
+        self.vocab = vocab
+        self.term_offsets = term_offsets
+        self.postings = postings
+        self.term_freqs = term_freqs
+        self.lengths = lengths
+        self.context_masks = context_masks
+        self.id_hashes = id_hashes
+        self.deleted = deleted
+        self.contexts = contexts
+        self.ids = ids
+        self.titles = titles
+        self.texts = texts
+        self.sources = sources
+        self.total_length = int(np.sum(lengths, dtype=np.int64))
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    @classmethod
+    def build(cls, passages: Sequence[Dict[str, Any]], deleted_ids: Iterable[str] = ()) -> "PassageSegment":
+        """
+        Build a segment.
+
+        Args:
+            passages: Dicts with id, title, text, source and contexts (names of
+                chat contexts the passage applies to; empty for all)
+            deleted_ids: Ids of passages in older segments to drop
+
+        Returns:
+            In-memory PassageSegment
+        """
+        contexts = sorted({context for passage in passages for context in passage.get("contexts", [])})
+        if len(contexts) > 63:
+            raise ValueError("A segment supports at most 63 distinct contexts")
+
+        per_passage = [tokenize(f"{passage.get('title', '')} {passage['text']}") for passage in passages]
+        lengths = np.array([len(terms) for terms in per_passage], dtype=np.int32)
+        all_terms = np.array([term for terms in per_passage for term in terms], dtype=TERM_DTYPE)
+        vocab, term_ids = np.unique(all_terms, return_inverse=True)
+        rows = np.repeat(np.arange(len(passages), dtype=np.int32), lengths)
+
+        # Summing duplicate (passage, term) entries turns occurrences into term frequencies
+        matrix = sparse.coo_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, term_ids.ravel())),
+            shape=(len(passages), len(vocab))
+        ).tocsc()
+        matrix.sum_duplicates()
+
+        masks = np.array([
+            sum(1 << contexts.index(context) for context in set(passage.get("contexts", [])))
+            for passage in passages
+        ], dtype=np.int64)
+
+        return cls(
+            vocab=vocab.astype(TERM_DTYPE),
+            term_offsets=matrix.indptr.astype(np.int64),
+            postings=matrix.indices.astype(np.int32),
+            term_freqs=matrix.data.astype(np.float32),
+            lengths=lengths,
+            context_masks=masks,
+            id_hashes=np.array([id_hash(passage["id"]) for passage in passages], dtype=np.int64),
+            deleted=np.array([id_hash(passage_id) for passage_id in deleted_ids], dtype=np.int64),
+            contexts=contexts,
+            ids=StringTable.from_strings([passage["id"] for passage in passages]),
+            titles=StringTable.from_strings([passage.get("title", "") for passage in passages]),
+            texts=StringTable.from_strings([passage["text"] for passage in passages]),
+            sources=StringTable.from_strings([passage.get("source", "") for passage in passages])
+        )
+
+    def save(self, directory: str):
+        """Write the segment to a directory of .npy files."""
+        arrays = {
+            "vocab": self.vocab,
+            "term_offsets": self.term_offsets,
+            "postings": self.postings,
+            "term_freqs": self.term_freqs,
+            "lengths": self.lengths,
+            "context_masks": self.context_masks,
+            "id_hashes": self.id_hashes,
+            "deleted": self.deleted,
+            **self.ids.to_arrays("ids"),
+            **self.titles.to_arrays("titles"),
+            **self.texts.to_arrays("texts"),
+            **self.sources.to_arrays("sources")
+        }
+        save_arrays(directory, arrays, metadata={
+            "type": "knowledge_segment",
+            "size": len(self),
+            "terms": len(self.vocab),
+            "contexts": self.contexts
+        })
+
+    @classmethod
+    def load(cls, directory: str) -> "PassageSegment":
+        """Open a segment written by save, memory-mapped."""
+        arrays, metadata = load_arrays(directory)
+        return cls(
+            vocab=arrays["vocab"],
+            term_offsets=arrays["term_offsets"],
+            postings=arrays["postings"],
+            term_freqs=arrays["term_freqs"],
+            lengths=arrays["lengths"],
+            context_masks=arrays["context_masks"],
+            id_hashes=arrays["id_hashes"],
+            deleted=arrays["deleted"],
+            contexts=metadata["contexts"],
+            ids=StringTable.from_arrays(arrays, "ids"),
+            titles=StringTable.from_arrays(arrays, "titles"),
+            texts=StringTable.from_arrays(arrays, "texts"),
+            sources=StringTable.from_arrays(arrays, "sources")
+        )
+
+    def term_slices(self, terms: np.ndarray) -> List[tuple[int, int]]:
+        """Postings ranges of the terms present in this segment."""
+        positions = np.searchsorted(self.vocab, terms)
+        slices = []
+        for term, position in zip(terms, positions):
+            if position < len(self.vocab) and self.vocab[position] == term:
+                slices.append((int(self.term_offsets[position]), int(self.term_offsets[position + 1])))
+            else:
+                slices.append((0, 0))
+        return slices
+
+    def passage(self, row: int) -> Dict[str, Any]:
+        """Stored fields of one passage."""
+        return {
+            "id": self.ids[row],
+            "title": self.titles[row],
+            "text": self.texts[row],
+            "source": self.sources[row]
+        }
+
+
+class KnowledgeIndex:
+    """
+    BM25 retrieval over health passages split into segments.
+
+    An index directory holds one subdirectory per segment and a
+    segments.json listing them oldest first: the main segment from the
+    last full build or compaction, then delta segments added since. A
+    passage in a newer segment replaces the passage with the same id in
+    older ones, and deletions are recorded the same way, so adding
+    passages never rewrites existing files. Open indexes re-read the
+    segment list at most every refresh_interval seconds, so new
+    segments are served without a restart.
+
+    IDF and average passage length are computed over all segments at
+    query time; replaced passages still count toward document frequency
+    until the next compaction.
+    """
+
+    def __init__(self, directory: Optional[str] = None, refresh_interval: float = 5.0):
+        self.directory = directory
+        self.refresh_interval = refresh_interval
+        self._manifest_mtime = None
+        self._checked_at = 0.0
+        # (segment names, segments, live masks); replaced as a whole so readers never see a mix
+        self._state: tuple[List[str], List[PassageSegment], List[np.ndarray]] = ([], [], [])
+
+    @classmethod
+    def from_passages(cls, passages: Sequence[Dict[str, Any]]) -> "KnowledgeIndex":
+        """In-memory index with one segment, without a directory."""
+        index = cls()
+        index._set_segments(["memory"], [PassageSegment.build(passages)])
+        return index
+
+    @classmethod
+    def open(cls, directory: str, refresh_interval: float = 5.0) -> "KnowledgeIndex":
+        """Open an index directory written by create/add_segment."""
+        index = cls(directory, refresh_interval)
+        index.refresh(force=True)
+        logger.info(f"Knowledge index with {len(index)} passages in {len(index.segments)} segments loaded from {directory}")
+        return index
+
+    @property
+    def segments(self) -> List[PassageSegment]:
+        return self._state[1]
+
+    def __len__(self) -> int:
+        return sum(int(live.sum()) for live in self._state[2])
+
+    @staticmethod
+    def create(directory: str, passages: Sequence[Dict[str, Any]]):
+        """Write a new index with a single main segment, replacing any existing one."""
+        name = KnowledgeIndex._next_segment_name(directory)
+        PassageSegment.build(passages).save(os.path.join(directory, name))
+        old = KnowledgeIndex._read_segment_names(directory)
+        KnowledgeIndex._write_segment_names(directory, [name])
+        KnowledgeIndex._remove_segments(directory, old)
+
+    @staticmethod
+    def add_segment(directory: str, passages: Sequence[Dict[str, Any]], deleted_ids: Iterable[str] = ()):
+        """Append a delta segment with new or replacement passages and deletions."""
+        name = KnowledgeIndex._next_segment_name(directory)
+        PassageSegment.build(passages, deleted_ids).save(os.path.join(directory, name))
+        KnowledgeIndex._write_segment_names(directory, KnowledgeIndex._read_segment_names(directory) + [name])
+
+    @staticmethod
+    def compact(directory: str):
+        """Merge the live passages of all segments into a new main segment."""
+        index = KnowledgeIndex.open(directory)
+        passages = []
+        for segment, live in zip(index.segments, index._state[2]):
+            for row in np.flatnonzero(live):
+                passage = segment.passage(int(row))
+                mask = int(segment.context_masks[row])
+                passage["contexts"] = [c for i, c in enumerate(segment.contexts) if mask >> i & 1]
+                passages.append(passage)
+        KnowledgeIndex.create(directory, passages)
+
+    def refresh(self, force: bool = False):
+        """Pick up segments added or removed since the index was opened."""
+        if self.directory is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.refresh_interval:
+            return
+        self._checked_at = now
+
+        mtime = os.stat(os.path.join(self.directory, SEGMENTS_FILE)).st_mtime_ns
+        if mtime == self._manifest_mtime:
+            return
+        names = self._read_segment_names(self.directory)
+        opened = dict(zip(self._state[0], self._state[1]))
+        try:
+            segments = [opened.get(name) or PassageSegment.load(os.path.join(self.directory, name)) for name in names]
+        except FileNotFoundError as e:
+            # Segments of a list that was replaced while being read; retry on the next refresh
+            if force:
+                raise
+            logger.warning(f"Knowledge index reload failed, keeping current segments: {str(e)}")
+            return
+        self._set_segments(names, segments)
+        self._manifest_mtime = mtime
+        if not force:
+            logger.info(f"Knowledge index reloaded: {len(self)} passages in {len(segments)} segments")
+
+    def search(self, query: str, context: Optional[str] = None, k: int = 3) -> List[Dict[str, Any]]:
+        """
+        Find the passages that best match a query by BM25.
+
+        Args:
+            query: Free text, normally the user's chat message
+            context: Chat context; passages tagged for other contexts are skipped
+            k: Number of passages to return
+
+        Returns:
+            Passages (id, title, text, source, score) by descending score
+        """
+        self.refresh()
+        names, segments, live_masks = self._state
+        terms = np.unique(np.array(tokenize(query), dtype=TERM_DTYPE))
+        if len(terms) == 0 or not segments:
+            return []
+
+        slices = [segment.term_slices(terms) for segment in segments]
+        documents = sum(len(segment) for segment in segments)
+        frequencies = np.array([sum(end - start for start, end in column) for column in zip(*slices)], dtype=np.float64)
+        idf = np.log1p((documents - frequencies + 0.5) / (frequencies + 0.5))
+        average_length = max(sum(segment.total_length for segment in segments) / max(documents, 1), 1.0)
+
+        candidates = []
+        for position, (segment, live, segment_slices) in enumerate(zip(segments, live_masks, slices)):
+            scores = self._score_segment(segment, segment_slices, idf, average_length)
+            if scores is None:
+                continue
+            keep = live & (scores > 0)
+            if context is not None and context in segment.contexts:
+                bit = 1 << segment.contexts.index(context)
+                keep &= (segment.context_masks == 0) | (segment.context_masks & bit != 0)
+            elif context is not None:
+                keep &= segment.context_masks == 0
+            rows = np.flatnonzero(keep)
+            if len(rows) > k:
+                rows = rows[np.argpartition(-scores[rows], k - 1)[:k]]
+            candidates.extend((float(scores[row]), position, int(row)) for row in rows)
+
+        candidates.sort(key=lambda candidate: (-candidate[0], candidate[1], candidate[2]))
+        results = []
+        for score, position, row in candidates[:k]:
+            passage = segments[position].passage(row)
+            passage["score"] = round(score, 4)
+            results.append(passage)
+        return results
+
+    @staticmethod
+    def _score_segment(
+        segment: PassageSegment,
+        slices: List[tuple[int, int]],
+        idf: np.ndarray,
+        average_length: float
+    ) -> Optional[np.ndarray]:
+        """BM25 score of every passage of a segment, or None when no term occurs in it."""
+        rows, weights = [], []
+        for (start, end), term_idf in zip(slices, idf):
+            if start == end:
+                continue
+            postings = segment.postings[start:end]
+            tf = segment.term_freqs[start:end].astype(np.float64)
+            norm = K1 * (1 - B + B * segment.lengths[postings] / average_length)
+            rows.append(postings)
+            weights.append(term_idf * tf * (K1 + 1) / (tf + norm))
+        if not rows:
+            return None
+        return np.bincount(np.concatenate(rows), weights=np.concatenate(weights), minlength=len(segment))
+
+    def _set_segments(self, names: List[str], segments: List[PassageSegment]):
+        """Install segments, masking passages replaced or deleted by newer ones."""
+        live_masks = []
+        newer = np.zeros(0, dtype=np.int64)
+        for segment in reversed(segments):
+            live_masks.append(~np.isin(segment.id_hashes, newer))
+            newer = np.concatenate([newer, segment.id_hashes, segment.deleted])
+        self._state = (names, segments, live_masks[::-1])
+
+    @staticmethod
+    def _read_segment_names(directory: str) -> List[str]:
+        """Segment names in a directory, oldest first."""
+        path = os.path.join(directory, SEGMENTS_FILE)
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            return json.load(f)["segments"]
+
+    @staticmethod
+    def _write_segment_names(directory: str, names: List[str]):
+        """Atomically replace the segment list."""
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = os.path.join(directory, SEGMENTS_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"segments": names}, f)
+        os.replace(tmp_path, os.path.join(directory, SEGMENTS_FILE))
+
+    @staticmethod
+    def _next_segment_name(directory: str) -> str:
+        """Unused segment directory name, ordered after existing ones."""
+        existing = [
+            int(name.split("-")[1]) for name in (os.listdir(directory) if os.path.isdir(directory) else [])
+            if name.startswith("segment-") and name.split("-")[1].isdigit()
+        ]
+        return f"segment-{max(existing, default=0) + 1:06d}"
+
+    @staticmethod
+    def _remove_segments(directory: str, names: List[str]):
+        """Delete segment directories that are no longer listed."""
+        for name in names:
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
@@ -0,0 +1,287 @@
+import bisect
+import math
+import threading
+from abc import ABC, abstractmethod
+import time
+from typing import Dict, Any, Callable, Iterable, List, Optional
+
+# Request and stage latencies in seconds, from sub-millisecond lookups to slow model calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Starlette appends the charset to text/ media types
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# (name, type, help, [(labels, value)]) produced by a collector at scrape time
+Family = tuple[str, str, str, List[tuple[Dict[str, str], float]]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if value == float("-inf"):
+        return "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds: tuple):
+        self.bounds = bounds
+        # One slot per bucket plus +Inf; made cumulative only when scraped
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Metric(ABC):
+    """
+    A named metric with a fixed set of label names.
+
+    labels() returns the child for one combination of label values,
+    creating it on first use; callers on hot paths can keep the child and
+    skip the lookup. Keep label values to a small, fixed set (route
+    templates, model names, stages), never IDs or raw paths.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[tuple, Any] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    @abstractmethod
+    def _new_child(self):
+        """A new child holding the value(s) of one label combination."""
+
+    def _label_dict(self, values: tuple) -> Dict[str, str]:
+        return dict(zip(self.labelnames, values))
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in list(self._children.items()):
+            lines.extend(self._render_child(self._label_dict(values), child))
+        return lines
+
+    def _render_child(self, labels: Dict[str, str], child) -> List[str]:
+        return [f"{self.name}{_format_labels(labels)} {_format_value(child.value)}"]
+
+
+class Counter(Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+
+class Gauge(Metric):
+    """Value that goes up and down, e.g. requests in flight."""
+
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+
+class Histogram(Metric):
+    """Distribution of observations over fixed upper bounds."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Iterable[str] = (),
+        buckets: tuple = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def _render_child(self, labels: Dict[str, str], child: _HistogramChild) -> List[str]:
+        with child._lock:
+            counts = list(child.counts)
+            total = child.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            bucket_labels = {**labels, "le": _format_value(bound)}
+            lines.append(f"{self.name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+        lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Process-wide metrics rendered in the Prometheus text format.
+
+    Metrics are updated in place on the request path; collectors are
+    called only at scrape time, for values that already live elsewhere
+    (cache counters, queue depths).
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], List[Family]]] = []
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Iterable[str] = (),
+        buckets: tuple = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], List[Family]]):
+        """Add a callable returning metric families to read at scrape time."""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        for collector in list(self._collectors):
+            for name, kind, help, samples in collector():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric: Metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                # Modules re-imported under another name register again
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} is already registered differently")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+
+REGISTRY = MetricsRegistry()
+
+MODEL_STAGE_SECONDS = REGISTRY.histogram(
+    "healthsphere_model_stage_seconds",
+    "Time spent in each processing stage of a model call",
+    ("model", "stage")
+)
+
+
+class StageTimer:
+    """
+    Times the stages of one prediction (decode, features, inference,
+    postprocess) for the response and the per-model stage histogram.
+
+    Stages may run in different threads but not concurrently on the same
+    timer. Time between stages, such as waiting for a worker thread, is
+    not counted.
+    """
+
+    __slots__ = ("model", "stages", "_stage", "_started")
+
+    def __init__(self, model: str):
+        self.model = model
+        self.stages: Dict[str, float] = {}
+        self._stage: Optional[str] = None
+        self._started = 0.0
+
+    def stage(self, name: str) -> "StageTimer":
+        """Time a `with` block as stage `name`; repeated stages add up."""
+        self._stage = name
+        return self
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.record(self._stage, time.perf_counter() - self._started)
+        return False
+
+    def record(self, name: str, seconds: float, observe: bool = True):
+        """Add time measured elsewhere, e.g. a batched model call shared by several images."""
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+        if observe:
+            MODEL_STAGE_SECONDS.labels(self.model, name).observe(seconds)
+
+    def total_ms(self) -> float:
+        return round(sum(self.stages.values()) * 1000, 3)
+
+    def report(self) -> Dict[str, Any]:
+        """Response fields: total processing time and per-stage breakdown in ms."""
+        return {
+            "processing_time_ms": self.total_ms(),
+            "stage_timings_ms": {name: round(seconds * 1000, 3) for name, seconds in self.stages.items()}
+        }
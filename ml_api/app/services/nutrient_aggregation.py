@@ -0,0 +1,161 @@
+import numpy as np
+import logging
+from typing import Dict, Any, List, Optional, Sequence
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+NUTRIENTS = ("calories", "protein", "carbs", "fat", "fiber")
+
+# Energy per gram of each macronutrient (kcal)
+MACRO_ENERGY = {"protein": 4.0, "carbs": 4.0, "fat": 9.0}
+
+PERIODS = ("day", "week", "total")
+
+
+class NutrientAggregator:
+    """
+    Vectorized nutrient totals over meal logs.
+
+    Foods are rows of a dense nutrient matrix F (foods x nutrients). A batch
+    of log entries becomes a sparse portion matrix P (groups x foods), where
+    a group is one (user, period) pair, so every total for every user and
+    period comes out of the single product P @ F.
+    """
+
+    def __init__(self, food_database: Dict[str, Dict[str, Any]]):
+        self.food_names = list(food_database.keys())
+        self.food_index = {name: i for i, name in enumerate(self.food_names)}
+        self.nutrient_matrix = np.array(
+            [[float(food_database[name][nutrient]) for nutrient in NUTRIENTS] for name in self.food_names],
+            dtype=np.float64
+        ).reshape(len(self.food_names), len(NUTRIENTS))
+
+        macro_columns = [NUTRIENTS.index(macro) for macro in MACRO_ENERGY]
+        self._macro_columns = np.array(macro_columns)
+        self._macro_energy = np.array(list(MACRO_ENERGY.values()))
+
+    def aggregate(
+        self,
+        user_ids: Sequence[str],
+        dates: Sequence[str],
+        food_names: Sequence[str],
+        servings: Optional[Sequence[float]] = None,
+        period: str = "day",
+        goals: Optional[Dict[str, float]] = None
+    ) -> Dict[str, Any]:
+        """
+        Aggregate nutrient totals per user and period.
+
+        Args:
+            user_ids: User of each log entry
+            dates: ISO date (YYYY-MM-DD) of each log entry
+            food_names: Food database key of each log entry
+            servings: Servings of each log entry (defaults to 1)
+            period: "day", "week" (ISO weeks starting Monday) or "total"
+            goals: Optional per-period nutrient targets, e.g. {"calories": 2000}
+
+        Returns:
+            Dictionary with one row of totals, macro ratios and goal gaps per
+            (user, period) group
+        """
+        if period not in PERIODS:
+            raise ValueError(f"Unknown period '{period}', expected one of {', '.join(PERIODS)}")
+
+        n_entries = len(user_ids)
+        if len(dates) != n_entries or len(food_names) != n_entries:
+            raise ValueError("user_ids, dates and food_names must have the same length")
+        if servings is not None and len(servings) != n_entries:
+            raise ValueError("servings must have the same length as user_ids")
+
+        portions = np.ones(n_entries) if servings is None else np.asarray(servings, dtype=np.float64)
+
+        # Factorize string columns once; only unique values are looked up or parsed
+        unique_foods, food_inverse = _factorize(food_names)
+        unique_rows = np.array([self.food_index.get(name, -1) for name in unique_foods], dtype=np.int64)
+        food_rows = unique_rows[food_inverse]
+        known = food_rows >= 0
+        unknown_foods = [name for name, row in zip(unique_foods, unique_rows) if row < 0]
+
+        unique_dates, date_inverse = _factorize(dates)
+        unique_periods, period_inverse = np.unique(
+            self._period_starts(unique_dates, period)[date_inverse], return_inverse=True
+        )
+
+        unique_users, user_inverse = _factorize(user_ids)
+        group_codes = user_inverse * len(unique_periods) + period_inverse
+        unique_groups, group_inverse = np.unique(group_codes, return_inverse=True)
+
+        # Duplicate (group, food) coordinates are summed by the sparse constructor
+        portion_matrix = sparse.csr_matrix(
+            (portions[known], (group_inverse[known], food_rows[known])),
+            shape=(len(unique_groups), len(self.food_names))
+        )
+        totals = np.asarray(portion_matrix @ self.nutrient_matrix)
+
+        macro_energy = totals[:, self._macro_columns] * self._macro_energy
+        energy = macro_energy.sum(axis=1, keepdims=True)
+        macro_ratios = np.divide(macro_energy, energy, out=np.zeros_like(macro_energy), where=energy > 0)
+
+        goal_vector = None
+        if goals:
+            unknown_goals = set(goals) - set(NUTRIENTS)
+            if unknown_goals:
+                raise ValueError(f"Unknown goal nutrients: {', '.join(sorted(unknown_goals))}")
+            goal_vector = np.array([goals.get(nutrient, np.nan) for nutrient in NUTRIENTS])
+            goal_gaps = totals - goal_vector
+
+        group_users = [unique_users[u] for u in (unique_groups // max(len(unique_periods), 1)).tolist()]
+        group_periods = unique_periods[unique_groups % max(len(unique_periods), 1)].astype(str).tolist()
+        totals_rows = np.round(totals, 2).tolist()
+        ratio_rows = np.round(macro_ratios, 4).tolist()
+        if goal_vector is not None:
+            goal_columns = [j for j in range(len(NUTRIENTS)) if not np.isnan(goal_vector[j])]
+            gap_rows = np.round(goal_gaps[:, goal_columns], 2).tolist()
+            goal_nutrients = [NUTRIENTS[j] for j in goal_columns]
+
+        groups = []
+        for g in range(len(unique_groups)):
+            row = {
+                "user_id": group_users[g],
+                "period_start": None if period == "total" else group_periods[g],
+                "totals": dict(zip(NUTRIENTS, totals_rows[g])),
+                "macro_ratios": dict(zip(MACRO_ENERGY, ratio_rows[g]))
+            }
+            if goal_vector is not None:
+                row["goal_gaps"] = dict(zip(goal_nutrients, gap_rows[g]))
+            groups.append(row)
+
+        return {
+            "period": period,
+            "nutrients": list(NUTRIENTS),
+            "groups": groups,
+            "total_groups": len(groups),
+            "total_entries": n_entries,
+            "unknown_foods": unknown_foods
+        }
+
+    def _period_starts(self, dates: Sequence[str], period: str) -> np.ndarray:
+        """Map each entry date to the first day of its period."""
+        if period == "total":
+            return np.zeros(len(dates), dtype="datetime64[D]")
+        if not dates:
+            return np.zeros(0, dtype="datetime64[D]")
+
+        days = np.asarray(dates, dtype="datetime64[D]")
+        if period == "week":
+            # Day 0 of the epoch (1970-01-01) was a Thursday
+            weekday = (days.astype(np.int64) + 3) % 7
+            days = days - weekday.astype("timedelta64[D]")
+        return days
+
+
+def _factorize(values: Sequence[str]) -> tuple[List[str], np.ndarray]:
+    """Encode values as integer codes in order of first appearance."""
+    codes: Dict[str, int] = {}
+    inverse = np.fromiter(
+        (codes.setdefault(str(value), len(codes)) for value in values),
+        dtype=np.int64,
+        count=len(values)
+    )
+    return list(codes), inverse
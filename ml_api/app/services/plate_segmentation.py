@@ -0,0 +1,100 @@
+import cv2
+import numpy as np
+import logging
+from typing import List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Segmentation runs on a copy no larger than this (pixels on the long side)
+SEGMENTATION_SIZE = 256
+# Colour clusters for k-means in Lab space
+COLOUR_CLUSTERS = 6
+# Regions smaller than this fraction of the image are ignored
+MIN_REGION_FRACTION = 0.01
+# Pixels with saturation below this are treated as plate/table/background
+MIN_SATURATION = 40
+
+Box = Tuple[int, int, int, int]
+
+
+def segment_regions(image: np.ndarray, max_items: int = 8) -> List[Tuple[Box, int]]:
+    """
+    Segment food regions on a plate with colour clustering.
+
+    Pixels are clustered in Lab space on a downscaled copy. The cluster
+    covering most of the image border is taken as background, as are
+    low-saturation pixels (white plates, tablecloths). Connected components
+    of each remaining cluster become candidate regions.
+
+    Args:
+        image: RGB uint8 image (H, W, 3)
+        max_items: Maximum number of regions returned (largest first)
+
+    Returns:
+        List of (bounding box (x, y, w, h), segmented pixel area), both in
+        original image coordinates
+    """
+    height, width = image.shape[:2]
+    scale = min(1.0, SEGMENTATION_SIZE / max(height, width))
+    small = cv2.resize(image, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+    small = cv2.GaussianBlur(small, (5, 5), 0)
+
+    labels = cluster_colours(small)
+    foreground = food_mask(small, labels)
+
+    kernel = np.ones((5, 5), np.uint8)
+    min_area = MIN_REGION_FRACTION * labels.size
+    regions = []
+    for cluster in np.unique(labels[foreground]):
+        mask = ((labels == cluster) & foreground).astype(np.uint8)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+        count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        for component in range(1, count):
+            x, y, w, h, area = stats[component]
+            if area >= min_area:
+                regions.append((area, (x, y, w, h)))
+
+    regions.sort(key=lambda region: region[0], reverse=True)
+    return [
+        (
+            (int(x / scale), int(y / scale), max(1, int(w / scale)), max(1, int(h / scale))),
+            int(area / scale ** 2)
+        )
+        for area, (x, y, w, h) in regions[:max_items]
+    ]
+
+
+def cluster_colours(image: np.ndarray) -> np.ndarray:
+    """k-means cluster label of every pixel of a small RGB image, in Lab space."""
+    lab = cv2.cvtColor(image, cv2.COLOR_RGB2LAB).reshape(-1, 3).astype(np.float32)
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 10, 1.0)
+    clusters = min(COLOUR_CLUSTERS, len(lab))
+    _, labels, _ = cv2.kmeans(lab, clusters, None, criteria, 1, cv2.KMEANS_PP_CENTERS)
+    return labels.reshape(image.shape[:2])
+
+
+def food_mask(image: np.ndarray, labels: np.ndarray) -> np.ndarray:
+    """Boolean mask of pixels that are neither the border cluster nor unsaturated."""
+    border = np.concatenate([labels[0], labels[-1], labels[:, 0], labels[:, -1]])
+    background = np.bincount(border).argmax()
+    saturation = cv2.cvtColor(image, cv2.COLOR_RGB2HSV)[:, :, 1]
+    return (labels != background) & (saturation >= MIN_SATURATION)
+
+
+def crop_batch(image: np.ndarray, boxes: List[Box], size: Tuple[int, int]) -> np.ndarray:
+    """
+    Crop every box and resize it into one model input batch.
+
+    Args:
+        image: RGB uint8 image
+        boxes: Regions as (x, y, w, h)
+        size: Model input size (width, height)
+
+    Returns:
+        uint8 array of shape (len(boxes), height, width, 3)
+    """
+    batch = np.empty((len(boxes), size[1], size[0], 3), dtype=np.uint8)
+    for i, (x, y, w, h) in enumerate(boxes):
+        batch[i] = cv2.resize(image[y:y + h, x:x + w], size, interpolation=cv2.INTER_AREA)
+    return batch
@@ -0,0 +1,164 @@
+import time
+import cv2
+import numpy as np
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+
+from services.plate_segmentation import MIN_SATURATION
+
+logger = logging.getLogger(__name__)
+
+# Portion estimation runs on a copy no larger than this (pixels on the long side)
+PORTION_SIZE = 160
+# Typical dinner plate diameter used as the size reference
+PLATE_DIAMETER_CM = 26.0
+# Assumed real length of the photo's long side when no plate is found
+FRAME_LONG_SIDE_CM = 40.0
+# Food areas below this fraction of the image are treated as "not measured"
+MIN_FOOD_FRACTION = 0.005
+# Only this inner fraction of the plate radius counts (skips the rim)
+PLATE_INNER_FRACTION = 0.95
+# Lab distance from the border colour above which a pixel is foreground
+BACKGROUND_DISTANCE = 25.0
+
+PLATE = "plate"
+FRAME = "frame"
+
+
+class PortionEstimator:
+    """
+    Estimate the visible area of food in a photo in square centimetres.
+
+    A plate found with a Hough circle transform supplies the pixel scale
+    (its diameter is assumed to be plate_diameter_cm); without one, the
+    photo's long side is assumed to span frame_long_side_cm. Food pixels
+    are found with threshold masks rather than clustering, and everything
+    runs on a downscaled copy so the cost stays small next to inference.
+    Area is converted to grams by the caller with a per-food g/cm² factor.
+    """
+
+    def __init__(
+        self,
+        plate_diameter_cm: float = PLATE_DIAMETER_CM,
+        frame_long_side_cm: float = FRAME_LONG_SIDE_CM,
+        size: int = PORTION_SIZE
+    ):
+        self.plate_diameter_cm = plate_diameter_cm
+        self.frame_long_side_cm = frame_long_side_cm
+        self.size = size
+
+    def estimate(self, image: np.ndarray) -> Optional[Dict[str, Any]]:
+        """
+        Measure the food area of a single-item photo.
+
+        Args:
+            image: RGB uint8 image (H, W, 3)
+
+        Returns:
+            Portion measurement, or None when no food region is found
+        """
+        start = time.perf_counter()
+        small, _ = self._downscale(image)
+        plate = detect_plate(small)
+        cm_per_pixel = self._cm_per_pixel(small, plate)
+
+        foreground = _foreground(small, plate)
+
+        pixels = int(np.count_nonzero(foreground))
+        if pixels < MIN_FOOD_FRACTION * foreground.size:
+            return None
+
+        return self._measurement(pixels * cm_per_pixel ** 2, plate, start)
+
+    def estimate_regions(self, image: np.ndarray, pixel_areas: List[int]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Convert already segmented region areas into portion measurements.
+
+        Args:
+            image: RGB uint8 image the regions were segmented from
+            pixel_areas: Area of each region in image pixels
+
+        Returns:
+            One measurement per region (None where the area is zero)
+        """
+        start = time.perf_counter()
+        small, scale = self._downscale(image)
+        plate = detect_plate(small)
+        # Region areas are in full-resolution pixels
+        cm_per_pixel = self._cm_per_pixel(small, plate) * scale
+
+        return [
+            self._measurement(area * cm_per_pixel ** 2, plate, start) if area > 0 else None
+            for area in pixel_areas
+        ]
+
+    def _downscale(self, image: np.ndarray) -> Tuple[np.ndarray, float]:
+        height, width = image.shape[:2]
+        scale = min(1.0, self.size / max(height, width))
+        # Bilinear plus a blur is an order of magnitude cheaper than INTER_AREA
+        small = cv2.resize(image, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_LINEAR)
+        return cv2.GaussianBlur(small, (5, 5), 0), scale
+
+    def _cm_per_pixel(self, small: np.ndarray, plate: Optional[Tuple[float, float, float]]) -> float:
+        if plate is not None:
+            return self.plate_diameter_cm / (2 * plate[2])
+        return self.frame_long_side_cm / max(small.shape[:2])
+
+    def _measurement(self, area_cm2: float, plate: Optional[Tuple[float, float, float]], start: float) -> Dict[str, Any]:
+        return {
+            "area_cm2": round(float(area_cm2), 1),
+            "reference": PLATE if plate is not None else FRAME,
+            "portion_estimation_ms": round((time.perf_counter() - start) * 1000, 3)
+        }
+
+
+def detect_plate(image: np.ndarray) -> Optional[Tuple[float, float, float]]:
+    """
+    Find the largest plate-sized circle in a small RGB image.
+
+    Returns:
+        (centre x, centre y, radius) in image pixels, or None
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+    short_side = min(gray.shape)
+    circles = cv2.HoughCircles(
+        gray,
+        cv2.HOUGH_GRADIENT,
+        dp=1.5,
+        minDist=short_side,
+        param1=100,
+        param2=40,
+        minRadius=int(short_side * 0.3),
+        maxRadius=int(max(gray.shape) * 0.6)
+    )
+    if circles is None:
+        return None
+
+    x, y, radius = max(circles[0], key=lambda circle: circle[2])
+    return float(x), float(y), float(radius)
+
+
+def _foreground(image: np.ndarray, plate: Optional[Tuple[float, float, float]]) -> np.ndarray:
+    """
+    Boolean mask of food pixels in a small RGB image.
+
+    Food is saturated; plates and tablecloths mostly are not. Inside a
+    detected plate that is enough. Without one, pixels close to the median
+    border colour are also dropped as background.
+    """
+    saturated = cv2.cvtColor(image, cv2.COLOR_RGB2HSV)[:, :, 1] >= MIN_SATURATION
+    if plate is not None:
+        x, y, radius = plate
+        return saturated & _circle_mask(image.shape[:2], (x, y, radius * PLATE_INNER_FRACTION))
+
+    lab = cv2.cvtColor(image, cv2.COLOR_RGB2LAB).astype(np.float32)
+    border = np.concatenate([lab[0], lab[-1], lab[:, 0], lab[:, -1]])
+    distance = np.linalg.norm(lab - np.median(border, axis=0), axis=2)
+    return saturated & (distance > BACKGROUND_DISTANCE)
+
+
+def _circle_mask(shape: Tuple[int, int], circle: Tuple[float, float, float]) -> np.ndarray:
+    """Boolean mask of the pixels inside a circle."""
+    x, y, radius = circle
+    rows, cols = np.ogrid[:shape[0], :shape[1]]
+    return (cols - x) ** 2 + (rows - y) ** 2 <= radius ** 2
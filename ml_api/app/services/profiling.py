@@ -0,0 +1,243 @@
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+# Profiling is off, with no middleware or routes installed, unless this is set
+TOKEN = os.getenv("DEBUG_PROFILING_TOKEN", "")
+
+MODES = ("sample", "cprofile")
+DEFAULT_INTERVAL_MS = 5.0
+MAX_SECONDS = float(os.getenv("DEBUG_PROFILING_MAX_SECONDS", 60))
+
+# Per-request profiles kept for download, oldest dropped first
+MAX_STORED_PROFILES = 20
+
+# Leaf frames of threads parked waiting for work: pool workers, the event
+# loop's selector and queue listeners
+IDLE_FRAMES = frozenset({
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker")
+})
+
+# One profiler at a time; cProfile is per thread but overlapping sessions
+# would each see the other's work
+_session_lock = threading.Lock()
+_stored: "OrderedDict[str, Profile]" = OrderedDict()
+
+
+def profiling_enabled() -> bool:
+    return bool(TOKEN)
+
+
+class ProfilerBusy(Exception):
+    """Another profile is being recorded in this worker."""
+
+
+class Profile:
+    """A finished profile: sampled stacks or cProfile stats, plus what was profiled."""
+
+    def __init__(self, profile_id: str, mode: str, label: str, started: float, seconds: float,
+                 stacks: Optional[Counter] = None, samples: int = 0, stats: Optional[dict] = None):
+        self.id = profile_id
+        self.mode = mode
+        self.label = label
+        self.started = started
+        self.seconds = seconds
+        self.stacks = stacks
+        self.samples = samples
+        self.stats = stats
+
+    def formats(self) -> Tuple[str, ...]:
+        return ("collapsed", "text") if self.mode == "sample" else ("pstats", "text")
+
+    def render(self, fmt: str) -> Tuple[bytes, str]:
+        """
+        Render as one of formats(); returns (body, media type).
+
+        collapsed is one "frame;frame;frame count" line per stack, the input
+        of flamegraph.pl, speedscope and inferno. pstats is a marshalled
+        stats dump for pstats.Stats, snakeviz or gprof2dot.
+
+        Raises:
+            ValueError: If the profile's mode has no such format
+        """
+        if fmt not in self.formats():
+            raise ValueError(f"{self.mode} profiles render as {' or '.join(self.formats())}, not {fmt}")
+        if fmt == "collapsed":
+            lines = [f"{stack} {count}" for stack, count in self.stacks.most_common()]
+            return "\n".join(lines).encode() + b"\n", "text/plain"
+        if fmt == "pstats":
+            return marshal.dumps(self.stats), "application/octet-stream"
+        if self.mode == "sample":
+            return self._sample_summary().encode(), "text/plain"
+        return self._cprofile_summary().encode(), "text/plain"
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "mode": self.mode,
+            "label": self.label,
+            "started": self.started,
+            "seconds": round(self.seconds, 3),
+            "samples": self.samples if self.mode == "sample" else None,
+            "formats": list(self.formats())
+        }
+
+    def _sample_summary(self, limit: int = 40) -> str:
+        # Samples each function was running (self) or on the stack (total)
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")[1:]
+            if frames:
+                own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+        lines = [f"{self.samples} samples over {self.seconds:.1f}s ({self.label})", "",
+                 f"{'self':>7} {'total':>7}  function"]
+        for frame, count in own.most_common(limit):
+            lines.append(f"{count / self.samples:7.1%} {total[frame] / self.samples:7.1%}  {frame}")
+        return "\n".join(lines) + "\n"
+
+    def _cprofile_summary(self, limit: int = 40) -> str:
+        stream = io.StringIO()
+        stats = pstats.Stats(stream=stream)
+        stats.stats = self.stats
+        stats.get_top_level_stats()
+        stats.sort_stats("cumulative").print_stats(limit)
+        return f"{self.label}\n{stream.getvalue()}"
+
+
+class StackSampler:
+    """
+    Wall-clock sampling profiler: a background thread records the stack of
+    every other thread each interval via sys._current_frames().
+
+    Stacks are collapsed as "thread;outer (file:line);...;inner (file:line)"
+    with the line of each function's definition, so samples aggregate per
+    function. Threads parked in IDLE_FRAMES are left out unless
+    include_idle is set. Costs one GIL-holding stack walk per interval
+    while running and nothing otherwise.
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL_MS / 1000, include_idle: bool = False):
+        self.interval = interval
+        self.include_idle = include_idle
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._labels: Dict[Any, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = self._collapse(frame)
+                if stack is not None:
+                    self.stacks[f"{names.get(thread_id, thread_id)};{stack}"] += 1
+            self.samples += 1
+
+    def _collapse(self, frame) -> Optional[str]:
+        frames: List[str] = []
+        leaf = frame.f_code
+        if not self.include_idle and (os.path.basename(leaf.co_filename), leaf.co_name) in IDLE_FRAMES:
+            return None
+        while frame is not None:
+            frames.append(self._label(frame.f_code))
+            frame = frame.f_back
+        return ";".join(reversed(frames))
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            path = code.co_filename.replace(os.sep, "/").rsplit("/", 2)
+            label = f"{code.co_name} ({'/'.join(path[-2:])}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+
+class ProfileSession:
+    """
+    Records one profile, for a time window or one request.
+
+    "sample" samples every thread, pool workers included. "cprofile"
+    traces every call on the thread that starts it, the event loop's,
+    where routes and middleware run; work offloaded to executor pools
+    shows up there only as the awaiting coroutine, so profile it with
+    "sample".
+
+    Raises:
+        ProfilerBusy: On start() while another session is recording
+    """
+
+    def __init__(self, mode: str, label: str, interval: float = DEFAULT_INTERVAL_MS / 1000,
+                 include_idle: bool = False):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode: {mode} (use {' or '.join(MODES)})")
+        self.id = os.urandom(8).hex()
+        self.mode = mode
+        self.label = label
+        self._sampler = StackSampler(interval, include_idle) if mode == "sample" else None
+        self._profiler = cProfile.Profile() if mode == "cprofile" else None
+        self._started = 0.0
+        self._started_wall = 0.0
+
+    def start(self):
+        if not _session_lock.acquire(blocking=False):
+            raise ProfilerBusy("Another profile is being recorded in this worker")
+        self._started_wall = time.time()
+        self._started = time.perf_counter()
+        if self._sampler is not None:
+            self._sampler.start()
+        else:
+            self._profiler.enable()
+
+    def stop(self) -> Profile:
+        try:
+            seconds = time.perf_counter() - self._started
+            if self._sampler is not None:
+                self._sampler.stop()
+                return Profile(self.id, self.mode, self.label, self._started_wall, seconds,
+                               stacks=self._sampler.stacks, samples=self._sampler.samples)
+            self._profiler.disable()
+            self._profiler.create_stats()
+            return Profile(self.id, self.mode, self.label, self._started_wall, seconds, stats=self._profiler.stats)
+        finally:
+            _session_lock.release()
+
+
+def store_profile(profile: Profile):
+    """Keep a per-request profile for later download."""
+    _stored[profile.id] = profile
+    while len(_stored) > MAX_STORED_PROFILES:
+        _stored.popitem(last=False)
+
+
+def get_profile(profile_id: str) -> Optional[Profile]:
+    return _stored.get(profile_id)
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """Stored per-request profiles, newest first."""
+    return [profile.describe() for profile in reversed(_stored.values())]
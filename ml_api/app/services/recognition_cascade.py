@@ -0,0 +1,135 @@
+import threading
+import time
+import cv2
+import numpy as np
+import logging
+from typing import Dict, Any, Callable, List, Optional
+
+from services.inference_backends import InferenceBackend
+
+logger = logging.getLogger(__name__)
+
+FIRST_STAGE = "first_stage"
+FULL_MODEL = "full_model"
+
+
+class RecognitionCascade:
+    """
+    Two-stage food classifier.
+
+    A cheap first-stage backend classifies a downscaled copy of every image.
+    When its confidence reaches the predicted food's confidence_threshold
+    the answer is accepted; otherwise the image goes to the full model.
+    Without a first stage every image goes straight to the full model.
+    Results are reported in the full model's label space; first-stage
+    labels the full model does not know are always escalated.
+    """
+
+    def __init__(
+        self,
+        full_model: InferenceBackend,
+        threshold_for: Callable[[str], float],
+        first_stage: Optional[InferenceBackend] = None,
+        first_stage_size: int = 96
+    ):
+        self.full_model = full_model
+        self.first_stage = first_stage
+        self.first_stage_size = first_stage_size
+        self.labels = full_model.labels
+
+        if first_stage is not None:
+            positions = {label: i for i, label in enumerate(self.labels)}
+            self._first_to_full = np.array([positions.get(label, -1) for label in first_stage.labels], dtype=np.int64)
+            self._first_thresholds = np.array([threshold_for(label) for label in first_stage.labels], dtype=np.float64)
+
+        self._lock = threading.Lock()
+        self._total = 0
+        self._short_circuited = 0
+        self._first_stage_seconds = 0.0
+        self._full_model_seconds = 0.0
+        self._label_total = np.zeros(len(self.labels), dtype=np.int64)
+        self._label_short_circuited = np.zeros(len(self.labels), dtype=np.int64)
+
+    def classify(self, batch: np.ndarray) -> tuple[np.ndarray, np.ndarray, List[str]]:
+        """
+        Classify a uint8 batch (N, H, W, C).
+
+        Returns:
+            Tuple of (label indices, confidences, answering stage per image)
+        """
+        n = len(batch)
+        if self.first_stage is None:
+            start = time.perf_counter()
+            top, confidence = self._top1(self.full_model.predict(batch))
+            self._record(n, np.zeros(n, dtype=bool), top, 0.0, time.perf_counter() - start)
+            return top, confidence, [FULL_MODEL] * n
+
+        start = time.perf_counter()
+        first_top, confidence = self._top1(self.first_stage.predict(self._downscale(batch)))
+        first_stage_seconds = time.perf_counter() - start
+
+        top = self._first_to_full[first_top]
+        accepted = (top >= 0) & (confidence >= self._first_thresholds[first_top])
+        full_model_seconds = 0.0
+        if not accepted.all():
+            start = time.perf_counter()
+            escalated = ~accepted
+            full_top, full_confidence = self._top1(self.full_model.predict(batch[escalated]))
+            top[escalated] = full_top
+            confidence[escalated] = full_confidence
+            full_model_seconds = time.perf_counter() - start
+
+        self._record(n, accepted, top, first_stage_seconds, full_model_seconds)
+        stages = [FIRST_STAGE if ok else FULL_MODEL for ok in accepted]
+        return top, confidence, stages
+
+    def stats(self) -> Dict[str, Any]:
+        """Short-circuit counters for tuning thresholds against CPU spend."""
+        with self._lock:
+            total = self._total
+            short_circuited = self._short_circuited
+            escalated = total - short_circuited
+            per_food = {
+                label: {
+                    "images": int(self._label_total[i]),
+                    "short_circuit_ratio": round(float(self._label_short_circuited[i] / self._label_total[i]), 4)
+                }
+                for i, label in enumerate(self.labels)
+                if self._label_total[i]
+            }
+            return {
+                "enabled": self.first_stage is not None,
+                "first_stage_backend": self.first_stage.name if self.first_stage else None,
+                "full_model_backend": self.full_model.name,
+                "total_images": total,
+                "first_stage_answered": short_circuited,
+                "full_model_answered": escalated,
+                "short_circuit_ratio": round(short_circuited / total, 4) if total else 0.0,
+                "avg_first_stage_ms": round(self._first_stage_seconds * 1000 / total, 3) if total else 0.0,
+                "avg_full_model_ms": round(self._full_model_seconds * 1000 / escalated, 3) if escalated else 0.0,
+                "per_food": per_food
+            }
+
+    def _downscale(self, batch: np.ndarray) -> np.ndarray:
+        size = (self.first_stage_size, self.first_stage_size)
+        return np.stack([cv2.resize(image, size, interpolation=cv2.INTER_AREA) for image in batch])
+
+    def _top1(self, probabilities: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        top = np.argmax(probabilities, axis=1)
+        return top, probabilities[np.arange(len(top)), top].astype(np.float64)
+
+    def _record(
+        self,
+        n: int,
+        accepted: np.ndarray,
+        top: np.ndarray,
+        first_stage_seconds: float,
+        full_model_seconds: float
+    ):
+        with self._lock:
+            self._total += n
+            self._short_circuited += int(accepted.sum())
+            self._first_stage_seconds += first_stage_seconds
+            self._full_model_seconds += full_model_seconds
+            np.add.at(self._label_total, top, 1)
+            np.add.at(self._label_short_circuited, top[accepted], 1)
@@ -0,0 +1,201 @@
+import hashlib
+import json
+import os
+import re
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_TTL_SECONDS = 3600
+
+REDIS_PREFIX = "healthsphere:chat:response:"
+
+# Words that do not change what a question asks for
+STOPWORDS = frozenset(
+    "a an the is are was be to of for in on at and or do does did can could should would "
+    "will i you your please some any about with tell give me get".split()
+)
+
+# Messages mentioning the user's own numbers or situation get a fresh reply
+PERSONAL_MARKERS = re.compile(r"\d|\b(?:my|mine|myself|i'm|im|i am|i've|i have|i had|i was|i weigh)\b")
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+
+
+def normalize_message(message: str) -> str:
+    """Fold case, punctuation, whitespace and stopwords: "Tips for sleep?" -> "tips sleep"."""
+    words = _NON_WORD.sub("", message.lower()).split()
+    return " ".join(word for word in words if word not in STOPWORDS)
+
+
+def is_personalized(message: str) -> bool:
+    """Whether a message refers to the user's own data, so a shared reply would not fit."""
+    return PERSONAL_MARKERS.search(message.lower().replace("’", "'")) is not None
+
+
+class ResponseCache:
+    """
+    Cache of generated chat replies keyed on normalized message and context.
+
+    The local tier is an LRU ordered dict with a per-entry TTL; with a
+    Redis client, replies are also shared between workers under
+    REDIS_PREFIX and local misses fall through to Redis before the
+    generator runs. Each entry remembers how long it took to generate,
+    so hits add up the latency they saved. Redis errors are logged and
+    treated as misses; the cache never fails a chat request.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        client=None
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.client = client
+        # key -> (expires_at, response, generation_ms), least recently used first
+        self._entries: "OrderedDict[str, tuple[float, Dict[str, Any], float]]" = OrderedDict()
+        self._counters = {
+            "hits": 0,
+            "redis_hits": 0,
+            "misses": 0,
+            "bypassed": 0,
+            "evicted": 0,
+            "redis_errors": 0
+        }
+        self._saved_ms = 0.0
+        self._generation_ms = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def key(self, message: str, context: str) -> Optional[str]:
+        """Cache key of a message, or None when the message must not be cached."""
+        if not self.enabled:
+            return None
+        if is_personalized(message):
+            self._counters["bypassed"] += 1
+            return None
+        return f"{context}:{normalize_message(message)}"
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached reply of a key, or None (counted as a miss)."""
+        started = time.perf_counter()
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] <= time.monotonic():
+            del self._entries[key]
+            entry = None
+
+        if entry is None and self.client is not None:
+            entry = await self._redis_get(key)
+            if entry is not None:
+                self._counters["redis_hits"] += 1
+                self._remember(key, entry[1], entry[2])
+
+        if entry is None:
+            self._counters["misses"] += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self._counters["hits"] += 1
+        self._saved_ms += max(entry[2] - (time.perf_counter() - started) * 1000, 0.0)
+        return entry[1]
+
+    async def put(self, key: str, response: Dict[str, Any], generation_ms: float):
+        """Cache a reply along with the time it took to generate."""
+        self._generation_ms += generation_ms
+        self._remember(key, response, generation_ms)
+        if self.client is not None:
+            await self._redis_set(key, response, generation_ms)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rate, saved latency and size of the cache."""
+        lookups = self._counters["hits"] + self._counters["misses"]
+        return {
+            "backend": "redis" if self.client is not None else "memory",
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            **self._counters,
+            "hit_rate": round(self._counters["hits"] / lookups, 4) if lookups else 0.0,
+            "saved_ms": round(self._saved_ms, 3),
+            "avg_generation_ms": round(self._generation_ms / self._counters["misses"], 3) if self._counters["misses"] else 0.0
+        }
+
+    async def close(self):
+        """Close the Redis connection, if any."""
+        if self.client is not None:
+            await self.client.aclose()
+
+    def _remember(self, key: str, response: Dict[str, Any], generation_ms: float):
+        """Insert into the local tier, evicting the least recently used entries."""
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, response, generation_ms)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters["evicted"] += 1
+
+    @staticmethod
+    def _redis_key(key: str) -> str:
+        """Fixed-length Redis key for a cache key."""
+        return REDIS_PREFIX + hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    async def _redis_get(self, key: str) -> Optional[tuple[float, Dict[str, Any], float]]:
+        """Look a key up in Redis."""
+        try:
+            raw = await self.client.get(self._redis_key(key))
+        except Exception as e:
+            self._counters["redis_errors"] += 1
+            logger.warning(f"Response cache Redis read failed: {str(e)}")
+            return None
+        if raw is None:
+            return None
+        data = json.loads(raw)
+        return 0.0, data["response"], data["generation_ms"]
+
+    async def _redis_set(self, key: str, response: Dict[str, Any], generation_ms: float):
+        """Share a reply through Redis with the cache TTL."""
+        try:
+            await self.client.set(
+                self._redis_key(key),
+                json.dumps({"response": response, "generation_ms": generation_ms}),
+                ex=max(int(self.ttl_seconds), 1)
+            )
+        except Exception as e:
+            self._counters["redis_errors"] += 1
+            logger.warning(f"Response cache Redis write failed: {str(e)}")
+
+
+def create_response_cache() -> ResponseCache:
+    """
+    Create the response cache from CHAT_RESPONSE_CACHE_* settings.
+
+    CHAT_RESPONSE_CACHE_SIZE=0 disables caching; CHAT_RESPONSE_CACHE_BACKEND=redis
+    adds the shared Redis tier (REDIS_URL).
+    """
+    limits = {
+        "max_entries": int(os.getenv("CHAT_RESPONSE_CACHE_SIZE", DEFAULT_MAX_ENTRIES)),
+        "ttl_seconds": float(os.getenv("CHAT_RESPONSE_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS))
+    }
+    backend = os.getenv("CHAT_RESPONSE_CACHE_BACKEND", "memory")
+
+    if backend == "redis" and limits["max_entries"] > 0:
+        try:
+            import redis.asyncio as redis
+
+            client = redis.Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379"))
+            logger.info("Chat responses cached in memory and Redis")
+            return ResponseCache(client=client, **limits)
+        except Exception as e:
+            logger.error(f"Failed to set up Redis response cache: {str(e)}")
+    elif backend not in ("memory", "redis"):
+        logger.error(f"Unknown response cache backend '{backend}', using in-memory cache")
+
+    return ResponseCache(**limits)
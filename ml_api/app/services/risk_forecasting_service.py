@@ -6,8 +6,13 @@ from sklearn.ensemble import RandomForestRegressor
 from sklearn.preprocessing import StandardScaler
 import joblib
 
+from services.executors import declare_pool, offload
+
 logger = logging.getLogger(__name__)
 
+# Feature extraction and the per-condition models run here, off the event loop
+risk_pool = declare_pool("risk", "RISK")
+
 class RiskForecastingService:
     """
     Service for forecasting long-term health risks.
@@ -66,7 +71,8 @@ class RiskForecastingService:
         
         return X, y
     
-    async def forecast_risk(
+    @offload(risk_pool)
+    def forecast_risk(
         self,
         health_metrics: Dict[str, Any],
         lifestyle_data: Dict[str, Any],
@@ -76,6 +82,8 @@ class RiskForecastingService:
         """
         Forecast health risks based on current metrics and lifestyle.
         
+        Runs in the risk pool.
+        
         Args:
             health_metrics: Current health measurements
             lifestyle_data: Lifestyle and demographic information
@@ -132,7 +140,7 @@ class RiskForecastingService:
                 "last_updated": "2024-01-01T00:00:00Z"
             }
             
-            logger.info(f"Risk forecast completed for user {user_id}")
+            logger.info("Risk forecast completed for user %s", user_id)
             return result
             
         except Exception as e:
@@ -0,0 +1,93 @@
+import datetime
+import json
+from typing import Any, Dict, List
+
+import numpy as np
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# NumPy scalars and arrays natively, and non-string dict keys (e.g. class indices)
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+
+
+def _default(value: Any) -> Any:
+    """Types neither encoder handles natively."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        # orjson only takes C-contiguous arrays of plain dtypes
+        return value.tolist()
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Serialize to compact UTF-8 JSON, NumPy values included.
+
+    Uses orjson when installed (NaN and infinity become null) and the
+    standard library otherwise (where they raise ValueError, as in
+    Starlette's JSONResponse).
+    """
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def to_columns(rows: List[Dict[str, Any]]) -> Dict[str, list]:
+    """
+    Turn a list of result dicts into one list per key.
+
+    Nested dicts are flattened with dotted keys ("result.food_name"), and
+    keys missing from a row are null, so every column has one entry per
+    row. Large batches shrink and parse faster without each row repeating
+    its keys.
+    """
+    columns: Dict[str, list] = {}
+    for position, row in enumerate(rows):
+        _append_row(columns, row, "", position)
+    for column in columns.values():
+        if len(column) < len(rows):
+            column.extend([None] * (len(rows) - len(column)))
+    return columns
+
+
+def _append_row(columns: Dict[str, list], row: Dict[str, Any], prefix: str, position: int):
+    for key, value in row.items():
+        if type(value) is dict and value:
+            _append_row(columns, value, f"{prefix}{key}.", position)
+            continue
+        name = f"{prefix}{key}"
+        column = columns.get(name)
+        if column is None:
+            column = columns[name] = []
+        if len(column) < position:
+            # Rows before this one lacked the key
+            column.extend([None] * (position - len(column)))
+        column.append(value)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with dumps(): NumPy scalars and arrays need no
+    conversion and the content is serialized in one pass.
+
+    Returning it from a route also skips FastAPI's jsonable_encoder walk,
+    which only runs on plain return values; the content must already be
+    JSON-ready apart from the types dumps() handles.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
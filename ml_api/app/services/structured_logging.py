@@ -0,0 +1,193 @@
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional
+
+DEFAULT_QUEUE_SIZE = 10000
+
+# Set per request by the logging middleware; log records pick them up
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+request_sampled_var: ContextVar[bool] = ContextVar("request_sampled", default=True)
+
+# LogRecord attributes that are not user-supplied extra fields
+_RESERVED = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional["NonBlockingQueueHandler"] = None
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """Parse "/health=0,/food-recognition/search=0.1" into path prefix -> rate."""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        prefix, _, rate = item.partition("=")
+        rates[prefix.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+
+class RouteSampler:
+    """
+    Decides per request whether its info-level logs are kept.
+
+    The longest configured path prefix sets the rate; unmatched paths use
+    default_rate. Warnings and errors are never sampled away.
+    """
+
+    def __init__(self, rates: Dict[str, float], default_rate: float = 1.0):
+        # Longest prefix first so the most specific rule wins
+        self.rates = sorted(rates.items(), key=lambda item: -len(item[0]))
+        self.default_rate = default_rate
+
+    def rate_for(self, path: str) -> float:
+        for prefix, rate in self.rates:
+            if path.startswith(prefix):
+                return rate
+        return self.default_rate
+
+    def sample(self, path: str) -> bool:
+        rate = self.rate_for(path)
+        return rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Stamps records with the current request ID and drops info-level
+    records of requests that were not sampled.
+
+    Runs in the thread that logs, before the record is queued, because
+    the request context lives in that thread's contextvars.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING and not request_sampled_var.get():
+            return False
+        record.request_id = request_id_var.get()
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread.
+
+    The stock QueueHandler formats the message before queueing; this one
+    queues the record untouched, so %-style arguments are only rendered
+    off the event loop (they must not be mutated after the call). A full
+    queue drops the record and counts it instead of blocking.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, request_id and extra fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id is not None:
+            entry["request_id"] = request_id
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines with the request ID, for local development."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if not hasattr(record, "request_id"):
+            record.request_id = None
+        return super().format(record)
+
+
+def configure_logging(
+    level: Optional[str] = None,
+    log_format: Optional[str] = None,
+    queue_size: Optional[int] = None
+):
+    """
+    Route all logging through a bounded queue to a background listener.
+
+    The calling thread only creates the record and enqueues it;
+    formatting and stream I/O happen in the listener thread. Caller
+    file/line information is not collected.
+    Settings default to LOG_LEVEL (INFO), LOG_FORMAT (json or text) and
+    LOG_QUEUE_SIZE. Calling it again replaces the previous setup.
+    """
+    global _listener, _queue_handler
+
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    log_format = log_format or os.getenv("LOG_FORMAT", "json")
+    queue_size = queue_size or int(os.getenv("LOG_QUEUE_SIZE", DEFAULT_QUEUE_SIZE))
+
+    shutdown_logging()
+
+    # Skip per-record work the formatters never use (see "Optimization" in
+    # the logging docs): caller frame lookup, thread and process names
+    logging._srcfile = None
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(TextFormatter() if log_format == "text" else JsonFormatter())
+
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    _queue_handler = NonBlockingQueueHandler(log_queue)
+    _queue_handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Stop the listener after it has written every queued record."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def logging_stats() -> Dict[str, Any]:
+    """Queue depth and dropped record count."""
+    if _queue_handler is None:
+        return {"configured": False}
+    return {
+        "configured": True,
+        "queued": _queue_handler.queue.qsize(),
+        "dropped": _queue_handler.dropped
+    }
@@ -0,0 +1,401 @@
+"""
+End-to-end latency of the ML API endpoints.
+
+Drives main.app in-process through httpx's ASGI transport (the whole
+middleware stack, routing, validation and serialization, no network),
+or a running server with --url. Payloads are generated: food photos
+encoded as JPEG, 50 Hz accelerometer and gyroscope windows, health
+profiles and chat questions. Batch endpoints run once per --batch-sizes
+entry.
+
+For each scenario it reports throughput, p50/p95/p99 latency, non-2xx
+responses and, in-process only, the Python memory a request allocates at
+its peak and keeps afterwards (tracemalloc, measured in a separate
+sequential pass so tracing does not skew the timings).
+
+Results are saved as a JSON baseline; compare flags scenarios that got
+slower, lost throughput or allocate more and exits non-zero.
+
+Usage:
+    python benchmarks/api_benchmark.py run --output benchmarks/baselines/main.json
+    python benchmarks/api_benchmark.py run --url http://127.0.0.1:8000 --concurrency 16
+    python benchmarks/api_benchmark.py run --only food-recognition --batch-sizes 1,8
+    python benchmarks/api_benchmark.py compare benchmarks/baselines/main.json current.json
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+ML_API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ML_API_DIR)
+sys.path.insert(0, os.path.join(ML_API_DIR, "app"))
+
+import httpx
+import numpy as np
+from PIL import Image, ImageDraw
+
+# Payload variants per scenario, cycled so caches see more than one input
+VARIANTS = 8
+
+CHAT_QUESTIONS = [
+    "How much protein should I eat after a workout?",
+    "Is oatmeal a good breakfast for weight loss?",
+    "What can I do to lower my blood pressure?",
+    "How many hours of sleep do I need?",
+    "Suggest a healthy snack under 200 calories",
+    "How often should I do cardio each week?",
+    "Are eggs bad for cholesterol?",
+    "What should I eat before running in the morning?",
+]
+
+
+def make_photo(rng: np.random.Generator, width: int = 640, height: int = 480) -> bytes:
+    """A plate of food-coloured blobs with sensor noise, as a phone camera JPEG."""
+    image = Image.new("RGB", (width, height), tuple(int(c) for c in rng.integers(150, 230, 3)))
+    draw = ImageDraw.Draw(image)
+    draw.ellipse((width * 0.1, height * 0.05, width * 0.9, height * 0.95), fill=(236, 236, 232))
+    for _ in range(rng.integers(2, 5)):
+        x, y = rng.uniform(0.25, 0.75) * width, rng.uniform(0.25, 0.75) * height
+        rx, ry = rng.uniform(0.06, 0.16) * width, rng.uniform(0.06, 0.16) * height
+        draw.ellipse((x - rx, y - ry, x + rx, y + ry), fill=tuple(int(c) for c in rng.integers(40, 220, 3)))
+    pixels = np.asarray(image, dtype=np.int16) + rng.normal(0, 6, (height, width, 3)).astype(np.int16)
+    buffer = io.BytesIO()
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(buffer, "JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def make_activity(rng: np.random.Generator, seconds: int = 10, hz: int = 50) -> dict:
+    """A walking-like sensor window: a 1.5-2.5 Hz step rhythm over gravity."""
+    t = np.arange(seconds * hz) / hz
+    step = rng.uniform(1.5, 2.5)
+    noise = lambda scale: rng.normal(0, scale, t.size)
+    data = {
+        "accelerometer_x": 0.3 * np.sin(2 * np.pi * step * t) + noise(0.05),
+        "accelerometer_y": 0.2 * np.cos(2 * np.pi * step * t) + noise(0.05),
+        "accelerometer_z": 9.81 + 1.2 * np.sin(4 * np.pi * step * t) + noise(0.1),
+        "gyroscope_x": 0.4 * np.sin(2 * np.pi * step * t + 0.5) + noise(0.02),
+        "gyroscope_y": 0.1 * np.sin(2 * np.pi * step * t) + noise(0.02),
+        "gyroscope_z": noise(0.02),
+        "timestamp": t * 1000
+    }
+    return {
+        "data": {name: [round(float(v), 4) for v in values] for name, values in data.items()},
+        "duration_seconds": seconds,
+        "user_id": f"bench-{rng.integers(1000)}"
+    }
+
+
+def make_profile(rng: np.random.Generator) -> dict:
+    """An adult's health metrics and lifestyle answers."""
+    choice = lambda options: options[rng.integers(len(options))]
+    return {
+        "health_metrics": {
+            "weight": round(float(rng.uniform(50, 110)), 1),
+            "height": round(float(rng.uniform(150, 195)), 1),
+            "blood_pressure_systolic": int(rng.integers(100, 160)),
+            "blood_pressure_diastolic": int(rng.integers(60, 100)),
+            "heart_rate": int(rng.integers(55, 95)),
+            "cholesterol_total": round(float(rng.uniform(150, 260)), 1),
+            "cholesterol_hdl": round(float(rng.uniform(35, 80)), 1),
+            "cholesterol_ldl": round(float(rng.uniform(70, 180)), 1),
+            "blood_glucose": round(float(rng.uniform(75, 140)), 1)
+        },
+        "lifestyle_data": {
+            "age": int(rng.integers(20, 75)),
+            "gender": choice(["male", "female"]),
+            "smoking_status": choice(["never", "former", "current"]),
+            "alcohol_consumption": choice(["none", "light", "moderate", "heavy"]),
+            "physical_activity_level": choice(["sedentary", "light", "moderate", "active", "very_active"]),
+            "diet_quality": choice(["poor", "fair", "good", "excellent"]),
+            "stress_level": choice(["low", "moderate", "high"]),
+            "sleep_hours": round(float(rng.uniform(5, 9)), 1),
+            "family_history": {
+                "diabetes": bool(rng.integers(2)),
+                "heart_disease": bool(rng.integers(2)),
+                "hypertension": bool(rng.integers(2))
+            }
+        },
+        "time_horizon_years": 5,
+        "user_id": f"bench-{rng.integers(1000)}"
+    }
+
+
+def build_scenarios(batch_sizes: list, seed: int) -> list:
+    """
+    (name, method, path, request kwargs per variant) for every endpoint
+    and batch size.
+    """
+    rng = np.random.default_rng(seed)
+    photos = [make_photo(rng) for _ in range(max(batch_sizes + [VARIANTS]))]
+    activities = [make_activity(rng) for _ in range(max(batch_sizes + [VARIANTS]))]
+    profiles = [make_profile(rng) for _ in range(max(batch_sizes + [VARIANTS]))]
+
+    def photo_files(offset: int, count: int, field: str) -> list:
+        return [
+            (field, (f"meal_{i}.jpg", photos[(offset + i) % len(photos)], "image/jpeg"))
+            for i in range(count)
+        ]
+
+    def rotate(items: list, offset: int, count: int) -> list:
+        return [items[(offset + i) % len(items)] for i in range(count)]
+
+    scenarios = [
+        ("food-recognition", "POST", "/food-recognition/",
+         [{"files": photo_files(v, 1, "image"), "data": {"user_id": "bench"}} for v in range(VARIANTS)]),
+        ("food-recognition plate", "POST", "/food-recognition/plate",
+         [{"files": photo_files(v, 1, "image"), "data": {"user_id": "bench"}} for v in range(VARIANTS)]),
+        ("activity-detect", "POST", "/activity-detect/",
+         [{"json": activities[v]} for v in range(VARIANTS)]),
+        ("risk-forecast", "POST", "/risk-forecast/",
+         [{"json": profiles[v]} for v in range(VARIANTS)]),
+        ("chat", "POST", "/chat/",
+         [{"json": {"message": CHAT_QUESTIONS[v % len(CHAT_QUESTIONS)], "user_id": f"bench-{v}"}} for v in range(VARIANTS)]),
+        ("chat classify", "POST", "/chat/classify",
+         [{"json": {"messages": rotate(CHAT_QUESTIONS, v, 4)}} for v in range(VARIANTS)]),
+    ]
+    for size in batch_sizes:
+        scenarios += [
+            (f"food-recognition batch n={size}", "POST", "/food-recognition/batch",
+             [{"files": photo_files(v, size, "images"), "data": {"user_id": "bench"}} for v in range(VARIANTS)]),
+            (f"activity-detect batch n={size}", "POST", "/activity-detect/batch",
+             [{"json": rotate(activities, v, size)} for v in range(VARIANTS)]),
+            (f"risk-forecast comparison n={size}", "POST", "/risk-forecast/comparison",
+             [{"json": rotate(profiles, v, size)} for v in range(VARIANTS)]),
+        ]
+    return scenarios
+
+
+async def load(client: httpx.AsyncClient, method: str, path: str, variants: list,
+               requests: int, concurrency: int) -> tuple:
+    """Send requests from concurrent clients; returns (seconds, latencies in s, status counts)."""
+    latencies, statuses = [], {}
+    sent = 0
+
+    async def worker():
+        nonlocal sent
+        while sent < requests:
+            kwargs = variants[sent % len(variants)]
+            sent += 1
+            started = time.perf_counter()
+            response = await client.request(method, path, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - started, latencies, statuses
+
+
+async def measure_allocations(client: httpx.AsyncClient, method: str, path: str,
+                              variants: list, requests: int) -> dict:
+    """Mean KiB of Python memory allocated at a request's peak and kept after it."""
+    peaks, kept = [], []
+    tracemalloc.start()
+    try:
+        for i in range(requests):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            await client.request(method, path, **variants[i % len(variants)])
+            current, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            kept.append(current - before)
+    finally:
+        tracemalloc.stop()
+    return {
+        "alloc_peak_kib": float(np.mean(peaks)) / 1024,
+        "alloc_kept_kib": float(np.mean(kept)) / 1024
+    }
+
+
+async def run_scenarios(client: httpx.AsyncClient, scenarios: list, args: argparse.Namespace, in_process: bool) -> dict:
+    results = {}
+    for name, method, path, variants in scenarios:
+        # Warm caches, pools and lazily loaded models before timing
+        await load(client, method, path, variants, args.warmup, 1)
+        elapsed, latencies, statuses = await load(client, method, path, variants, args.requests, args.concurrency)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+        result = {
+            "method": method,
+            "path": path,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "requests_per_second": args.requests / elapsed,
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+            "errors": sum(count for status, count in statuses.items() if status >= 400),
+            "statuses": {str(status): count for status, count in sorted(statuses.items())}
+        }
+        if in_process and args.alloc_requests:
+            result.update(await measure_allocations(client, method, path, variants, args.alloc_requests))
+        results[name] = result
+        print_result(name, result)
+    return results
+
+
+def print_result(name: str, result: dict):
+    allocations = ""
+    if "alloc_peak_kib" in result:
+        allocations = f", alloc peak {result['alloc_peak_kib']:8.1f} KiB kept {result['alloc_kept_kib']:7.1f} KiB"
+    errors = f", {result['errors']} errors {result['statuses']}" if result["errors"] else ""
+    print(f"{name:<36} {result['requests_per_second']:8.1f} req/s, p50 {result['p50_ms']:7.2f} ms, "
+          f"p95 {result['p95_ms']:7.2f} ms, p99 {result['p99_ms']:7.2f} ms{allocations}{errors}")
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ML_API_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def run(args: argparse.Namespace) -> dict:
+    batch_sizes = [int(size) for size in args.batch_sizes.split(",") if size]
+    scenarios = build_scenarios(batch_sizes, args.seed)
+    if args.only:
+        scenarios = [s for s in scenarios if any(part in s[0] for part in args.only)]
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout)
+    else:
+        # Keep logs out of the report unless asked for (failures show up as
+        # error statuses); must precede importing the app
+        os.environ.setdefault("LOG_LEVEL", "CRITICAL")
+        from main import app
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://benchmark", timeout=args.timeout
+        )
+
+    target = args.url or "in-process"
+    print(f"{target}: {args.requests} requests per scenario, {args.concurrency} concurrent, commit {git_commit()}")
+    async with client:
+        results = await run_scenarios(client, scenarios, args, in_process=not args.url)
+
+    return {
+        "meta": {
+            "target": target,
+            "commit": git_commit(),
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "batch_sizes": batch_sizes
+        },
+        "results": results
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float, min_delta_ms: float) -> list:
+    """
+    Regressions of current against baseline, as printable lines.
+
+    Latency and allocations regress when they grow by more than threshold
+    (a fraction), latency also by more than min_delta_ms; throughput when
+    it falls by more than threshold; errors whenever there are more.
+    """
+    regressions = []
+    for name, new in current["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            print(f"{name:<36} new scenario")
+            continue
+
+        changes = []
+        old_rps, new_rps = old["requests_per_second"], new["requests_per_second"]
+        change = (new_rps - old_rps) / old_rps if old_rps else 0.0
+        changes.append(f"{new_rps:8.1f} req/s ({change:+6.1%})")
+        if change < -threshold:
+            regressions.append(f"{name}: throughput {old_rps:.1f} -> {new_rps:.1f} req/s ({change:+.1%})")
+
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            change = (new[key] - old[key]) / old[key] if old[key] else 0.0
+            changes.append(f"{key[:3]} {new[key]:7.2f} ms ({change:+6.1%})")
+            if change > threshold and new[key] - old[key] > min_delta_ms:
+                regressions.append(f"{name}: {key[:3]} {old[key]:.2f} -> {new[key]:.2f} ms ({change:+.1%})")
+
+        if "alloc_peak_kib" in old and "alloc_peak_kib" in new:
+            change = (new["alloc_peak_kib"] - old["alloc_peak_kib"]) / old["alloc_peak_kib"] if old["alloc_peak_kib"] else 0.0
+            changes.append(f"alloc {new['alloc_peak_kib']:8.1f} KiB ({change:+6.1%})")
+            if change > threshold:
+                regressions.append(
+                    f"{name}: peak allocation {old['alloc_peak_kib']:.1f} -> {new['alloc_peak_kib']:.1f} KiB ({change:+.1%})"
+                )
+
+        old_rate = old["errors"] / old["requests"]
+        new_rate = new["errors"] / new["requests"]
+        if new_rate > old_rate:
+            regressions.append(f"{name}: error rate {old_rate:.1%} -> {new_rate:.1%} {new['statuses']}")
+
+        print(f"{name:<36} " + ", ".join(changes))
+
+    for name in baseline["results"].keys() - current["results"].keys():
+        print(f"{name:<36} missing from current run")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ML API endpoints and compare against baselines")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Benchmark every endpoint")
+    run_parser.add_argument("--url", help="Running server to benchmark instead of main.app in-process")
+    run_parser.add_argument("--requests", type=int, default=200, help="Timed requests per scenario")
+    run_parser.add_argument("--concurrency", type=int, default=8)
+    run_parser.add_argument("--warmup", type=int, default=10, help="Untimed requests per scenario")
+    run_parser.add_argument("--alloc-requests", type=int, default=20,
+                            help="Sequential requests traced for allocations (in-process only; 0 to skip)")
+    run_parser.add_argument("--batch-sizes", default="1,8,32")
+    run_parser.add_argument("--only", action="append", help="Run scenarios whose name contains this (repeatable)")
+    run_parser.add_argument("--timeout", type=float, default=60.0)
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--output", help="Write the results to this JSON baseline")
+
+    compare_parser = commands.add_parser("compare", help="Flag regressions between two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10,
+                                help="Allowed relative change before flagging, e.g. 0.10 for 10%%")
+    compare_parser.add_argument("--min-delta-ms", type=float, default=0.5,
+                                help="Ignore latency changes smaller than this, to ride out noise")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        report = asyncio.run(run(args))
+        if args.output:
+            os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"Saved {args.output}")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    if baseline["meta"]["target"] != current["meta"]["target"]:
+        print(f"Warning: comparing {baseline['meta']['target']} against {current['meta']['target']}")
+
+    regressions = compare(baseline, current, args.threshold, args.min_delta_ms)
+    if regressions:
+        print(f"\n{len(regressions)} regressions against {baseline['meta']['commit']}:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print(f"\nNo regressions against {baseline['meta']['commit']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Open time and lookup latency of the barcode index at scale.
+
+Generates random valid EAN-13 codes, saves an index, reopens it
+memory-mapped and times lookups of present and absent barcodes.
+
+Usage:
+    python benchmarks/barcode_lookup_benchmark.py --codes 20000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from services.array_store import StringTable
+from services.barcode_index import BarcodeIndex, sort_codes
+from services.nutrient_aggregation import NUTRIENTS
+
+
+def random_ean13(n: int, rng: np.random.Generator) -> np.ndarray:
+    """Random EAN-13 codes with valid check digits, as integers."""
+    body = rng.integers(0, 10 ** 12, size=n, dtype=np.uint64)
+    total = np.zeros(n, dtype=np.uint64)
+    remaining = body.copy()
+    # Digits from the right get weights 3, 1, 3, ...
+    for position in range(12):
+        total += (remaining % 10) * np.uint64(3 if position % 2 == 0 else 1)
+        remaining //= np.uint64(10)
+    check = (np.uint64(10) - total % np.uint64(10)) % np.uint64(10)
+    return body * np.uint64(10) + check
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark barcode lookups")
+    parser.add_argument("--codes", type=int, default=20000000)
+    parser.add_argument("--products", type=int, default=100000, help="Distinct products the codes point at")
+    parser.add_argument("--lookups", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    codes = random_ean13(args.codes, rng)
+    rows = rng.integers(0, args.products, size=args.codes)
+    # The product store is not what is measured, so product names are shared
+    products = StringTable.from_strings([f"product {i}" for i in range(args.products)])
+
+    start = time.perf_counter()
+    codes, rows = sort_codes(codes, rows)
+    index = BarcodeIndex(
+        codes, rows, products, StringTable.from_strings([""] * args.products),
+        rng.uniform(0, 50, size=(args.products, len(NUTRIENTS))).astype(np.float32),
+        np.zeros(args.products, dtype=np.int64)
+    )
+    print(f"sort: {len(index)} unique codes in {time.perf_counter() - start:.1f}s")
+
+    with tempfile.TemporaryDirectory() as directory:
+        index.save(directory)
+        start = time.perf_counter()
+        index = BarcodeIndex.load(directory)
+        print(f"open: {(time.perf_counter() - start) * 1000:.2f}ms")
+
+        present = [f"{int(code):013d}" for code in index.codes[rng.integers(0, len(index), size=args.lookups)]]
+        absent = [f"{int(code):013d}" for code in random_ean13(args.lookups, rng)]
+        for label, upcs in (("hit", present), ("miss", absent)):
+            latencies = []
+            for upc in upcs:
+                start = time.perf_counter()
+                index.lookup(upc)
+                latencies.append(time.perf_counter() - start)
+            latencies = np.array(latencies) * 1000
+            print(f"{label:<5} p50={np.percentile(latencies, 50):.4f}ms p99={np.percentile(latencies, 99):.4f}ms")
+
+
+if __name__ == "__main__":
+    main()
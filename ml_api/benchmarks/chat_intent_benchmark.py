@@ -0,0 +1,73 @@
+"""
+Intent matching cost as the number of intents grows.
+
+Adds synthetic intents (each with its own keywords) to the shipped intent
+file and times classification of realistic chat messages, to check that
+per-message cost stays flat as intents are added.
+
+Usage:
+    python benchmarks/chat_intent_benchmark.py --intents 10 100 1000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from services.intent_matcher import DEFAULT_INTENTS_PATH, IntentMatcher
+
+MESSAGES = [
+    "How much should I exercise every week?",
+    "Any tips for sleep? I keep waking up at 3am",
+    "I want to lose weight but I love pizza",
+    "My blood pressure was high at the doctor today",
+    "What should I eat for breakfast with diabetes?",
+    "Feeling really stressed and anxious about work lately",
+    "hello",
+    "Can you recommend a good cardio workout for beginners that is easy on the knees?"
+]
+
+
+def synthetic_intents(count: int, rng: np.random.Generator) -> list[dict]:
+    letters = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    intents = []
+    for i in range(count):
+        keywords = {"".join(rng.choice(letters, size=rng.integers(4, 10))): 1.0 for _ in range(8)}
+        intents.append({"name": f"synthetic_{i}", "keywords": keywords, "responses": ["..."]})
+    return intents
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chat intent matching")
+    parser.add_argument("--intents", type=int, nargs="+", default=[0, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with open(DEFAULT_INTENTS_PATH, encoding="utf-8") as f:
+        data = json.load(f)
+    rng = np.random.default_rng(args.seed)
+
+    for extra in args.intents:
+        intents = data["intents"] + synthetic_intents(extra, rng)
+        start = time.perf_counter()
+        matcher = IntentMatcher(intents, data["default_intent"])
+        compile_ms = (time.perf_counter() - start) * 1000
+
+        latencies = []
+        for i in range(args.repeat):
+            message = MESSAGES[i % len(MESSAGES)]
+            start = time.perf_counter()
+            matcher.classify(message)
+            latencies.append(time.perf_counter() - start)
+        latencies = np.array(latencies) * 1e6
+        print(f"{len(intents):>6} intents {len(matcher.keywords):>6} keywords  compile={compile_ms:.1f}ms  "
+              f"p50={np.percentile(latencies, 50):.1f}us p99={np.percentile(latencies, 99):.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Write cost and restart recovery time of the persistent chat store.
+
+Appends --messages messages over --conversations conversations through
+the in-memory store with and without a ConversationJournal, then closes
+the journaled store and reopens it from the log alone and again from a
+snapshot plus a short log tail.
+
+Usage:
+    python benchmarks/chat_journal_benchmark.py --messages 1000000
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from services.conversation_journal import ConversationJournal
+from services.conversation_store import InMemoryConversationStore
+
+
+def directory_size(directory: str) -> int:
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+
+async def fill(store: InMemoryConversationStore, conversations: int, messages: int) -> float:
+    """Create conversations and append messages round-robin; returns seconds spent appending."""
+    for i in range(conversations):
+        await store.create(f"conversation-{i}", f"user-{i % 1000}", "health_coaching")
+    started = time.perf_counter()
+    for i in range(messages):
+        await store.append_message(f"conversation-{i % conversations}", {
+            "message": "How much should I exercise every week to stay healthy?",
+            "is_user": i % 2 == 0,
+            "timestamp": "2024-01-01T00:00:00",
+            "user_id": f"user-{i % 1000}"
+        })
+    return time.perf_counter() - started
+
+
+def open_store(directory: str, max_conversations: int, max_messages: int, snapshot_interval: float) -> tuple[InMemoryConversationStore, float]:
+    started = time.perf_counter()
+    store = InMemoryConversationStore(
+        max_conversations=max_conversations,
+        max_messages=max_messages,
+        sweep_interval=0,
+        journal=ConversationJournal(directory, snapshot_interval=snapshot_interval)
+    )
+    return store, time.perf_counter() - started
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark chat store persistence")
+    parser.add_argument("--messages", type=int, default=1000000)
+    parser.add_argument("--conversations", type=int, default=10000)
+    args = parser.parse_args()
+    max_messages = args.messages // args.conversations + 1
+
+    plain = InMemoryConversationStore(max_conversations=args.conversations, max_messages=max_messages, sweep_interval=0)
+    baseline = await fill(plain, args.conversations, args.messages)
+    print(f"memory only      {baseline / args.messages * 1e6:6.2f} us/message")
+
+    directory = tempfile.mkdtemp()
+    try:
+        store, _ = open_store(directory, args.conversations, max_messages, snapshot_interval=3600)
+        journaled = await fill(store, args.conversations, args.messages)
+        await store.close()
+        print(f"with journal     {journaled / args.messages * 1e6:6.2f} us/message "
+              f"(+{(journaled - baseline) / args.messages * 1e6:.2f} us), log {directory_size(directory) / 1e6:.0f} MB")
+
+        store, seconds = open_store(directory, args.conversations, max_messages, snapshot_interval=3600)
+        stats = await store.stats()
+        print(f"replay log       {seconds:6.2f} s for {stats['messages']} messages")
+
+        started = time.perf_counter()
+        store._journal._snapshot(store._snapshot_state)
+        snapshot_seconds = time.perf_counter() - started
+        await store.close()
+        print(f"write snapshot   {snapshot_seconds:6.2f} s, {directory_size(directory) / 1e6:.0f} MB")
+
+        store, seconds = open_store(directory, args.conversations, max_messages, snapshot_interval=3600)
+        stats = await store.stats()
+        await store.close()
+        print(f"replay snapshot  {seconds:6.2f} s for {stats['messages']} messages")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,119 @@
+"""
+Event-loop responsiveness under concurrent CPU-bound load.
+
+Recognizes food photos (JPEG decode, portion measurement, resize,
+classification) from many concurrent coroutines, once inline on the
+event loop as before and once offloaded to the food-decode and
+food-inference pools, while a probe task measures how late a 5 ms sleep
+wakes up. Lateness is what every other request on the loop, /health
+included, would see. A final run with no queue shows saturation being
+rejected instead of queued.
+
+Usage:
+    python benchmarks/executor_benchmark.py --clients 32 --requests 400
+"""
+import argparse
+import asyncio
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+import numpy as np
+from PIL import Image
+
+from services import food_recognition_service
+from services.executors import PoolSaturated
+from services.food_recognition_service import FoodRecognitionService
+
+PROBE_INTERVAL = 0.005
+
+
+def make_photo() -> bytes:
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 256, size=(480, 640, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+async def probe(lags: list, stop: asyncio.Event):
+    """Record how late each short sleep wakes up, in ms."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append((time.perf_counter() - started - PROBE_INTERVAL) * 1000)
+
+
+async def load(recognize_photo, clients: int, requests: int) -> tuple[float, int, list]:
+    """Run requests recognitions from concurrent clients; returns (seconds, rejected, loop lags)."""
+    lags, stop = [], asyncio.Event()
+    probe_task = asyncio.create_task(probe(lags, stop))
+    remaining = requests
+    rejected = 0
+
+    async def client():
+        nonlocal remaining, rejected
+        while remaining > 0:
+            remaining -= 1
+            try:
+                await recognize_photo()
+            except PoolSaturated:
+                rejected += 1
+            # Let other coroutines run between inline calls, as separate requests would
+            await asyncio.sleep(0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe_task
+    return elapsed, rejected, lags
+
+
+def report(label: str, requests: int, elapsed: float, rejected: int, lags: list):
+    p50, p99, worst = np.percentile(lags, [50, 99, 100])
+    print(f"{label:<24} {requests / elapsed:7.1f} req/s, loop lag p50 {p50:6.2f} ms, "
+          f"p99 {p99:7.2f} ms, max {worst:7.2f} ms, rejected {rejected}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark event-loop lag with offloaded CPU work")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=400)
+    args = parser.parse_args()
+
+    service = FoodRecognitionService()
+    photo = make_photo()
+    preprocess = FoodRecognitionService.preprocess_image.__wrapped__
+    recognize = FoodRecognitionService.recognize_food.__wrapped__
+
+    async def recognize_inline():
+        image_array, portion = preprocess(service, photo)
+        return recognize(service, image_array, None, portion)
+
+    async def recognize_offloaded():
+        image_array, portion = await service.preprocess_image(photo)
+        return await service.recognize_food(image_array, None, portion)
+
+    pools = (food_recognition_service.decode_pool, food_recognition_service.inference_pool)
+    print(f"{args.clients} clients, {args.requests} photos, "
+          + ", ".join(f"{pool.name} pool of {pool.workers} workers" for pool in pools))
+
+    report("inline on the loop", args.requests, *asyncio.run(load(recognize_inline, args.clients, args.requests)))
+
+    for pool in pools:
+        pool.queue_size = args.clients
+    report("offloaded", args.requests, *asyncio.run(load(recognize_offloaded, args.clients, args.requests)))
+
+    for pool in pools:
+        pool.queue_size = 0
+    report("offloaded, no queue", args.requests, *asyncio.run(load(recognize_offloaded, args.clients, args.requests)))
+    for pool in pools:
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Query latency of the food alternatives index at scale.
+
+Generates synthetic foods with realistic allergen combinations, builds
+and saves the index, reopens it and measures per-query latency with and
+without constraints.
+
+Usage:
+    python benchmarks/food_alternatives_benchmark.py --foods 500000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from services.food_alternatives import ALLERGENS, FoodAlternativesIndex, allergen_mask
+
+# Common allergen combinations and how often they occur
+ALLERGEN_PROFILES = [
+    ([], 0.45), (["gluten"], 0.15), (["dairy"], 0.1), (["gluten", "dairy"], 0.1),
+    (["fish"], 0.04), (["shellfish"], 0.02), (["egg"], 0.03), (["gluten", "egg", "dairy"], 0.04),
+    (["soy"], 0.02), (["peanuts"], 0.01), (["tree_nuts"], 0.02), (["sesame", "gluten"], 0.02)
+]
+
+
+def synthetic_foods(n: int, rng: np.random.Generator) -> tuple[list[str], np.ndarray, list[list[str]]]:
+    macros = rng.dirichlet([2.0, 4.0, 2.0], size=n) * rng.uniform(5, 90, size=(n, 1))
+    protein, carbs, fat = macros.T
+    calories = 4 * protein + 4 * carbs + 9 * fat
+    fiber = rng.gamma(1.5, 1.5, size=n)
+    nutrients = np.column_stack([calories, protein, carbs, fat, fiber]).astype(np.float32)
+
+    profiles, weights = zip(*ALLERGEN_PROFILES)
+    choices = rng.choice(len(profiles), size=n, p=np.array(weights) / sum(weights))
+    return [f"food {i}" for i in range(n)], nutrients, [profiles[c] for c in choices]
+
+
+def measure(index: FoodAlternativesIndex, queries: np.ndarray, rng: np.random.Generator, **constraints) -> np.ndarray:
+    latencies = []
+    for row in queries:
+        nutrients = index.nutrients[row]
+        start = time.perf_counter()
+        index.query(
+            nutrients,
+            k=10,
+            exclude_allergens=constraints.get("exclude_allergens", 0),
+            max_calories=nutrients[0] if constraints.get("fewer_calories") else None,
+            min_protein=nutrients[1] if constraints.get("more_protein") else None,
+            exclude_row=int(row)
+        )
+        latencies.append(time.perf_counter() - start)
+    return np.array(latencies) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the food alternatives index")
+    parser.add_argument("--foods", type=int, default=500000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    names, nutrients, allergens = synthetic_foods(args.foods, rng)
+
+    start = time.perf_counter()
+    index = FoodAlternativesIndex.build(names, nutrients, allergens)
+    print(f"build: {len(index)} foods, {len(index.trees)} allergen groups in {time.perf_counter() - start:.2f}s")
+
+    with tempfile.TemporaryDirectory() as directory:
+        index.save(directory)
+        start = time.perf_counter()
+        index = FoodAlternativesIndex.load(directory)
+        print(f"load (trees rebuilt): {time.perf_counter() - start:.2f}s")
+
+        queries = rng.choice(len(index), size=args.queries, replace=False)
+        scenarios = {
+            "unconstrained": {},
+            "fewer calories": {"fewer_calories": True},
+            "fewer calories + more protein": {"fewer_calories": True, "more_protein": True},
+            "no gluten/dairy": {"exclude_allergens": allergen_mask(["gluten", "dairy"])},
+            "all constraints": {
+                "fewer_calories": True,
+                "more_protein": True,
+                "exclude_allergens": allergen_mask(list(ALLERGENS[:3]))
+            }
+        }
+        for label, constraints in scenarios.items():
+            latencies = measure(index, queries, rng, **constraints)
+            print(f"{label:<32} p50={np.percentile(latencies, 50):.3f}ms p99={np.percentile(latencies, 99):.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Lookup latency and recall of the food embedding vector index.
+
+Generates clustered synthetic embeddings (one cluster per food), builds
+the index, saves it, reopens it memory-mapped and measures per-query
+latency and top-1 label accuracy against the exact flat index.
+
+Usage:
+    python benchmarks/food_embedding_benchmark.py --references 1000000 --kind ivfpq
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from services.food_embedding_index import EMBEDDING_DIM, FlatIndex, VectorIndex, build_index
+
+
+def clustered_embeddings(n: int, n_foods: int, rng: np.random.Generator) -> tuple[np.ndarray, list[str]]:
+    centres = rng.normal(size=(n_foods, EMBEDDING_DIM)).astype(np.float32)
+    food_ids = rng.integers(0, n_foods, size=n)
+    vectors = centres[food_ids] + 0.6 * rng.normal(size=(n, EMBEDDING_DIM)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors, [f"food_{i}" for i in food_ids]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the food embedding index")
+    parser.add_argument("--references", type=int, default=1000000)
+    parser.add_argument("--foods", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--kind", choices=["auto", "flat", "ivfpq"], default="auto")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    vectors, labels = clustered_embeddings(args.references, args.foods, rng)
+    queries = vectors[rng.choice(len(vectors), args.queries, replace=False)]
+    queries = queries + 0.05 * rng.normal(size=queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    start = time.perf_counter()
+    index = build_index(vectors, labels, kind=args.kind)
+    print(f"build {index.kind}: {len(index)} references in {time.perf_counter() - start:.1f}s")
+
+    with tempfile.TemporaryDirectory() as directory:
+        index.save(directory)
+        start = time.perf_counter()
+        index = VectorIndex.load(directory)
+        print(f"mmap load: {(time.perf_counter() - start) * 1000:.1f}ms")
+
+        latencies = []
+        predicted = []
+        for query in queries:
+            start = time.perf_counter()
+            label_ids, _ = index.search(query[np.newaxis], k=args.k)
+            latencies.append(time.perf_counter() - start)
+            predicted.append(index.label_names[label_ids[0, 0]])
+
+    exact = FlatIndex(vectors, np.arange(len(vectors)), [])
+    neighbours, _ = exact.search(queries, k=1)
+    expected = [labels[i] for i in neighbours[:, 0]]
+    accuracy = np.mean([p == e for p, e in zip(predicted, expected)])
+
+    latencies = np.array(latencies) * 1000
+    print(f"search: p50={np.percentile(latencies, 50):.2f}ms p99={np.percentile(latencies, 99):.2f}ms "
+          f"top-1 label agreement with exact search={accuracy:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Compare food recognition inference backends on CPU.
+
+Each backend runs in a fresh process so its resident memory can be
+measured in isolation. Reports images/s, per-batch p50/p99 latency,
+RSS added by loading the model, model file size and top-1 agreement with
+a reference backend (normally the float32 Keras model).
+
+Usage:
+    python benchmarks/food_inference_benchmark.py \
+        --backend tensorflow=./models/food_recognition.h5 \
+        --backend tflite=./models/food_recognition.tflite \
+        --backend tflite_int8=./models/food_recognition_int8.tflite \
+        --reference tensorflow --images-dir ./data/calibration
+"""
+import argparse
+import importlib
+import json
+import multiprocessing
+import os
+import queue as queue_module
+import sys
+import time
+
+import numpy as np
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+sys.path.insert(0, APP_DIR)
+
+# Modules each backend imports lazily, in the order it tries them; imported
+# before the baseline RSS so only the model itself is measured
+FRAMEWORK_MODULES = {
+    "tensorflow": ["tensorflow"],
+    "tflite": ["tflite_runtime.interpreter", "tensorflow"],
+    "tflite_int8": ["tflite_runtime.interpreter", "tensorflow"],
+    "onnx": ["onnxruntime"],
+    "knn": ["services.food_embedding_index"]
+}
+
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process (Linux /proc, falls back to peak RSS)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def load_images(images_dir: str, count: int, seed: int) -> np.ndarray:
+    """Decode real images when given, otherwise generate random ones."""
+    if images_dir:
+        sys.path.insert(0, os.path.join(APP_DIR, "..", "scripts"))
+        from quantize_food_model import load_calibration_images
+        return load_calibration_images(images_dir, count)
+
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, size=(count, 224, 224, 3), dtype=np.uint8)
+
+
+def import_framework(name: str):
+    """Import the first available framework module of a backend, if any."""
+    for module in FRAMEWORK_MODULES.get(name, []):
+        try:
+            importlib.import_module(module)
+            return
+        except ImportError:
+            continue
+
+
+def run_backend(name: str, model_path: str, args: argparse.Namespace, queue: multiprocessing.Queue):
+    """Benchmark one backend; runs in a child process."""
+    from services.inference_backends import create_backend
+
+    images = load_images(args.images_dir, args.images, args.seed)
+    labels = [f"class_{i}" for i in range(args.num_classes)]
+
+    import_framework(name)
+    baseline_rss = current_rss_bytes()
+    backend = create_backend(name, labels, model_path)
+    backend.predict(images[:args.batch_size])  # warm-up
+    model_rss = current_rss_bytes() - baseline_rss
+
+    latencies = []
+    predictions = []
+    start = time.perf_counter()
+    for offset in range(0, len(images), args.batch_size):
+        batch = images[offset:offset + args.batch_size]
+        batch_start = time.perf_counter()
+        probabilities = backend.predict(batch)
+        latencies.append(time.perf_counter() - batch_start)
+        predictions.extend(np.argmax(probabilities, axis=1).tolist())
+    elapsed = time.perf_counter() - start
+
+    queue.put({
+        "backend": name,
+        "images_per_second": len(images) / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p99_ms": float(np.percentile(latencies, 99) * 1000),
+        "model_rss_mb": model_rss / 1e6,
+        "model_size_mb": backend.describe()["model_size_bytes"] / 1e6,
+        "predictions": predictions
+    })
+
+
+def collect_result(process: multiprocessing.Process, queue: multiprocessing.Queue, timeout: float) -> dict:
+    """
+    Wait for a child's result.
+
+    Raises:
+        RuntimeError: If the child exits without a result or runs past timeout
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return queue.get(timeout=1.0)
+        except queue_module.Empty:
+            if process.exitcode is not None:
+                raise RuntimeError(f"exited with code {process.exitcode} before reporting")
+            if time.monotonic() > deadline:
+                process.terminate()
+                raise RuntimeError(f"no result after {timeout:g}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark food inference backends")
+    parser.add_argument("--backend", action="append", required=True, metavar="NAME=MODEL_PATH",
+                        help="Backend to benchmark; repeat for several (use 'simulated=' for no model)")
+    parser.add_argument("--reference", help="Backend name whose predictions define top-1 agreement")
+    parser.add_argument("--images-dir", help="Directory of real images (default: random images)")
+    parser.add_argument("--images", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--num-classes", type=int, default=101)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=600, help="Seconds to wait for each backend")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for spec in args.backend:
+        name, _, model_path = spec.partition("=")
+        queue = context.Queue()
+        process = context.Process(target=run_backend, args=(name, model_path or None, args, queue))
+        process.start()
+        try:
+            results[name] = collect_result(process, queue, args.timeout)
+        except RuntimeError as e:
+            print(f"Backend '{name}' failed: {e}", file=sys.stderr)
+        process.join()
+
+    reference_predictions = None
+    if args.reference in results:
+        reference_predictions = np.array(results[args.reference]["predictions"])
+
+    rows = []
+    for result in results.values():
+        row = {k: v for k, v in result.items() if k != "predictions"}
+        if reference_predictions is not None:
+            row["top1_agreement"] = float(np.mean(np.array(result["predictions"]) == reference_predictions))
+        rows.append(row)
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    print(f"{'backend':<14}{'img/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'RSS MB':>10}{'size MB':>10}{'top-1':>8}")
+    for row in rows:
+        agreement = f"{row['top1_agreement']:.3f}" if "top1_agreement" in row else "-"
+        print(f"{row['backend']:<14}{row['images_per_second']:>10.1f}{row['p50_ms']:>10.2f}"
+              f"{row['p99_ms']:>10.2f}{row['model_rss_mb']:>10.1f}{row['model_size_mb']:>10.1f}{agreement:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Latency benchmark for the food search index.
+
+Generates a synthetic catalogue of food names, builds and saves the index,
+reopens it memory-mapped and measures search and autocomplete latency for
+misspelled queries.
+
+Usage:
+    python benchmarks/food_search_benchmark.py --size 300000 --queries 2000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from services.food_search_index import FoodSearchIndex
+
+BASES = [
+    "chicken breast", "salmon", "rice", "broccoli", "pizza", "salad", "apple", "banana",
+    "beef steak", "pork chop", "tofu", "lentil soup", "oatmeal", "yogurt", "cheddar cheese",
+    "spaghetti", "burrito", "sushi roll", "pancake", "omelette", "quinoa", "avocado toast",
+    "turkey sandwich", "tuna", "shrimp", "black beans", "sweet potato", "almonds", "granola"
+]
+MODIFIERS = [
+    "grilled", "baked", "fried", "steamed", "roasted", "raw", "smoked", "boiled", "spicy",
+    "organic", "low fat", "whole wheat", "homemade", "frozen", "canned", "fresh", "breaded"
+]
+BRANDS = [f"brand{i}" for i in range(700)]
+
+
+def generate_names(size: int, rng: random.Random) -> list[str]:
+    """Generate unique, realistic-looking food names."""
+    names = set()
+    while len(names) < size:
+        name = f"{rng.choice(MODIFIERS)} {rng.choice(BASES)} {rng.choice(BRANDS)}"
+        names.add(name)
+    return sorted(names)
+
+
+def misspell(name: str, rng: random.Random) -> str:
+    """Drop, duplicate or swap one character."""
+    chars = list(name)
+    i = rng.randrange(1, len(chars) - 1)
+    op = rng.choice(["drop", "dup", "swap"])
+    if op == "drop":
+        del chars[i]
+    elif op == "dup":
+        chars.insert(i, chars[i])
+    else:
+        chars[i], chars[i + 1] = chars[i + 1], chars[i]
+    return "".join(chars)
+
+
+def percentiles(samples: list[float]) -> str:
+    values = np.array(samples) * 1000
+    return (f"p50={np.percentile(values, 50):.2f}ms "
+            f"p95={np.percentile(values, 95):.2f}ms "
+            f"p99={np.percentile(values, 99):.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark food search latency")
+    parser.add_argument("--size", type=int, default=300000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    names = generate_names(args.size, rng)
+
+    start = time.perf_counter()
+    index = FoodSearchIndex.build(names)
+    print(f"build: {len(names)} names in {time.perf_counter() - start:.2f}s")
+
+    with tempfile.TemporaryDirectory() as directory:
+        index.save(directory)
+        start = time.perf_counter()
+        index = FoodSearchIndex.load(directory)
+        print(f"mmap load: {(time.perf_counter() - start) * 1000:.2f}ms")
+
+        queries = [misspell(rng.choice(BASES), rng) for _ in range(args.queries)]
+        search_times = []
+        for query in queries:
+            start = time.perf_counter()
+            index.search(query, limit=10)
+            search_times.append(time.perf_counter() - start)
+        print(f"search: {percentiles(search_times)}")
+
+        prefixes = [rng.choice(names)[:rng.randint(2, 10)] for _ in range(args.queries)]
+        autocomplete_times = []
+        for prefix in prefixes:
+            start = time.perf_counter()
+            index.autocomplete(prefix, limit=10)
+            autocomplete_times.append(time.perf_counter() - start)
+        print(f"autocomplete: {percentiles(autocomplete_times)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+BM25 retrieval latency over a large synthetic passage corpus.
+
+Builds a main segment of --passages synthetic passages (health words mixed
+with a long tail of random terms, Zipf-distributed) plus a small delta
+segment that replaces some of them, opens the index memory-mapped and
+times chat-style queries with and without a context filter.
+
+Usage:
+    python benchmarks/knowledge_index_benchmark.py --passages 100000 200000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from services.knowledge_index import DEFAULT_CORPUS_PATH, KnowledgeIndex, read_corpus, tokenize
+
+CONTEXTS = ["health_coaching", "diabetes_management", "cardiovascular_health", "mental_wellness"]
+
+QUERIES = [
+    "How much should I exercise every week?",
+    "Any tips for sleep? I keep waking up at 3am",
+    "I want to lose weight but I love pizza",
+    "My blood pressure was high at the doctor today",
+    "What should I eat for breakfast with diabetes?",
+    "Feeling really stressed and anxious about work lately",
+    "how do I lower cholesterol and salt in my diet"
+]
+
+
+def synthetic_passages(count: int, rng: np.random.Generator, start: int = 0) -> list[dict]:
+    """Passages of 40-120 words drawn from real corpus terms and random filler."""
+    real = sorted({term.decode() for p in read_corpus(DEFAULT_CORPUS_PATH) for term in tokenize(p["text"])})
+    letters = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    filler = ["".join(rng.choice(letters, size=rng.integers(4, 9))) for _ in range(50000)]
+    words = np.array(real + filler)
+    # Zipf ranks put the real health terms among the frequent words
+    ranks = np.minimum(rng.zipf(1.2, size=count * 120), len(words)) - 1
+    lengths = rng.integers(40, 121, size=count)
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    passages = []
+    for i in range(count):
+        text = " ".join(words[ranks[offsets[i]:offsets[i + 1]]])
+        contexts = list(rng.choice(CONTEXTS, size=rng.integers(0, 3), replace=False))
+        passages.append({"id": f"p{start + i}", "title": "", "text": text, "source": "synthetic", "contexts": contexts})
+    return passages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chat knowledge retrieval")
+    parser.add_argument("--passages", type=int, nargs="+", default=[100000])
+    parser.add_argument("--delta", type=int, default=1000, help="Passages in the delta segment")
+    parser.add_argument("--repeat", type=int, default=500)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    for count in args.passages:
+        with tempfile.TemporaryDirectory() as directory:
+            passages = synthetic_passages(count, rng)
+            start = time.perf_counter()
+            KnowledgeIndex.create(directory, passages)
+            build_s = time.perf_counter() - start
+
+            # The delta replaces existing ids, so their old versions are masked
+            delta = synthetic_passages(args.delta, rng, start=count - args.delta)
+            start = time.perf_counter()
+            KnowledgeIndex.add_segment(directory, delta)
+            delta_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            index = KnowledgeIndex.open(directory)
+            open_ms = (time.perf_counter() - start) * 1000
+
+            for context in (None, "diabetes_management"):
+                latencies = []
+                for i in range(args.repeat):
+                    start = time.perf_counter()
+                    index.search(QUERIES[i % len(QUERIES)], context=context, k=args.k)
+                    latencies.append(time.perf_counter() - start)
+                latencies = np.array(latencies) * 1000
+                print(f"{count:>8} passages  build={build_s:.1f}s delta={delta_ms:.0f}ms open={open_ms:.1f}ms  "
+                      f"context={context or '-':<20} p50={np.percentile(latencies, 50):.2f}ms "
+                      f"p99={np.percentile(latencies, 99):.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Per-request cost of the logging middleware on the event loop.
+
+Calls the middleware directly with a no-op downstream app, so the time
+measured is only request ID handling, sampling, record creation and
+enqueueing (or, for the old style, f-string formatting and synchronous
+handler I/O). Log output goes to a temporary file.
+
+Usage:
+    python benchmarks/logging_benchmark.py --requests 100000
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from middleware import logging_middleware as middleware_module
+from services import structured_logging
+from services.structured_logging import RouteSampler
+
+logger = logging.getLogger("benchmark")
+
+
+async def synchronous_fstring_middleware(request: Request, call_next):
+    """The previous middleware: two f-string records written synchronously."""
+    start_time = time.time()
+    logger.info(f"Request: {request.method} {request.url.path}")
+    response = await call_next(request)
+    process_time = time.time() - start_time
+    logger.info(f"Response: {response.status_code} - Process time: {process_time:.3f}s")
+    response.headers["X-Process-Time"] = str(process_time)
+    return response
+
+
+def make_request() -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/food-recognition/search",
+        "query_string": b"q=apple",
+        "headers": [(b"host", b"localhost")],
+        "server": ("localhost", 8000),
+        "scheme": "http"
+    })
+
+
+async def call_next(request: Request) -> Response:
+    return Response(b"{}", media_type="application/json")
+
+
+async def measure(middleware, requests: int) -> float:
+    """Mean microseconds per request spent in the middleware."""
+    started = time.perf_counter()
+    for _ in range(requests):
+        await middleware(make_request(), call_next)
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark logging middleware overhead")
+    parser.add_argument("--requests", type=int, default=100000)
+    args = parser.parse_args()
+
+    output = tempfile.NamedTemporaryFile("w", suffix=".log", delete=False)
+    output.close()
+    root = logging.getLogger()
+
+    async def passthrough(request, call_next):
+        return await call_next(request)
+
+    baseline = asyncio.run(measure(passthrough, args.requests))
+    print(f"no logging                  {baseline:6.2f} us/request")
+
+    handler = logging.FileHandler(output.name)
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+    root.handlers, root.level = [handler], logging.INFO
+    cost = asyncio.run(measure(synchronous_fstring_middleware, args.requests))
+    handler.close()
+    print(f"f-strings, sync handler     {cost:6.2f} us/request (+{cost - baseline:.2f})")
+
+    for rate in (1.0, 0.1, 0.0):
+        structured_logging.configure_logging(level="INFO", log_format="json", queue_size=args.requests * 2)
+        listener = structured_logging._listener
+        # Point the listener at the file instead of stdout, and pause it so the
+        # event-loop cost and the listener's formatting cost are measured apart
+        listener.handlers[0].setStream(open(output.name, "a"))
+        listener.stop()
+        middleware_module.sampler = RouteSampler({"/food-recognition/search": rate})
+        cost = asyncio.run(measure(middleware_module.logging_middleware, args.requests))
+
+        queued = structured_logging.logging_stats()["queued"]
+        started = time.perf_counter()
+        listener.start()
+        listener.stop()
+        listener_us = (time.perf_counter() - started) / queued * 1e6 if queued else 0.0
+        print(f"queued JSON, sampled {rate:<5}  {cost:6.2f} us/request (+{cost - baseline:.2f}) on the loop, "
+              f"listener {listener_us:.1f} us/record for {queued} records")
+        structured_logging._listener = None
+
+    os.remove(output.name)
+
+
+if __name__ == "__main__":
+    main()
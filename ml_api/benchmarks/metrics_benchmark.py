@@ -0,0 +1,83 @@
+"""
+Hot-path cost of request metrics and stage timing.
+
+Calls the metrics middleware directly around a no-op ASGI app, so the
+time measured is only the in-flight bookkeeping, route template lookup,
+counter increment and histogram observation. Stage timing is measured
+for a four-stage prediction like a food recognition request.
+
+Usage:
+    python benchmarks/metrics_benchmark.py --requests 200000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from middleware.metrics_middleware import MetricsMiddleware
+from services.metrics import REGISTRY, StageTimer
+
+
+async def endpoint(scope, receive, send):
+    # What routing leaves on the scope for /chat/conversation/{conversation_id}
+    scope["endpoint"] = endpoint
+    scope["path_params"] = {"conversation_id": "c0ffee"}
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    pass
+
+
+def make_scope():
+    return {"type": "http", "method": "GET", "path": "/chat/conversation/c0ffee"}
+
+
+async def measure(app, requests: int) -> float:
+    """Mean microseconds per request through the app."""
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(make_scope(), receive, send)
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+def measure_stages(predictions: int) -> float:
+    """Mean microseconds of timing bookkeeping per four-stage prediction."""
+    started = time.perf_counter()
+    for _ in range(predictions):
+        timer = StageTimer("benchmark")
+        for stage in ("decode", "features", "inference", "postprocess"):
+            with timer.stage(stage):
+                pass
+        timer.report()
+    return (time.perf_counter() - started) / predictions * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark metrics overhead")
+    parser.add_argument("--requests", type=int, default=200000)
+    args = parser.parse_args()
+
+    baseline = asyncio.run(measure(endpoint, args.requests))
+    print(f"no metrics                  {baseline:6.2f} us/request")
+
+    cost = asyncio.run(measure(MetricsMiddleware(endpoint), args.requests))
+    print(f"metrics middleware          {cost:6.2f} us/request (+{cost - baseline:.2f})")
+
+    print(f"stage timing, 4 stages      {measure_stages(args.requests):6.2f} us/prediction")
+
+    started = time.perf_counter()
+    body = REGISTRY.render()
+    print(f"/metrics render             {(time.perf_counter() - started) * 1000:6.2f} ms, {len(body)} bytes")
+
+
+if __name__ == "__main__":
+    main()
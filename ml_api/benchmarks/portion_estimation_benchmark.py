@@ -0,0 +1,94 @@
+"""
+Cost of portion estimation relative to decoding and inference.
+
+Synthesizes plate photos (a plate on a table with a few food blobs of
+known area), then times per image: decode, portion estimation and one
+inference call on the chosen backend. Also reports the mean relative
+error of the estimated area against the drawn area.
+
+Usage:
+    python benchmarks/portion_estimation_benchmark.py --backend tflite=./models/food_recognition.tflite
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from services.inference_backends import create_backend
+from services.portion_estimation import PLATE_DIAMETER_CM, PortionEstimator
+
+
+def synthetic_plate(rng: np.random.Generator, width: int, height: int) -> tuple[bytes, float]:
+    """JPEG of a plate with food blobs, and the true food area in cm²."""
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    image[:] = rng.integers(60, 140, size=3)
+    radius = int(min(width, height) * rng.uniform(0.38, 0.46))
+    centre = (width // 2, height // 2)
+    cv2.circle(image, centre, radius, (240, 240, 236), -1)
+
+    mask = np.zeros((height, width), dtype=np.uint8)
+    for _ in range(rng.integers(1, 4)):
+        offset = rng.uniform(-0.4, 0.4, size=2) * radius
+        axes = (int(radius * rng.uniform(0.15, 0.3)), int(radius * rng.uniform(0.1, 0.25)))
+        colour = tuple(int(c) for c in rng.choice([(40, 160, 40), (220, 110, 50), (200, 60, 40), (230, 190, 60)]))
+        blob_centre = (int(centre[0] + offset[0]), int(centre[1] + offset[1]))
+        cv2.ellipse(image, blob_centre, axes, 0, 0, 360, colour, -1)
+        cv2.ellipse(mask, blob_centre, axes, 0, 0, 360, 1, -1)
+
+    cm_per_pixel = PLATE_DIAMETER_CM / (2 * radius)
+    buffer = io.BytesIO()
+    Image.fromarray(image).save(buffer, "JPEG", quality=90)
+    return buffer.getvalue(), float(mask.sum()) * cm_per_pixel ** 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark portion estimation overhead")
+    parser.add_argument("--backend", default="simulated=", metavar="NAME=MODEL_PATH")
+    parser.add_argument("--num-classes", type=int, default=101)
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--width", type=int, default=1024)
+    parser.add_argument("--height", type=int, default=768)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    name, _, model_path = args.backend.partition("=")
+    backend = create_backend(name, [f"class_{i}" for i in range(args.num_classes)], model_path or None)
+    estimator = PortionEstimator()
+    rng = np.random.default_rng(args.seed)
+    samples = [synthetic_plate(rng, args.width, args.height) for _ in range(args.images)]
+
+    decode_ms, portion_ms, inference_ms, errors = [], [], [], []
+    for data, true_area in samples:
+        start = time.perf_counter()
+        image = np.array(Image.open(io.BytesIO(data)).convert("RGB"))
+        decode_ms.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        portion = estimator.estimate(image)
+        portion_ms.append(time.perf_counter() - start)
+
+        model_input = cv2.resize(image, (224, 224), interpolation=cv2.INTER_AREA)
+        start = time.perf_counter()
+        backend.predict(model_input[np.newaxis])
+        inference_ms.append(time.perf_counter() - start)
+
+        if portion is not None:
+            errors.append(abs(portion["area_cm2"] - true_area) / true_area)
+
+    for label, timings in (("decode", decode_ms), ("portion", portion_ms), ("inference", inference_ms)):
+        timings = np.array(timings) * 1000
+        print(f"{label:<10} p50={np.percentile(timings, 50):.2f}ms p99={np.percentile(timings, 99):.2f}ms")
+
+    print(f"portion / inference (p50): {np.median(portion_ms) / np.median(inference_ms):.2f}")
+    print(f"measured {len(errors)}/{len(samples)} images, mean relative area error {np.mean(errors):.3f}")
+
+
+if __name__ == "__main__":
+    main()
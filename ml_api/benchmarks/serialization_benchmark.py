@@ -0,0 +1,112 @@
+"""
+Response serialization cost for batch-sized results.
+
+Renders a food recognition batch response (real results from the
+service, repeated to size) the ways a route can:
+
+- FastAPI's path for a returned dict: jsonable_encoder, then
+  JSONResponse's json.dumps
+- JSONResponse returned directly (json.dumps only), as the food routes
+  did before
+- FastJSONResponse, rows and column-oriented (to_columns included)
+- FastJSONResponse with NumPy values left unconverted (float32
+  confidences, probability arrays)
+
+End-to-end numbers for the batch endpoints come from api_benchmark.py:
+    python benchmarks/api_benchmark.py run --only batch --batch-sizes 8,32
+
+Usage:
+    python benchmarks/serialization_benchmark.py --sizes 100,1000,5000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from services import serialization
+from services.food_recognition_service import FoodRecognitionService
+from services.serialization import FastJSONResponse, to_columns
+
+
+def sample_results(count: int) -> list:
+    """Recognition results for count random images."""
+    service = FoodRecognitionService()
+    rng = np.random.default_rng(0)
+    images = list(rng.random((count, 224, 224, 3), dtype=np.float32))
+    return asyncio.run(service.recognize_food_batch(images))
+
+
+def batch_response(results: list, size: int) -> dict:
+    rows = [
+        {"filename": f"meal_{i}.jpg", "result": results[i % len(results)]}
+        for i in range(size)
+    ]
+    return {"success": True, "data": {"results": rows, "total_images": size, "deadline_exceeded": False}}
+
+
+def with_numpy(content: dict) -> dict:
+    """The same response as a service would build it without float() conversions."""
+    rng = np.random.default_rng(1)
+    rows = [
+        {**row, "result": {
+            **row["result"],
+            "confidence": np.float32(row["result"]["confidence"]),
+            "probabilities": rng.random(10, dtype=np.float32)
+        }}
+        for row in content["data"]["results"]
+    ]
+    return {**content, "data": {**content["data"], "results": rows}}
+
+
+def measure(render, repeats: int) -> tuple[float, int]:
+    """Best-of-repeats milliseconds and body size."""
+    best = float("inf")
+    body = b""
+    for _ in range(repeats):
+        started = time.perf_counter()
+        body = render()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark response serialization")
+    parser.add_argument("--sizes", default="100,1000,5000")
+    parser.add_argument("--repeats", type=int, default=10)
+    args = parser.parse_args()
+
+    results = sample_results(16)
+    print(f"JSON encoder: {'orjson' if serialization.orjson is not None else 'json (orjson not installed)'}")
+
+    for size in (int(size) for size in args.sizes.split(",")):
+        content = batch_response(results, size)
+        numpy_content = with_numpy(content)
+
+        def columns():
+            columnar = {**content, "data": {**content["data"], "results": to_columns(content["data"]["results"])}}
+            return FastJSONResponse(columnar).body
+
+        cases = [
+            ("jsonable_encoder + JSONResponse", lambda: JSONResponse(jsonable_encoder(content)).body),
+            ("JSONResponse", lambda: JSONResponse(content).body),
+            ("FastJSONResponse", lambda: FastJSONResponse(content).body),
+            ("FastJSONResponse, columns", columns),
+            ("FastJSONResponse, NumPy values", lambda: FastJSONResponse(numpy_content).body),
+        ]
+        print(f"\n{size} results")
+        baseline = None
+        for label, render in cases:
+            ms, size_bytes = measure(render, args.repeats)
+            baseline = baseline or ms
+            print(f"  {label:<34} {ms:8.2f} ms ({baseline / ms:5.1f}x), {size_bytes / 1024:8.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,44 @@
 from fastapi import FastAPI, HTTPException, UploadFile, File, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 import uvicorn
 import os
 from dotenv import load_dotenv
 
-from app.routes import food_recognition, activity_detection, risk_forecasting, chat
-from app.middleware import logging_middleware
+from app.routes import food_recognition, activity_detection, risk_forecasting, chat, debug
+from app.middleware.logging_middleware import logging_middleware
+from app.middleware.metrics_middleware import MetricsMiddleware
+from app.middleware.deadline_middleware import DeadlineMiddleware
+from app.middleware.profiling_middleware import ProfilingMiddleware
+from services.metrics import REGISTRY, CONTENT_TYPE
+from services.executors import shutdown_pools
+from services.profiling import profiling_enabled
+from services.serialization import FastJSONResponse
+from services.structured_logging import configure_logging, shutdown_logging, logging_stats
 
 # Load environment variables
 load_dotenv()
 
+# Structured logs through a background listener (LOG_LEVEL, LOG_FORMAT)
+configure_logging()
+
 # Create FastAPI app
 app = FastAPI(
     title="HealthSphere ML API",
     description="AI-powered health and fitness analysis services",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    # NumPy-aware orjson rendering for routes that return plain dicts
+    default_response_class=FastJSONResponse
 )
 
+# On-demand profiling (X-Profile header, /debug routes) only exists when
+# DEBUG_PROFILING_TOKEN is set. Innermost, so request profiles cover the
+# handler rather than the other middleware.
+if profiling_enabled():
+    app.add_middleware(ProfilingMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -32,11 +51,38 @@ app.add_middleware(
 # Add logging middleware
 app.middleware("http")(logging_middleware)
 
+# Request deadlines and client disconnects; outside the logging middleware
+# so its tasks inherit the deadline
+app.add_middleware(DeadlineMiddleware)
+
+# Request metrics; outermost, so the time includes the other middleware
+app.add_middleware(MetricsMiddleware)
+
+def _logging_metrics():
+    stats = logging_stats()
+    if not stats["configured"]:
+        return []
+    return [
+        ("healthsphere_log_queue_depth", "gauge", "Log records waiting for the listener thread", [({}, stats["queued"])]),
+        ("healthsphere_log_records_dropped_total", "counter", "Log records dropped because the queue was full", [({}, stats["dropped"])])
+    ]
+
+REGISTRY.register_collector(_logging_metrics)
+
 # Include routers
 app.include_router(food_recognition.router, prefix="/food-recognition", tags=["Food Recognition"])
 app.include_router(activity_detection.router, prefix="/activity-detect", tags=["Activity Detection"])
 app.include_router(risk_forecasting.router, prefix="/risk-forecast", tags=["Risk Forecasting"])
 app.include_router(chat.router, prefix="/chat", tags=["AI Chat"])
+if profiling_enabled():
+    app.include_router(debug.router, prefix="/debug", include_in_schema=False)
+
+@app.on_event("shutdown")
+async def shutdown():
+    # Makes the chat journal durable and closes Redis connections
+    await chat.chat_service.close()
+    shutdown_pools()
+    shutdown_logging()
 
 @app.get("/")
 async def root():
@@ -49,10 +95,16 @@ async def root():
             "activity_detection": "/activity-detect", 
             "risk_forecasting": "/risk-forecast",
             "ai_chat": "/chat",
+            "metrics": "/metrics",
             "docs": "/docs"
         }
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    # Prometheus scrape target: request, stage and cache metrics
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
 @app.get("/health")
 async def health_check():
     return {
@@ -0,0 +1,67 @@
+"""
+Build the food alternatives index used by /food-recognition/alternatives.
+
+The CSV needs a header with name, calories, protein, carbs, fat, fiber
+(per 100 g) and allergens, where allergens is a "|"-separated list of
+names from services.food_alternatives.ALLERGENS (empty for none).
+
+Usage:
+    python scripts/build_food_alternatives_index.py --output ./models/food_alternatives_index
+    python scripts/build_food_alternatives_index.py --foods-csv foods.csv --output ./models/food_alternatives_index
+
+Point FOOD_ALTERNATIVES_INDEX_PATH at the output directory to serve it.
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from services.food_alternatives import FoodAlternativesIndex
+from services.nutrient_aggregation import NUTRIENTS
+
+
+def read_foods(foods_csv: str) -> tuple[list[str], np.ndarray, list[list[str]]]:
+    """Read names, nutrient rows and allergen lists, keeping the first row per name."""
+    seen = set()
+    names, nutrients, allergens = [], [], []
+    with open(foods_csv, newline="", encoding="utf-8") as f:
+        for record in csv.DictReader(f):
+            name = record["name"].strip().lower()
+            if not name or name in seen:
+                continue
+            seen.add(name)
+            names.append(name)
+            nutrients.append([float(record[nutrient] or 0) for nutrient in NUTRIENTS])
+            allergens.append([a.strip() for a in (record.get("allergens") or "").split("|") if a.strip()])
+    return names, np.array(nutrients, dtype=np.float32).reshape(len(names), len(NUTRIENTS)), allergens
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the food alternatives index")
+    parser.add_argument("--output", required=True, help="Output directory")
+    parser.add_argument("--foods-csv", help="CSV of foods (default: built-in food database)")
+    args = parser.parse_args()
+
+    if args.foods_csv:
+        names, nutrients, allergens = read_foods(args.foods_csv)
+    else:
+        from services.food_recognition_service import FoodRecognitionService
+        service = FoodRecognitionService()
+        names = list(service.food_database.keys())
+        nutrients = np.array([[service.food_database[name][n] for n in NUTRIENTS] for name in names])
+        allergens = [service._detect_allergens(name) for name in names]
+
+    start = time.perf_counter()
+    index = FoodAlternativesIndex.build(names, nutrients, allergens)
+    index.save(args.output)
+    print(f"Indexed {len(names)} foods in {len(index.trees)} allergen groups "
+          f"in {time.perf_counter() - start:.2f}s -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Build or extend the reference embedding index used by the "knn" backend.
+
+Reference photos are laid out one directory per food:
+
+    references/
+        apple/IMG_001.jpg
+        chicken_breast/...
+
+Usage:
+    python scripts/build_food_embedding_index.py --images-dir ./data/references --output ./models/food_embeddings
+    # Add a new food without retraining anything:
+    python scripts/build_food_embedding_index.py --images-dir ./data/new_food --output ./models/food_embeddings --append
+
+Serve it with FOOD_INFERENCE_BACKEND=knn (or FOOD_CASCADE_BACKEND=knn) and
+FOOD_RECOGNITION_MODEL_PATH / FOOD_CASCADE_MODEL_PATH set to the output.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from services.array_store import has_arrays
+from services.food_embedding_index import VectorIndex, build_index, compute_embedding
+from services.food_recognition_service import INPUT_SIZE
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp")
+
+
+def embed_directory(images_dir: str) -> tuple[np.ndarray, list[str]]:
+    """Embed every image under images_dir/<food_name>/."""
+    vectors, labels = [], []
+    for food_name in sorted(os.listdir(images_dir)):
+        food_dir = os.path.join(images_dir, food_name)
+        if not os.path.isdir(food_dir):
+            continue
+        for file_name in sorted(os.listdir(food_dir)):
+            if not file_name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            image = np.array(Image.open(os.path.join(food_dir, file_name)).convert("RGB").resize(INPUT_SIZE))
+            vectors.append(compute_embedding(image))
+            labels.append(food_name)
+    if not vectors:
+        raise SystemExit(f"No reference images found under {images_dir}/<food_name>/")
+    return np.stack(vectors), labels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the food reference embedding index")
+    parser.add_argument("--images-dir", required=True)
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--kind", choices=["auto", "flat", "ivfpq"], default="auto")
+    parser.add_argument("--append", action="store_true", help="Add to an existing index instead of rebuilding")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    vectors, labels = embed_directory(args.images_dir)
+    print(f"Embedded {len(vectors)} images of {len(set(labels))} foods in {time.perf_counter() - start:.1f}s")
+
+    if args.append and has_arrays(args.output):
+        index = VectorIndex.load(args.output, mmap=False)
+        index.add(vectors, labels)
+    else:
+        index = build_index(vectors, labels, kind=args.kind)
+
+    index.save(args.output)
+    print(f"Saved {index.kind} index with {len(index)} references -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Build the memory-mapped food search index used by /food-recognition/search.
+
+Usage:
+    python scripts/build_food_search_index.py --output ./models/food_search_index
+    python scripts/build_food_search_index.py --names-file foods.txt --output ./models/food_search_index
+
+Point FOOD_SEARCH_INDEX_PATH at the output directory to serve it.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from services.food_search_index import FoodSearchIndex
+
+
+def read_names(names_file: str) -> list[str]:
+    """Read one food name per line, skipping blanks and duplicates."""
+    seen = set()
+    names = []
+    with open(names_file, encoding="utf-8") as f:
+        for line in f:
+            name = line.strip()
+            if name and name not in seen:
+                seen.add(name)
+                names.append(name)
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the food search index")
+    parser.add_argument("--output", required=True, help="Output directory")
+    parser.add_argument("--names-file", help="Text file with one food name per line (default: built-in food database)")
+    args = parser.parse_args()
+
+    if args.names_file:
+        names = read_names(args.names_file)
+    else:
+        from services.food_recognition_service import FoodRecognitionService
+        names = list(FoodRecognitionService()._load_food_database().keys())
+
+    start = time.perf_counter()
+    index = FoodSearchIndex.build(names)
+    index.save(args.output)
+    print(f"Indexed {len(names)} food names in {time.perf_counter() - start:.2f}s -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
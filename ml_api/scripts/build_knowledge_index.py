@@ -0,0 +1,64 @@
+"""
+Build or update the chat knowledge index used to ground /chat replies.
+
+The corpus is a JSON-lines file with one passage per line: id, title,
+text, source and contexts (chat contexts the passage applies to, empty
+for all). See app/data/chat_knowledge.jsonl.
+
+Usage:
+    python scripts/build_knowledge_index.py --output ./models/chat_knowledge_index
+    python scripts/build_knowledge_index.py --corpus new.jsonl --output ./models/chat_knowledge_index --append
+    python scripts/build_knowledge_index.py --output ./models/chat_knowledge_index --append --delete old-id
+    python scripts/build_knowledge_index.py --output ./models/chat_knowledge_index --compact
+
+--append writes a delta segment; passages replace those with the same id.
+Running workers pick it up within CHAT_KNOWLEDGE_REFRESH_SECONDS. Point
+CHAT_KNOWLEDGE_INDEX_PATH at the output directory to serve it.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from services.knowledge_index import DEFAULT_CORPUS_PATH, KnowledgeIndex, read_corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the chat knowledge index")
+    parser.add_argument("--output", required=True, help="Index directory")
+    parser.add_argument("--corpus", help="JSON-lines corpus (default: bundled corpus; none with --delete or --compact)")
+    parser.add_argument("--append", action="store_true", help="Add a delta segment instead of rebuilding")
+    parser.add_argument("--delete", nargs="+", default=[], help="Passage ids to delete (with --append)")
+    parser.add_argument("--compact", action="store_true", help="Merge all segments into one")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.compact:
+        KnowledgeIndex.compact(args.output)
+        action = "Compacted"
+    else:
+        if args.corpus:
+            passages = read_corpus(args.corpus)
+        elif args.delete:
+            passages = []
+        else:
+            passages = read_corpus(DEFAULT_CORPUS_PATH)
+
+        if args.append:
+            KnowledgeIndex.add_segment(args.output, passages, deleted_ids=args.delete)
+            action = f"Appended {len(passages)} passages ({len(args.delete)} deletions) to"
+        elif args.delete:
+            parser.error("--delete requires --append")
+        else:
+            KnowledgeIndex.create(args.output, passages)
+            action = f"Indexed {len(passages)} passages into"
+
+    index = KnowledgeIndex.open(args.output)
+    print(f"{action} {args.output} in {time.perf_counter() - start:.2f}s: "
+          f"{len(index)} live passages, {len(index.segments)} segments")
+
+
+if __name__ == "__main__":
+    main()
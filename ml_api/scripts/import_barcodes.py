@@ -0,0 +1,152 @@
+"""
+Import packaged-food barcodes into the memory-mapped barcode index used by
+/food-recognition/barcode/{upc}.
+
+Two input layouts are supported:
+    healthsphere  CSV with upc, name, brand, calories, protein, carbs, fat,
+                  fiber (per 100 g) and allergens ("|"-separated names from
+                  services.food_alternatives.ALLERGENS)
+    off           Open Food Facts products TSV export
+
+Rows are streamed into compact arrays, so tens of millions of products
+fit in memory during the import. Invalid barcodes are skipped; for
+duplicate barcodes the last row wins.
+
+Usage:
+    python scripts/import_barcodes.py --input products.csv --output ./models/barcode_index
+    python scripts/import_barcodes.py --format off --input en.openfoodfacts.org.products.csv --output ./models/barcode_index
+
+Point FOOD_BARCODE_INDEX_PATH at the output directory to serve it.
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+from array import array
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from services.array_store import StringTable
+from services.barcode_index import BarcodeIndex, normalize_upc, sort_codes
+from services.food_alternatives import ALLERGENS
+from services.nutrient_aggregation import NUTRIENTS
+
+# Column names per input layout: code, name, brand, NUTRIENTS..., allergens
+FORMATS = {
+    "healthsphere": {
+        "delimiter": ",",
+        "code": "upc",
+        "name": "name",
+        "brand": "brand",
+        "nutrients": list(NUTRIENTS),
+        "allergens": "allergens"
+    },
+    "off": {
+        "delimiter": "\t",
+        "code": "code",
+        "name": "product_name",
+        "brand": "brands",
+        "nutrients": ["energy-kcal_100g", "proteins_100g", "carbohydrates_100g", "fat_100g", "fiber_100g"],
+        "allergens": "allergens"
+    }
+}
+
+# Open Food Facts allergen tags mapped onto ALLERGENS
+OFF_ALLERGENS = {
+    "en:gluten": "gluten",
+    "en:milk": "dairy",
+    "en:fish": "fish",
+    "en:crustaceans": "shellfish",
+    "en:molluscs": "shellfish",
+    "en:eggs": "egg",
+    "en:soybeans": "soy",
+    "en:peanuts": "peanuts",
+    "en:nuts": "tree_nuts",
+    "en:sesame-seeds": "sesame"
+}
+
+
+def parse_allergens(value: str, input_format: str) -> int:
+    """Allergen bitmask of one row; unknown allergens are ignored."""
+    if input_format == "off":
+        names = [OFF_ALLERGENS.get(tag.strip()) for tag in value.split(",")]
+    else:
+        names = [name.strip() for name in value.split("|")]
+
+    mask = 0
+    for name in names:
+        if name in ALLERGENS:
+            mask |= 1 << ALLERGENS.index(name)
+    return mask
+
+
+def parse_float(value: str) -> float:
+    try:
+        return float(value) if value else 0.0
+    except ValueError:
+        return 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import barcodes into the barcode index")
+    parser.add_argument("--input", required=True, help="Product CSV/TSV file")
+    parser.add_argument("--output", required=True, help="Output directory")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="healthsphere")
+    args = parser.parse_args()
+
+    columns = FORMATS[args.format]
+    csv.field_size_limit(sys.maxsize)
+
+    codes, rows = array("Q"), array("q")
+    nutrients, masks = array("f"), array("q")
+    names_blob, names_offsets = bytearray(), array("q", [0])
+    brands_blob, brands_offsets = bytearray(), array("q", [0])
+    skipped = 0
+
+    start = time.perf_counter()
+    with open(args.input, newline="", encoding="utf-8", errors="replace") as f:
+        for record in csv.DictReader(f, delimiter=columns["delimiter"]):
+            try:
+                code = normalize_upc(record.get(columns["code"]) or "")
+            except ValueError:
+                skipped += 1
+                continue
+
+            name = (record.get(columns["name"]) or "").strip()
+            if not name:
+                skipped += 1
+                continue
+
+            row = len(masks)
+            codes.append(code)
+            rows.append(row)
+            names_blob += name.lower().encode("utf-8")
+            names_offsets.append(len(names_blob))
+            brands_blob += (record.get(columns["brand"]) or "").strip().encode("utf-8")
+            brands_offsets.append(len(brands_blob))
+            nutrients.extend(parse_float(record.get(column)) for column in columns["nutrients"])
+            masks.append(parse_allergens(record.get(columns["allergens"]) or "", args.format))
+
+            if row and row % 1000000 == 0:
+                print(f"  read {row} products ({time.perf_counter() - start:.0f}s)")
+
+    # The product store keeps input order; only the code column is sorted
+    sorted_codes, sorted_rows = sort_codes(np.frombuffer(codes, dtype=np.uint64), np.frombuffer(rows, dtype=np.int64))
+    index = BarcodeIndex(
+        codes=sorted_codes,
+        rows=sorted_rows,
+        names=StringTable(np.frombuffer(names_blob, dtype=np.uint8), np.frombuffer(names_offsets, dtype=np.int64)),
+        brands=StringTable(np.frombuffer(brands_blob, dtype=np.uint8), np.frombuffer(brands_offsets, dtype=np.int64)),
+        nutrients=np.frombuffer(nutrients, dtype=np.float32).reshape(-1, len(NUTRIENTS)),
+        allergen_masks=np.frombuffer(masks, dtype=np.int64)
+    )
+    index.save(args.output)
+    print(f"Imported {len(index)} barcodes for {len(masks)} products ({skipped} rows skipped) "
+          f"in {time.perf_counter() - start:.1f}s -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Convert the Keras food recognition model for the CPU inference backends.
+
+Writes a float32 TFLite model and a post-training full-integer (int8)
+quantized model calibrated on a directory of representative food photos.
+
+Usage:
+    python scripts/quantize_food_model.py \
+        --keras-model ./models/food_recognition.h5 \
+        --images-dir ./data/calibration \
+        --output-dir ./models
+
+Then set FOOD_INFERENCE_BACKEND=tflite or tflite_int8 and point
+FOOD_RECOGNITION_MODEL_PATH at the matching .tflite file.
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from services.food_recognition_service import INPUT_SIZE
+from services.inference_backends import preprocess_batch
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp")
+
+
+def load_calibration_images(images_dir: str, limit: int) -> np.ndarray:
+    """Decode up to `limit` images with the service's input contract."""
+    paths = []
+    for root, _, files in os.walk(images_dir):
+        paths.extend(os.path.join(root, name) for name in files if name.lower().endswith(IMAGE_EXTENSIONS))
+    if not paths:
+        raise SystemExit(f"No calibration images found in {images_dir}")
+
+    images = [
+        np.array(Image.open(path).convert("RGB").resize(INPUT_SIZE))
+        for path in sorted(paths)[:limit]
+    ]
+    return np.stack(images)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export TFLite float and int8 food models")
+    parser.add_argument("--keras-model", required=True)
+    parser.add_argument("--images-dir", required=True, help="Representative images for int8 calibration")
+    parser.add_argument("--output-dir", default="./models")
+    parser.add_argument("--samples", type=int, default=200)
+    args = parser.parse_args()
+
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(args.keras_model, compile=False)
+    calibration = preprocess_batch(load_calibration_images(args.images_dir, args.samples))
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    float_path = os.path.join(args.output_dir, "food_recognition.tflite")
+    with open(float_path, "wb") as f:
+        f.write(converter.convert())
+    print(f"float32 model: {float_path} ({os.path.getsize(float_path) / 1e6:.1f} MB)")
+
+    def representative_dataset():
+        for image in calibration:
+            yield [image[np.newaxis]]
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter.inference_input_type = tf.int8
+    converter.inference_output_type = tf.int8
+    int8_path = os.path.join(args.output_dir, "food_recognition_int8.tflite")
+    with open(int8_path, "wb") as f:
+        f.write(converter.convert())
+    print(f"int8 model: {int8_path} ({os.path.getsize(int8_path) / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
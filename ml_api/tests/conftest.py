@@ -0,0 +1,24 @@
+import io
+import os
+import sys
+
+ML_API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+# main.py imports app.*, the routes and services import services.*
+sys.path.insert(0, ML_API_DIR)
+sys.path.insert(0, os.path.join(ML_API_DIR, "app"))
+
+# Keep request logs out of test output; must precede importing the app
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import numpy as np
+import pytest
+from PIL import Image
+
+
+@pytest.fixture(scope="session")
+def photo() -> bytes:
+    """A phone-sized JPEG food photo."""
+    rng = np.random.default_rng(0)
+    buffer = io.BytesIO()
+    Image.fromarray(rng.integers(0, 256, size=(480, 640, 3), dtype=np.uint8)).save(buffer, "JPEG")
+    return buffer.getvalue()
@@ -0,0 +1,78 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.routes import chat
+from services.chat_generation import ResponseGenerator
+
+REPLY = ["Drink ", "more ", "water."]
+
+
+class StubGenerator(ResponseGenerator):
+    """Yields a fixed reply, one chunk at a time."""
+
+    name = "stub"
+
+    async def generate(self, message, intent, context_info, passages=()):
+        for chunk in REPLY:
+            yield chunk
+            await asyncio.sleep(0)
+
+
+@pytest.fixture
+def service(monkeypatch):
+    service = chat.chat_service
+    monkeypatch.setattr(service, "generator", StubGenerator())
+    # Every reply comes from the generator, never the response cache
+    monkeypatch.setattr(service.response_cache, "key", lambda message, context: None)
+    return service
+
+
+def sse_events(body: str) -> list:
+    return [
+        json.loads(frame.split("data: ", 1)[1])
+        for frame in body.strip().split("\n\n")
+    ]
+
+
+def test_stream_sends_start_chunks_then_done(service):
+    from main import app
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post("/chat/stream", json={"message": "How much water?", "user_id": "u1"})
+        events = sse_events(response.text)
+        history = await service.get_conversation_history(events[0]["conversation_id"])
+        return response, events, history
+
+    response, events, history = asyncio.run(scenario())
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert [event["event"] for event in events] == ["start", "chunk", "chunk", "chunk", "done"]
+    assert [event["text"] for event in events[1:-1]] == REPLY
+    reply = history["messages"][-1]
+    assert reply["message"] == "".join(REPLY)
+    assert not reply["is_user"]
+    assert "interrupted" not in reply
+
+
+def test_closing_mid_reply_stores_the_partial_text(service):
+    async def scenario():
+        events = service.stream_message("How much water?", "u1")
+        start = await events.__anext__()
+        first = await events.__anext__()
+        await events.aclose()
+        history = await service.get_conversation_history(start["conversation_id"])
+        return start, first, history
+
+    start, first, history = asyncio.run(scenario())
+
+    assert start["event"] == "start"
+    assert first == {"event": "chunk", "text": REPLY[0]}
+    user_message, reply = history["messages"]
+    assert user_message["is_user"]
+    assert reply["message"] == REPLY[0]
+    assert reply["interrupted"] is True
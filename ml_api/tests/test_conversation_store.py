@@ -0,0 +1,143 @@
+import asyncio
+import random
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+from redis.asyncio.client import Pipeline, Redis
+
+from services.conversation_store import RedisConversationStore
+
+
+@pytest.fixture
+def store():
+    return RedisConversationStore(fakeredis.FakeAsyncRedis(), max_messages=5, ttl_seconds=60)
+
+
+@pytest.fixture
+def network_jitter(monkeypatch):
+    """Delay every round trip so concurrent callers interleave as over a real network."""
+    rng = random.Random(0)
+
+    def delayed(send):
+        async def wrapper(*args, **kwargs):
+            await asyncio.sleep(rng.random() / 1000)
+            return await send(*args, **kwargs)
+        return wrapper
+
+    monkeypatch.setattr(Redis, "execute_command", delayed(Redis.execute_command))
+    monkeypatch.setattr(Pipeline, "execute", delayed(Pipeline.execute))
+    monkeypatch.setattr(Pipeline, "immediate_execute_command", delayed(Pipeline.immediate_execute_command))
+
+
+def test_concurrent_appends_keep_seq_order(store, network_jitter):
+    async def scenario():
+        await store.create("c1", "u1", "general")
+        appended = await asyncio.gather(*(store.append_message("c1", {"text": str(i)}) for i in range(20)))
+        raw = await store.client.lrange(store._messages_key("c1"), 0, -1)
+        page = await store.get_messages("c1")
+        return appended, raw, page
+
+    appended, raw, page = asyncio.run(scenario())
+
+    assert all(appended)
+    # Trimmed to max_messages, in seq order with no gaps or duplicates
+    assert [m["seq"] for m in page["messages"]] == [15, 16, 17, 18, 19]
+    assert len(raw) == 5
+    assert page["first_seq"] == 15
+    assert page["next_seq"] == 20
+
+
+def test_append_to_unknown_conversation_creates_nothing(store):
+    async def scenario():
+        appended = await store.append_message("missing", {"text": "hi"})
+        return appended, await store.client.keys("*")
+
+    appended, keys = asyncio.run(scenario())
+
+    assert appended is False
+    assert keys == []
+
+
+def test_append_racing_delete_does_not_resurrect(store, network_jitter):
+    async def scenario():
+        await store.create("c1", "u1", "general")
+        await asyncio.gather(store.append_message("c1", {"text": "hi"}), store.delete("c1"))
+        return await store.client.keys("*")
+
+    assert asyncio.run(scenario()) == []
+
+
+def test_append_after_delete_is_rejected(store):
+    async def scenario():
+        await store.create("c1", "u1", "general")
+        await store.delete("c1")
+        return await store.append_message("c1", {"text": "hi"}), await store.get_messages("c1")
+
+    appended, page = asyncio.run(scenario())
+
+    assert appended is False
+    assert page is None
+
+
+def test_paging_since_and_before(store):
+    async def scenario():
+        await store.create("c1", "u1", "general")
+        for i in range(8):
+            await store.append_message("c1", {"text": str(i)})
+        return (
+            await store.get_messages("c1", since=4),
+            await store.get_messages("c1", since=4, limit=2),
+            await store.get_messages("c1", before=6, limit=2),
+            await store.get_messages("c1", before=3),
+            await store.get_messages("c1", limit=3)
+        )
+
+    since, since_limited, before, before_trimmed, latest = asyncio.run(scenario())
+
+    def seqs(page):
+        return [m["seq"] for m in page["messages"]]
+
+    assert seqs(since) == [5, 6, 7]
+    assert seqs(since_limited) == [5, 6]
+    assert seqs(before) == [4, 5]
+    # Seqs 0-2 were trimmed away
+    assert seqs(before_trimmed) == []
+    assert seqs(latest) == [5, 6, 7]
+    assert [m["text"] for m in latest["messages"]] == ["5", "6", "7"]
+
+
+def test_writes_refresh_ttl(store):
+    async def scenario():
+        client = store.client
+        await store.create("c1", "u1", "general")
+        await client.expire(store._conversation_key("c1"), 5)
+        await store.append_message("c1", {"text": "hi"})
+        return (
+            await client.ttl(store._conversation_key("c1")),
+            await client.ttl(store._messages_key("c1")),
+            await client.ttl(store._user_key("u1"))
+        )
+
+    ttls = asyncio.run(scenario())
+
+    assert all(55 < ttl <= 60 for ttl in ttls)
+
+
+def test_expired_conversation_is_gone(store):
+    async def scenario():
+        await store.create("c1", "u1", "general")
+        await store.append_message("c1", {"text": "hi"})
+        # What Redis does once ttl_seconds pass without a write
+        await store.client.delete(store._conversation_key("c1"), store._messages_key("c1"))
+        return (
+            await store.get("c1"),
+            await store.append_message("c1", {"text": "again"}),
+            await store.list_conversations("u1")
+        )
+
+    conversation, appended, listed = asyncio.run(scenario())
+
+    assert conversation is None
+    assert appended is False
+    assert listed["conversations"] == []
@@ -0,0 +1,31 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from services.deadlines import parse_deadline
+
+
+@pytest.mark.parametrize("header", ["nan", "inf", "-inf", "Infinity", "soon"])
+def test_malformed_deadline_is_rejected(header):
+    with pytest.raises(ValueError):
+        parse_deadline(header)
+
+
+@pytest.mark.parametrize("header", ["nan", "inf", "soon"])
+def test_malformed_deadline_header_returns_400(header):
+    from main import app
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/", headers={"X-Request-Deadline": header})
+
+    assert asyncio.run(scenario()).status_code == 400
+
+
+def test_deadline_converts_to_monotonic_clock():
+    deadline = parse_deadline(str(time.time() * 1000 + 2000))
+
+    assert 1.9 < deadline - time.monotonic() <= 2
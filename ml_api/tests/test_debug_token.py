@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.middleware import profiling_middleware
+from app.routes import debug
+
+SECRET = "s3cret"
+
+
+@pytest.fixture(autouse=True)
+def token(monkeypatch):
+    monkeypatch.setattr(debug, "TOKEN", SECRET)
+    monkeypatch.setattr(profiling_middleware, "TOKEN", SECRET)
+
+
+@pytest.mark.parametrize("header", [None, "wrong", "s3crét", "ÿ" * 6])
+def test_debug_routes_reject_bad_tokens_with_401(header):
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(debug.require_debug_token(header))
+
+    assert raised.value.status_code == 401
+
+
+def test_debug_routes_accept_the_token():
+    asyncio.run(debug.require_debug_token(SECRET))
+
+
+def test_profiling_middleware_serves_non_ascii_token_unprofiled():
+    served = []
+
+    async def app(scope, receive, send):
+        served.append(scope)
+
+    middleware = profiling_middleware.ProfilingMiddleware(app)
+    scope = {
+        "type": "http", "method": "GET", "path": "/",
+        "headers": [(b"x-profile", b"sample"), (b"x-debug-token", "s3crét".encode("utf-8"))]
+    }
+    asyncio.run(middleware(scope, None, None))
+
+    assert served == [scope]
@@ -0,0 +1,165 @@
+import asyncio
+import contextvars
+import time
+
+import httpx
+import numpy as np
+import pytest
+
+from services.deadlines import DeadlineExceeded, deadline_var
+from services.executors import BoundedExecutor, PoolSaturated
+from services import food_recognition_service
+
+PROBE_INTERVAL = 0.005
+
+
+@pytest.fixture
+def pool():
+    pool = BoundedExecutor("test", workers=1, queue_size=1)
+    yield pool
+    pool.shutdown()
+
+
+def asgi_client() -> httpx.AsyncClient:
+    from main import app
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+async def _probe_lag(stop: asyncio.Event) -> list:
+    """Seconds each short sleep woke up late until stop is set."""
+    lags = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(time.perf_counter() - started - PROBE_INTERVAL)
+    return lags
+
+
+def test_event_loop_stays_responsive_under_concurrent_recognition(photo):
+    async def scenario():
+        stop = asyncio.Event()
+        probe = asyncio.create_task(_probe_lag(stop))
+        async with asgi_client() as client:
+            responses = await asyncio.gather(*(
+                client.post("/food-recognition/", files={"image": ("meal.jpg", photo, "image/jpeg")})
+                for _ in range(24)
+            ))
+        stop.set()
+        return responses, await probe
+
+    responses, lags = asyncio.run(scenario())
+
+    assert {response.status_code for response in responses} <= {200, 503}
+    assert any(response.status_code == 200 for response in responses)
+    # Decoding and inference run in pools; inline, p99 lag is around 0.3 s
+    assert np.percentile(lags, 99) < 0.15
+
+
+def test_saturated_pool_is_rejected_with_retry_after(photo, monkeypatch):
+    decode_pool = food_recognition_service.decode_pool
+    monkeypatch.setattr(decode_pool, "queue_size", 0)
+    monkeypatch.setattr(decode_pool, "workers", 1)
+
+    async def scenario():
+        # Hold the pool's only slot while the request arrives
+        blocker = asyncio.ensure_future(decode_pool.run(time.sleep, 0.5))
+        await asyncio.sleep(0.05)
+        async with asgi_client() as client:
+            response = await client.post(
+                "/food-recognition/", files={"image": ("meal.jpg", photo, "image/jpeg")}
+            )
+        await blocker
+        return response
+
+    response = asyncio.run(scenario())
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+
+def test_expired_request_deadline_returns_504(photo):
+    async def scenario():
+        async with asgi_client() as client:
+            return await client.post(
+                "/food-recognition/",
+                files={"image": ("meal.jpg", photo, "image/jpeg")},
+                headers={"X-Request-Deadline": str(int(time.time() * 1000) - 1000)}
+            )
+
+    response = asyncio.run(scenario())
+
+    assert response.status_code == 504
+
+
+def test_run_rejects_beyond_capacity(pool):
+    async def scenario():
+        running = [asyncio.ensure_future(pool.run(time.sleep, 0.2)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        with pytest.raises(PoolSaturated) as raised:
+            await pool.run(time.sleep, 0)
+        await asyncio.gather(*running)
+        return raised.value
+
+    error = asyncio.run(scenario())
+
+    assert error.retry_after == 1
+    assert pool.stats()["queued"] == 0
+
+
+def test_run_skips_work_past_the_deadline(pool):
+    calls = []
+
+    async def scenario():
+        deadline_var.set(time.monotonic() - 1)
+        with pytest.raises(DeadlineExceeded):
+            await pool.run(calls.append, 1)
+
+    asyncio.run(scenario())
+
+    assert calls == []
+
+
+def test_queued_call_is_cancelled_at_the_deadline(pool):
+    calls = []
+
+    async def scenario():
+        busy = asyncio.ensure_future(pool.run(time.sleep, 0.3))
+        await asyncio.sleep(0.01)
+        deadline_var.set(time.monotonic() + 0.1)
+        with pytest.raises(DeadlineExceeded):
+            await pool.run(calls.append, 1)
+        await busy
+
+    asyncio.run(scenario())
+
+    assert calls == []
+    assert pool.stats()["queued"] == 0
+
+
+def test_cancelling_the_caller_drops_its_queued_call(pool):
+    calls = []
+
+    async def scenario():
+        busy = asyncio.ensure_future(pool.run(time.sleep, 0.2))
+        await asyncio.sleep(0.01)
+        waiting = asyncio.ensure_future(pool.run(calls.append, 1))
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        await busy
+        await asyncio.sleep(0.05)
+
+    asyncio.run(scenario())
+
+    assert calls == []
+    assert pool.stats()["active"] == 0
+    assert pool.stats()["queued"] == 0
+
+
+def test_call_sees_the_callers_context(pool):
+    request_id = contextvars.ContextVar("request_id", default=None)
+
+    async def scenario():
+        request_id.set("RID-1")
+        return await pool.run(request_id.get)
+
+    assert asyncio.run(scenario()) == "RID-1"
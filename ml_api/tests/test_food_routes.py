@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.routes import food_recognition
+from services.food_recognition_service import CALIBRATION_KEYS, decode_pool
+
+
+def request(method: str, path: str, **kwargs) -> httpx.Response:
+    from main import app
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.request(method, path, **kwargs)
+
+    return asyncio.run(scenario())
+
+
+def get(path: str, **params) -> httpx.Response:
+    return request("GET", path, params=params)
+
+
+def photos(photo: bytes, count: int) -> list:
+    return [("images", (f"meal_{i}.jpg", photo, "image/jpeg")) for i in range(count)]
+
+
+def test_nutrition_omits_calibration():
+    response = get("/food-recognition/nutrition/apple")
+
+    assert response.status_code == 200
+    nutrition = response.json()["data"]["nutrition"]
+    assert nutrition["calories"] == 52
+    assert not set(CALIBRATION_KEYS) & set(nutrition)
+
+
+def test_unknown_food_is_404_with_suggestions():
+    response = get("/food-recognition/nutrition/salmn")
+
+    assert response.status_code == 404
+    detail = response.json()["detail"]
+    assert detail["suggestions"][0] == "salmon"
+    assert "salmn" in detail["message"]
+
+
+def test_search_results_omit_calibration():
+    response = get("/food-recognition/search", q="appel")
+
+    assert response.status_code == 200
+    results = response.json()["data"]["results"]
+    assert results[0]["food_name"] == "apple"
+    for result in results:
+        assert not set(CALIBRATION_KEYS) & set(result["nutrition"] or {})
+
+
+@pytest.mark.parametrize("path", ["/food-recognition/batch", "/food-recognition/batch/stream"])
+def test_batches_larger_than_the_decode_pool_are_served(path, photo, monkeypatch):
+    # Capacity 1: the batch's decodes must wait their turn, not be refused
+    monkeypatch.setattr(decode_pool, "workers", 1)
+    monkeypatch.setattr(decode_pool, "queue_size", 0)
+
+    response = request("POST", path, files=photos(photo, 12))
+
+    assert response.status_code == 200
+    if path.endswith("/stream"):
+        results = [json.loads(line) for line in response.text.splitlines()][:-1]
+    else:
+        results = response.json()["data"]["results"]
+    assert len(results) == 12
+    assert all("error" not in result for result in results)
+
+
+@pytest.mark.parametrize("path", ["/food-recognition/batch", "/food-recognition/batch/stream"])
+def test_batches_over_the_image_limit_are_rejected(path, photo, monkeypatch):
+    monkeypatch.setattr(food_recognition, "MAX_BATCH_IMAGES", 3)
+
+    response = request("POST", path, files=photos(photo, 4))
+
+    assert response.status_code == 413
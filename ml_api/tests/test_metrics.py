@@ -0,0 +1,36 @@
+import pytest
+
+from services.metrics import Gauge, Histogram, Metric
+
+
+def test_metric_is_abstract():
+    with pytest.raises(TypeError):
+        Metric("healthsphere_test", "Test metric")
+
+
+@pytest.mark.parametrize("value, text", [
+    (float("nan"), "NaN"),
+    (float("inf"), "+Inf"),
+    (float("-inf"), "-Inf"),
+    (3.0, "3"),
+    (0.25, "0.25")
+])
+def test_gauge_values_use_the_prometheus_text_format(value, text):
+    gauge = Gauge("healthsphere_test", "Test gauge", ("stage",))
+    gauge.labels("decode").set(value)
+
+    assert gauge.render()[-1] == f'healthsphere_test{{stage="decode"}} {text}'
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("healthsphere_test_seconds", "Test histogram", buckets=(0.1, 1.0))
+    child = histogram.labels()
+    for value in (0.05, 0.5, 5.0):
+        child.observe(value)
+
+    lines = histogram.render()
+
+    assert 'healthsphere_test_seconds_bucket{le="0.1"} 1' in lines
+    assert 'healthsphere_test_seconds_bucket{le="1"} 2' in lines
+    assert 'healthsphere_test_seconds_bucket{le="+Inf"} 3' in lines
+    assert "healthsphere_test_seconds_count 3" in lines
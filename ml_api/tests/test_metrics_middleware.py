@@ -0,0 +1,24 @@
+import asyncio
+
+import httpx
+
+
+def test_route_labels_use_the_path_template():
+    from main import app
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            # The parameter value equals a literal segment of the template
+            await client.get("/chat/users/users/conversations")
+            await client.get("/food-recognition/nutrition/nutrition")
+            await client.get("/no/such/route")
+            return (await client.get("/metrics")).text
+
+    metrics = asyncio.run(scenario())
+
+    assert 'route="/chat/users/{user_id}/conversations"' in metrics
+    assert 'route="/food-recognition/nutrition/{food_name}"' in metrics
+    assert 'route="unmatched"' in metrics
+    assert "/users/users" not in metrics
+    assert "{food_name}/{food_name}" not in metrics